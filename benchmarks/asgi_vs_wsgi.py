@@ -0,0 +1,138 @@
+"""
+Compare the WSGI deployment (gunicorn sync workers, DRF views) with the ASGI one
+(gunicorn with uvicorn workers, async views) under concurrent clients: requests/sec and p50/p99 latency
+of the portfolio endpoint at each concurrency level.
+
+Both servers run against a throwaway test database created from the configured one.
+
+Usage (from the project root):
+    python benchmarks/asgi_vs_wsgi.py --workers 4 --concurrency 1 16 64 [--requests 500]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import date
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutualfund_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from mutualfunds.ledger import record_transactions  # noqa: E402
+from mutualfunds.models import FundHouse, LatestNAV, Scheme  # noqa: E402
+
+SERVERS = {
+    "WSGI": {
+        "command": ["gunicorn", "mutualfund_project.wsgi:application", "--workers", "{workers}",
+                    "--bind", "127.0.0.1:{port}", "--log-level", "warning"],
+        "path": "/api/portfolio/",
+    },
+    "ASGI": {
+        "command": ["gunicorn", "mutualfund_project.asgi:application", "--worker-class", "uvicorn.workers.UvicornWorker",
+                    "--workers", "{workers}", "--bind", "127.0.0.1:{port}", "--log-level", "warning"],
+        "path": "/api/async/portfolio/",
+        # Django gives every ASGI request its own thread, so persistent per-thread connections
+        # would pile up; a pool bounds them
+        "env": {"DB_POOL": "True"},
+    },
+}
+
+
+def seed(holdings):
+    user = get_user_model().objects.create_user(email="benchmark@example.com", password="benchmark")
+    fund_house = FundHouse.objects.create(name="Benchmark Mutual Fund")
+    schemes = Scheme.objects.bulk_create([
+        Scheme(fund_house=fund_house, scheme_code=600000 + i, scheme_name=f"Benchmark Scheme {i}",
+               scheme_type="Open Ended Schemes", scheme_category="Equity Scheme", is_open_ended=True)
+        for i in range(holdings)
+    ])
+    LatestNAV.objects.bulk_create([LatestNAV(scheme=scheme, date=date.today(), nav=25.0) for scheme in schemes])
+    record_transactions(user, [
+        {"scheme": scheme, "kind": "buy", "date": date.today(), "units": 10, "price": 25.0} for scheme in schemes
+    ])
+    return user
+
+
+def start_server(name, workers, port, database):
+    server = SERVERS[name]
+    command = [part.format(workers=workers, port=port) for part in server["command"]]
+    process = subprocess.Popen(command, env={**os.environ, **server.get("env", {}), "DB_NAME": database})
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(url, timeout=1)
+            return process, url + server["path"]
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"{name} server did not start")
+
+
+async def load(url, token, concurrency, requests):
+    latencies, failures = [], 0
+    remaining = iter(range(requests))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def client(http):
+        nonlocal failures
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await http.get(url, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            failures += response.status_code != 200
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--holdings", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    database = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command("migrate", verbosity=0)
+        token = str(AccessToken.for_user(seed(args.holdings)))
+        connection.close()
+
+        print(f"GET portfolio ({args.holdings} holdings), {args.requests} requests per level, {args.workers} workers")
+        for name in SERVERS:
+            process, url = start_server(name, args.workers, args.port, database)
+            try:
+                asyncio.run(load(url, token, 4, 100))  # warm up connections and pools
+                for concurrency in args.concurrency:
+                    rate, p50, p99, failures = asyncio.run(load(url, token, concurrency, args.requests))
+                    print(f"  {name} c={concurrency:<4} {rate:7.1f} req/s, p50 {p50 * 1000:7.1f} ms, "
+                          f"p99 {p99 * 1000:7.1f} ms" + (f", {failures} failed" if failures else ""))
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare peak RSS of parsing the /latest feed with response.json() against the
+streaming feed reader, on a synthetic feed written to a temporary file.
+
+Usage (from the project root):
+    python benchmarks/feed_memory.py --records 200000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_synthetic_feed(path, records):
+    with open(path, "w") as f:
+        f.write("[")
+        for i in range(records):
+            if i:
+                f.write(",")
+            json.dump({
+                "Scheme_Code": 100000 + i,
+                "ISIN_Div_Payout_ISIN_Growth": f"INF{i:09d}",
+                "ISIN_Div_Reinvestment": "-",
+                "Scheme_Name": f"Synthetic Fund {i} - Direct Plan - Growth",
+                "Net_Asset_Value": 10 + (i % 9000) / 7,
+                "Date": "20-Jun-2025",
+                "Scheme_Type": "Open Ended Schemes",
+                "Scheme_Category": "Equity Scheme - Flexi Cap Fund",
+                "Mutual_Fund_Family": f"Fund House {i % 50} Mutual Fund",
+            }, f)
+        f.write("]")
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, path):
+    """Parse the feed in this process and print records, seconds and peak RSS."""
+    started = time.perf_counter()
+    if mode == "json":
+        # Mirrors response.content + response.json(): raw bytes, decoded text and the full list
+        with open(path, "rb") as f:
+            content = f.read()
+        data = json.loads(content.decode("utf-8"))
+        count = sum(1 for item in data if item.get("Scheme_Code"))
+    else:
+        from mutualfunds.feed import CHUNK_SIZE, parse_feed
+
+        def chunks():
+            with open(path, "rb") as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    yield chunk
+
+        count = sum(1 for record in parse_feed(chunks()) if record.scheme_code)
+    print(json.dumps({"records": count, "seconds": round(time.perf_counter() - started, 2), "peak_rss_mb": round(peak_rss_mb(), 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--mode", choices=["json", "stream"])
+    parser.add_argument("--path")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.path)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "latest.json")
+        write_synthetic_feed(path, args.records)
+        print(f"Synthetic feed: {args.records} records, {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+        # Each mode runs in a fresh interpreter so peak RSS is not shared
+        for mode in ("json", "stream"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--path", path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            print(f"{mode:>6}: {output.strip()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark loading NAV rows: rows/sec of per-row ORM upserts, batched bulk_create
+upserts and the COPY loader, both into an empty NAV table (inserts) and over the
+same rows again (conflicts updated).
+
+Runs against a throwaway test database created from the configured one.
+
+Usage (from the project root):
+    python benchmarks/nav_loading.py --schemes 500 --days 100 [--orm-rows 2000]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutualfund_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+
+from mutualfunds import loader  # noqa: E402
+from mutualfunds.ingestion import NAV_FIELDS  # noqa: E402
+from mutualfunds.models import NAV, FundHouse, Scheme  # noqa: E402
+
+
+def seed(schemes):
+    fund_house = FundHouse.objects.create(name="Benchmark Mutual Fund")
+    created = Scheme.objects.bulk_create([
+        Scheme(fund_house=fund_house, scheme_code=200000 + i, scheme_name=f"Benchmark Scheme {i}",
+               scheme_type="Open Ended Schemes", scheme_category="Equity Scheme", is_open_ended=True)
+        for i in range(schemes)
+    ])
+    return [scheme.id for scheme in created]
+
+
+def nav_rows(scheme_ids, days, bump=0.0):
+    start = date.today() - timedelta(days=days)
+    return [(scheme_id, start + timedelta(days=d), 10 + d / 100 + bump) for d in range(days) for scheme_id in scheme_ids]
+
+
+def orm_per_row(rows):
+    with transaction.atomic():
+        for scheme_id, nav_date, nav_value in rows:
+            NAV.objects.update_or_create(scheme_id=scheme_id, date=nav_date, defaults={"nav": nav_value})
+
+
+def bulk_create(rows):
+    with transaction.atomic():
+        loader._bulk_create_upsert(NAV, NAV_FIELDS, rows, ["scheme_id", "date"], ["nav"])
+
+
+def copy(rows):
+    loader.copy_upsert(NAV, NAV_FIELDS, rows, unique_fields=["scheme_id", "date"], update_fields=["nav"])
+
+
+def timed(label, load, rows):
+    started = time.perf_counter()
+    load(rows)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<22} {len(rows):8d} rows {elapsed:8.2f} s {len(rows) / elapsed:10.0f} rows/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schemes", type=int, default=500)
+    parser.add_argument("--days", type=int, default=100)
+    parser.add_argument("--orm-rows", type=int, default=2000, help="Rows loaded by the (slow) per-row path")
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command("migrate", verbosity=0)
+        rows = nav_rows(seed(args.schemes), args.days)
+        updated = [(scheme_id, nav_date, nav_value + 1) for scheme_id, nav_date, nav_value in rows]
+
+        print(f"Loading NAV rows ({args.schemes} schemes x {args.days} days)")
+        for label, load, sample in [("ORM per row", orm_per_row, args.orm_rows),
+                                    ("bulk_create", bulk_create, len(rows)),
+                                    ("COPY", copy, len(rows))]:
+            NAV.objects.all().delete()
+            timed(f"{label}, insert", load, rows[:sample])
+            timed(f"{label}, update", load, updated[:sample])
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark latest-NAV and history-range queries on a synthetic NAV history,
+before the (scheme, -date) covering index, after it, and optionally after
+converting NAV to yearly partitions.
+
+Runs against a throwaway test database created from the configured one.
+
+Usage (from the project root):
+    python benchmarks/nav_queries.py --schemes 200 --days 2500 [--partition]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutualfund_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from mutualfunds.models import NAV, FundHouse, Scheme  # noqa: E402
+
+BEFORE_MIGRATION = "0002_latestnav"
+
+
+def seed(schemes, days):
+    fund_house = FundHouse.objects.create(name="Benchmark Mutual Fund")
+    created = Scheme.objects.bulk_create([
+        Scheme(fund_house=fund_house, scheme_code=200000 + i, scheme_name=f"Benchmark Scheme {i}",
+               scheme_type="Open Ended Schemes", scheme_category="Equity Scheme", is_open_ended=True)
+        for i in range(schemes)
+    ])
+    start = date.today() - timedelta(days=days)
+    for scheme in created:
+        NAV.objects.bulk_create(
+            [NAV(scheme=scheme, date=start + timedelta(days=d), nav=10 + d / 100) for d in range(days)],
+            batch_size=5000,
+        )
+    return [scheme.id for scheme in created], start
+
+
+def analyze():
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {NAV._meta.db_table}")
+
+
+def timed(label, samples, query):
+    started = time.perf_counter()
+    for args in samples:
+        query(*args)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<14} {elapsed / len(samples) * 1000:8.3f} ms/query")
+
+
+def run_queries(label, scheme_ids, start, days, samples):
+    analyze()
+    print(label)
+    picks = [random.choice(scheme_ids) for _ in range(samples)]
+    timed("latest NAV", [(s,) for s in picks],
+          lambda s: NAV.objects.filter(scheme_id=s).order_by("-date").values_list("nav", flat=True).first())
+
+    ranges = []
+    for s in picks:
+        offset = random.randint(0, max(days - 365, 0))
+        ranges.append((s, start + timedelta(days=offset), start + timedelta(days=offset + 365)))
+    timed("1y history", ranges,
+          lambda s, a, b: list(NAV.objects.filter(scheme_id=s, date__range=(a, b)).order_by("date").values_list("date", "nav")))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schemes", type=int, default=200)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--partition", action="store_true", help="Also benchmark yearly partitions (PostgreSQL)")
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command("migrate", "mutualfunds", BEFORE_MIGRATION, verbosity=0)
+        print(f"Seeding {args.schemes} schemes x {args.days} days of NAV...")
+        scheme_ids, start = seed(args.schemes, args.days)
+
+        run_queries(f"Before ({BEFORE_MIGRATION})", scheme_ids, start, args.days, args.samples)
+        call_command("migrate", "mutualfunds", verbosity=0)
+        run_queries("After (covering index)", scheme_ids, start, args.days, args.samples)
+        if args.partition:
+            call_command("partition_nav", stdout=open(os.devnull, "w"))
+            run_queries("After (yearly partitions)", scheme_ids, start, args.days, args.samples)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark portfolio analytics (XIRR per holding and overall, value history)
+for a user with many holdings, each fed by years of monthly SIP instalments.
+
+Runs against a throwaway test database created from the configured one.
+
+Usage (from the project root):
+    python benchmarks/portfolio_analytics.py --holdings 300 --years 5 [--runs 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutualfund_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from mutualfunds.analytics import portfolio_analytics  # noqa: E402
+from mutualfunds.ledger import sync_holdings  # noqa: E402
+from mutualfunds.models import NAV, FundHouse, Scheme, Transaction  # noqa: E402
+
+
+def seed(holdings, years):
+    user = get_user_model().objects.create_user(email="benchmark@example.com", password="benchmark")
+    fund_house = FundHouse.objects.create(name="Benchmark Mutual Fund")
+    schemes = Scheme.objects.bulk_create([
+        Scheme(fund_house=fund_house, scheme_code=400000 + i, scheme_name=f"Benchmark Scheme {i}",
+               scheme_type="Open Ended Schemes", scheme_category="Equity Scheme", is_open_ended=True)
+        for i in range(holdings)
+    ])
+    start = date.today() - timedelta(days=int(years * 365.25))
+    trading_days = [start + timedelta(days=d) for d in range(int(years * 365.25))]
+    trading_days = [day for day in trading_days if day.weekday() < 5]
+
+    for scheme in schemes:
+        nav, navs, ledger = 10.0, [], []
+        for day in trading_days:
+            nav *= 1 + random.gauss(0.0004, 0.01)
+            navs.append(NAV(scheme=scheme, date=day, nav=round(nav, 4)))
+            # Monthly SIP on the first trading day of every month
+            if not ledger or ledger[-1].date.month != day.month:
+                ledger.append(Transaction(user=user, scheme=scheme, kind=Transaction.KIND_SIP,
+                                          date=day, units=round(1000 / nav, 4), price=round(nav, 4)))
+        NAV.objects.bulk_create(navs, batch_size=5000)
+        Transaction.objects.bulk_create(ledger)
+
+    call_command("rebuild_latest_nav", stdout=open(os.devnull, "w"))
+    sync_holdings(user, [scheme.id for scheme in schemes])
+    return user
+
+
+def timed(label, runs, call):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    print(f"  {label:<22} best {min(samples) * 1000:8.1f} ms, mean {sum(samples) / runs * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--holdings", type=int, default=300)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command("migrate", verbosity=0)
+        print(f"Seeding {args.holdings} holdings x {args.years} years of NAVs and monthly SIPs...")
+        user = seed(args.holdings, args.years)
+        print(f"{Transaction.objects.filter(user=user).count()} transactions")
+
+        timed("XIRR and gains", args.runs, lambda: portfolio_analytics(user, history=False))
+        one_year_ago = date.today() - timedelta(days=365)
+        timed("with 1y value history", args.runs, lambda: portfolio_analytics(user, start=one_year_ago))
+        timed("with full history", args.runs, lambda: portfolio_analytics(user))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
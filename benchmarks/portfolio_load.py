@@ -0,0 +1,131 @@
+"""
+Load-test the portfolio endpoint under each connection setup: a new connection
+per request (CONN_MAX_AGE=0), persistent connections and a psycopg 3 pool.
+
+Each thread stands in for a sync web worker (e.g. a gunicorn worker) and
+serves requests back to back through Django's WSGI handler, so connections
+are opened and closed exactly as in production. Runs against a throwaway
+test database created from the configured one.
+
+Usage (from the project root):
+    python benchmarks/portfolio_load.py --workers 8 --requests 200 [--holdings 50]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutualfund_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from mutualfund_project.database import PSYCOPG3, connection_settings  # noqa: E402
+from mutualfunds.ledger import record_transactions  # noqa: E402
+from mutualfunds.models import FundHouse, LatestNAV, Scheme  # noqa: E402
+
+MODES = {
+    "no reuse": {"CONN_MAX_AGE": 0, "POOL_MIN_SIZE": 0, "POOL_MAX_SIZE": 0},
+    "persistent": settings.DB_CONNECTION_PROFILES["web"],
+    "pool": settings.DB_CONNECTION_PROFILES["web"],
+}
+
+
+def seed(holdings):
+    user = get_user_model().objects.create_user(email="benchmark@example.com", password="benchmark")
+    fund_house = FundHouse.objects.create(name="Benchmark Mutual Fund")
+    schemes = Scheme.objects.bulk_create([
+        Scheme(fund_house=fund_house, scheme_code=500000 + i, scheme_name=f"Benchmark Scheme {i}",
+               scheme_type="Open Ended Schemes", scheme_category="Equity Scheme", is_open_ended=True)
+        for i in range(holdings)
+    ])
+    LatestNAV.objects.bulk_create([LatestNAV(scheme=scheme, date=date.today(), nav=25.0) for scheme in schemes])
+    record_transactions(user, [
+        {"scheme": scheme, "kind": "buy", "date": date.today(), "units": 10, "price": 25.0} for scheme in schemes
+    ])
+    return user
+
+
+def environ(path, token):
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_AUTHORIZATION": f"Bearer {token}",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(b""),
+        "wsgi.errors": sys.stderr,
+    }
+
+
+def run(mode, workers, requests, token):
+    connections.close_all()
+    connection.settings_dict.update(connection_settings(MODES[mode], pool=mode == "pool"))
+    application = WSGIHandler()
+
+    def worker(count):
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = application(environ("/api/portfolio/", token), lambda status, headers: None)
+            b"".join(response)
+            response.close()
+            latencies.append(time.perf_counter() - started)
+        connections.close_all()
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        per_worker = [requests // workers] * workers
+        latencies = sorted(sum(pool.map(worker, per_worker), []))
+    elapsed = time.perf_counter() - started
+
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"  {mode:<11} {len(latencies) / elapsed:7.1f} req/s, p50 {p50:6.1f} ms, p95 {p95:6.1f} ms")
+    if mode == "pool":
+        connection.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--holdings", type=int, default=50)
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command("migrate", verbosity=0)
+        user = seed(args.holdings)
+        token = str(AccessToken.for_user(user))
+        print(f"{args.requests} GET /api/portfolio/ over {args.workers} workers, {args.holdings} holdings")
+        for mode in MODES:
+            if mode == "pool" and not PSYCOPG3:
+                print("  pool        skipped, needs psycopg 3")
+                continue
+            run(mode, args.workers, args.requests, token)
+    finally:
+        connections.close_all()
+        connection.settings_dict.update(connection_settings(MODES["no reuse"]))
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
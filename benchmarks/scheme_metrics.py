@@ -0,0 +1,72 @@
+"""
+Benchmark SchemeMetrics refresh over a synthetic scheme universe and report
+schemes per second, split into NAV loading, NumPy computation and the upsert.
+
+Runs against a throwaway test database created from the configured one.
+
+Usage (from the project root):
+    python benchmarks/scheme_metrics.py --schemes 2000 --days 1800 [--batch-size 250]
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutualfund_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from mutualfunds.analytics import refresh_scheme_metrics  # noqa: E402
+from mutualfunds.models import NAV, FundHouse, Scheme  # noqa: E402
+
+
+def seed(schemes, days):
+    fund_house = FundHouse.objects.create(name="Benchmark Mutual Fund")
+    created = Scheme.objects.bulk_create([
+        Scheme(fund_house=fund_house, scheme_code=300000 + i, scheme_name=f"Benchmark Scheme {i}",
+               scheme_type="Open Ended Schemes", scheme_category="Equity Scheme", is_open_ended=True)
+        for i in range(schemes)
+    ])
+    trading_days = [
+        day for day in (date.today() - timedelta(days=d) for d in range(days, 0, -1))
+        if day.weekday() < 5
+    ]
+    for scheme in created:
+        # Random walk starting at a random point, so histories have different lengths
+        nav, rows = 10.0, []
+        for day in trading_days[random.randint(0, len(trading_days) // 2):]:
+            nav *= 1 + random.gauss(0.0004, 0.01)
+            rows.append(NAV(scheme=scheme, date=day, nav=round(nav, 4)))
+        NAV.objects.bulk_create(rows, batch_size=5000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schemes", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=1800)
+    parser.add_argument("--batch-size", type=int, default=250)
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command("migrate", verbosity=0)
+        print(f"Seeding {args.schemes} schemes x {args.days} days of NAV...")
+        seed(args.schemes, args.days)
+
+        stats = refresh_scheme_metrics(batch_size=args.batch_size)
+        print(f"Refreshed {stats['schemes']} schemes in {stats['elapsed']}s ({stats['schemes_per_sec']} schemes/sec)")
+        print(f"  load {stats['load_seconds']}s, compute {stats['compute_seconds']}s, write {stats['write_seconds']}s")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark scheme search over a synthetic ~40k-scheme universe: latency of name,
+prefix, code and ISIN searches, and whether PostgreSQL uses the indexes.
+
+Runs against a throwaway test database created from the configured one.
+
+Usage (from the project root):
+    python benchmarks/scheme_search.py --schemes 40000 [--runs 20] [--explain]
+"""
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mutualfund_project.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from mutualfunds.models import FundHouse, Scheme  # noqa: E402
+from mutualfunds.pagination import SchemeSearchPagination  # noqa: E402
+from mutualfunds.search import search_schemes  # noqa: E402
+
+FUND_HOUSES = ["Aditya Birla Sun Life", "Axis", "HDFC", "ICICI Prudential", "Kotak", "Nippon India", "SBI",
+               "UTI", "Mirae Asset", "DSP", "Franchise Templeton", "Tata", "Invesco India", "Canara Robeco"]
+STRATEGIES = [("Large Cap Fund", "Equity Scheme - Large Cap Fund"), ("Flexi Cap Fund", "Equity Scheme - Flexi Cap Fund"),
+              ("Mid Cap Fund", "Equity Scheme - Mid Cap Fund"), ("Small Cap Fund", "Equity Scheme - Small Cap Fund"),
+              ("Liquid Fund", "Debt Scheme - Liquid Fund"), ("Corporate Bond Fund", "Debt Scheme - Corporate Bond Fund"),
+              ("Gilt Fund", "Debt Scheme - Gilt Fund"), ("Balanced Advantage Fund", "Hybrid Scheme - Dynamic Asset Allocation"),
+              ("ELSS Tax Saver Fund", "Equity Scheme - ELSS"), ("Nifty 50 Index Fund", "Other Scheme - Index Funds")]
+PLANS = ["Regular Plan", "Direct Plan"]
+OPTIONS = ["Growth", "IDCW", "IDCW Reinvestment", "Monthly IDCW", "Quarterly IDCW"]
+
+QUERIES = {
+    "words": {"q": "hdfc liquid direct"},
+    "prefix": {"q": "kot sma"},
+    "common word": {"q": "fund"},
+    "with category": {"q": "growth", "category": "Equity Scheme - Mid Cap Fund"},
+    "scheme code": {"q": "720123"},
+    "ISIN": {"q": "INF000K20123"},
+}
+
+
+def seed(count):
+    fund_houses = {name: FundHouse.objects.create(name=f"{name} Mutual Fund") for name in FUND_HOUSES}
+    names = itertools.cycle(itertools.product(FUND_HOUSES, STRATEGIES, PLANS, OPTIONS))
+    schemes = []
+    for i in range(count):
+        fund_house, (strategy, category), plan, option = next(names)
+        # Series numbers keep names distinct once the combinations run out
+        series = f" Series {i // 1400}" if i >= 1400 else ""
+        schemes.append(Scheme(
+            fund_house=fund_houses[fund_house], scheme_code=700000 + i,
+            scheme_name=f"{fund_house} {strategy}{series} - {plan} - {option}",
+            scheme_type="Open Ended Schemes", scheme_category=category, is_open_ended=True,
+            isin_growth=f"INF000K{i:05d}", isin_reinvestment=f"INF999K{i:05d}" if i % 2 else None,
+        ))
+    Scheme.objects.bulk_create(schemes, batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {Scheme._meta.db_table}")
+
+
+def first_page(params):
+    schemes = search_schemes(q=params.get("q"), category=params.get("category"))
+    count = schemes.count()
+    rows = list(schemes[:SchemeSearchPagination.page_size])
+    return count, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schemes", type=int, default=40000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--explain", action="store_true", help="Print the query plan of every search")
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        call_command("migrate", verbosity=0)
+        print(f"Seeding {args.schemes} schemes...")
+        seed(args.schemes)
+
+        print(f"First page (count + {SchemeSearchPagination.page_size} rows), median of {args.runs} runs:")
+        for label, params in QUERIES.items():
+            samples = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                count, rows = first_page(params)
+                samples.append(time.perf_counter() - started)
+            top = rows[0].scheme_name if rows else "-"
+            print(f"  {label:<14} {statistics.median(samples) * 1000:7.2f} ms  {count:6d} matches, top: {top}")
+            if args.explain:
+                print(search_schemes(q=params.get("q"), category=params.get("category"))[:20].explain())
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
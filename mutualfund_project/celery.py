@@ -1,8 +1,24 @@
 import os
 from celery import Celery
+from celery.signals import worker_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mutualfund_project.settings')
 
 app = Celery('mutualfund_project')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def use_worker_connections(**kwargs):
+    # Workers run long jobs back to back, so they keep connections longer and pool fewer
+    from django.conf import settings
+    from django.db import connections
+
+    from .database import connection_settings
+
+    worker = connection_settings(
+        settings.DB_CONNECTION_PROFILES["worker"], pool=settings.DB_POOL, pgbouncer=settings.DB_PGBOUNCER
+    )
+    settings.DATABASES['default'].update(worker)
+    connections['default'].settings_dict.update(worker)
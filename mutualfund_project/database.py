@@ -0,0 +1,38 @@
+"""Connection handling for DATABASES, per process type (web or Celery worker)."""
+import importlib.util
+
+# Django picks psycopg 3 over psycopg2 when both are installed
+PSYCOPG3 = importlib.util.find_spec("psycopg") is not None
+
+
+def connection_settings(profile, pool=False, pgbouncer=False):
+    """
+    DATABASES entries for one process type.
+
+    `profile` holds CONN_MAX_AGE and POOL_MIN_SIZE/POOL_MAX_SIZE. With `pool`
+    (psycopg 3 only) each process keeps a connection pool instead of one
+    persistent connection. With `pgbouncer` the connection goes through
+    PgBouncer in transaction mode: no server-side cursors, no prepared
+    statements and no client-side pool, since PgBouncer does the pooling.
+    """
+    options = {}
+    conn_max_age = profile["CONN_MAX_AGE"]
+
+    if pgbouncer:
+        if PSYCOPG3:
+            options["prepare_threshold"] = None
+    elif pool and PSYCOPG3:
+        options["pool"] = {
+            "min_size": profile["POOL_MIN_SIZE"],
+            "max_size": profile["POOL_MAX_SIZE"],
+            "timeout": 10,
+        }
+        # Connections go back to the pool after each request instead of persisting
+        conn_max_age = 0
+
+    return {
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": conn_max_age != 0,
+        "DISABLE_SERVER_SIDE_CURSORS": pgbouncer,
+        "OPTIONS": options,
+    }
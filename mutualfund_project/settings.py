@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import copy
 from pathlib import Path
 from decouple import config
+
+from .database import connection_settings
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,6 +56,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'mutualfunds.middleware.StickyPrimaryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,10 +82,17 @@ WSGI_APPLICATION = 'mutualfund_project.wsgi.application'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'mutualfunds.authentication.CachedJWTAuthentication',
     )
 }
 
+# Resolve JWT-authenticated users from a cache of their active flag and password marker
+# instead of a query per request; saving a user invalidates their entry. Other processes
+# may keep serving an entry for up to JWT_USER_LOCAL_CACHE_TIMEOUT seconds.
+JWT_USER_CACHE = config("JWT_USER_CACHE", default=True, cast=bool)
+JWT_USER_CACHE_TIMEOUT = 60
+JWT_USER_LOCAL_CACHE_TIMEOUT = 5
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),     # default is 5 minutes
@@ -105,15 +116,111 @@ DATABASES = {
         'USER': config("DB_USER"),
         'PASSWORD': config("DB_PASSWORD"),
         'HOST': config("DB_HOST", default="localhost"),
-        'PORT': '5432',
+        'PORT': config("DB_PORT", default="5432"),
     }
 }
 
+# Connection reuse per process type. Web processes use the "web" profile; Celery workers
+# switch to "worker" when they start (see mutualfund_project/celery.py). CONN_MAX_AGE is
+# how long a persistent connection is reused, with a health check before each reuse.
+DB_CONNECTION_PROFILES = {
+    "web": {
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE_WEB", default=60, cast=int),
+        "POOL_MIN_SIZE": 2,
+        "POOL_MAX_SIZE": config("DB_POOL_MAX_SIZE_WEB", default=10, cast=int),
+    },
+    "worker": {
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE_WORKER", default=600, cast=int),
+        "POOL_MIN_SIZE": 1,
+        "POOL_MAX_SIZE": config("DB_POOL_MAX_SIZE_WORKER", default=4, cast=int),
+    },
+}
+# Use a psycopg 3 connection pool per process instead of persistent connections
+DB_POOL = config("DB_POOL", default=False, cast=bool)
+# Connect through PgBouncer in transaction pooling mode (DB_HOST/DB_PORT point at PgBouncer)
+DB_PGBOUNCER = config("DB_PGBOUNCER", default=False, cast=bool)
+
+DATABASES['default'].update(
+    connection_settings(DB_CONNECTION_PROFILES["web"], pool=DB_POOL, pgbouncer=DB_PGBOUNCER)
+)
+
+# Read replica for the catalogue, NAV history and metrics views. Without DB_REPLICA_HOST the
+# alias points at the primary and nothing is routed to it.
+DB_REPLICA_HOST = config("DB_REPLICA_HOST", default="")
+DATABASES['replica'] = {
+    **copy.deepcopy(DATABASES['default']),
+    'HOST': DB_REPLICA_HOST or DATABASES['default']['HOST'],
+    'PORT': config("DB_REPLICA_PORT", default=DATABASES['default']['PORT']),
+    'TEST': {'MIRROR': 'default'},
+}
+REPLICA_DATABASE = 'replica' if DB_REPLICA_HOST else None
+# After a write, the user's reads stay on the primary this long so they see their own changes
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=10, cast=int)
+DATABASE_ROUTERS = ['mutualfunds.routers.ReplicaRouter']
+
 
 # Celery settings
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Needed by the chord that aggregates the NAV update chunks
+CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND", default="redis://localhost:6379/0")
+
+
+# RapidAPI
+RAPIDAPI_KEY = config("RAPIDAPI_KEY")
+RAPID_API_HOST = config("RAPID_API_HOST")
+RAPIDAPI_TIMEOUT = 60
+RAPIDAPI_RETRIES = 3
+# Serve the feed from recorded files (e.g. mutualfunds/testdata) instead of the network
+RAPIDAPI_REPLAY_DIR = config("RAPIDAPI_REPLAY_DIR", default="")
+
+
+# Cache (Redis database 1, next to the Celery broker)
+# https://docs.djangoproject.com/en/5.2/topics/cache/#redis
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config("REDIS_CACHE_URL", default="redis://localhost:6379/1"),
+    }
+}
+
+# Lifetime of cached catalogue listings; they are also invalidated by every catalogue sync
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds without progress after which a catalogue import job is considered dead
+IMPORT_JOB_TIMEOUT = 60 * 60
+
+# How long an ingested (date, nav) fingerprint is trusted before a scheme is rewritten anyway
+NAV_FINGERPRINT_TIMEOUT = 60 * 60 * 24 * 7
+
+# NAV update fan-out: feed records per chunk task, and the most chunks one run dispatches
+# (chunks grow beyond NAV_CHUNK_SIZE to stay within it). Chunks run in parallel up to the
+# worker pool's concurrency.
+NAV_CHUNK_SIZE = config("NAV_CHUNK_SIZE", default=2000, cast=int)
+NAV_CHUNK_MAX_PARALLEL = config("NAV_CHUNK_MAX_PARALLEL", default=8, cast=int)
+
+# NAV history backfills are cut into ranges of this many days, loaded by parallel tasks
+NAV_BACKFILL_CHUNK_DAYS = config("NAV_BACKFILL_CHUNK_DAYS", default=30, cast=int)
+
+# When the NAV update runs, as crontab fields (minute hour day-of-month month day-of-week) in
+# NAV_UPDATE_TIMEZONE. AMFI publishes the day's NAVs in the evening of each business day
+# (by 11 PM IST), so by default the job polls every half hour from 8 PM to 11:30 PM IST, Mon-Fri.
+NAV_UPDATE_CRONTAB = config("NAV_UPDATE_CRONTAB", default="0,30 20-23 * * 1-5")
+NAV_UPDATE_TIMEZONE = config("NAV_UPDATE_TIMEZONE", default="Asia/Kolkata")
+
+# Only one NAV update runs at a time. Its Redis lock expires NAV_LOCK_TIMEOUT seconds after the
+# last heartbeat, so it must cover the time chunk tasks may wait in the queue. A run triggered
+# while the lock is held is either dropped ("skip") or retried once after NAV_LOCK_RETRY_DELAY
+# seconds ("queue").
+LOCK_REDIS_URL = config("LOCK_REDIS_URL", default="redis://localhost:6379/1")
+NAV_LOCK_TIMEOUT = 15 * 60
+NAV_LOCK_POLICY = config("NAV_LOCK_POLICY", default="skip")
+NAV_LOCK_RETRY_DELAY = 5 * 60
+
+# Annual risk-free rate used for the Sharpe ratio in SchemeMetrics
+METRICS_RISK_FREE_RATE = 0.065
 
 
 # Password validation
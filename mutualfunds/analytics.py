@@ -0,0 +1,364 @@
+import time
+from datetime import date, timedelta
+from operator import itemgetter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .feed import chunked
+from .models import NAV, LatestNAV, Scheme, SchemeMetrics, Transaction
+
+# Schemes loaded into one NAV matrix; bounds memory at roughly batch x trading days x 8 bytes
+BATCH_SIZE = 250
+
+TRADING_DAYS = 252
+DAYS_PER_YEAR = 365.25
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Trailing and rolling return horizons, in years
+RETURN_PERIODS = (1, 3, 5)
+
+# Volatility and Sharpe ratio are measured over the trailing window
+RISK_WINDOW_YEARS = 3
+
+# NAVs loaded from before the start of a portfolio value history, so holdings whose
+# scheme has no NAV on the first day are forward-filled from the previous one
+HISTORY_LOOKBACK = timedelta(days=10)
+
+METRIC_FIELDS = [
+    "as_of", "start_date", "cagr",
+    "return_1y", "return_3y", "return_5y",
+    "rolling_1y", "rolling_3y", "rolling_5y",
+    "volatility", "sharpe", "max_drawdown",
+]
+
+
+def load_nav_matrix(scheme_ids, start=None, end=None):
+    """
+    Load the NAV history of `scheme_ids` as a (schemes x dates) float matrix.
+
+    Columns are the union of every date any of the schemes has a NAV for; holidays
+    of a single scheme are forward-filled from its previous NAV and dates before
+    its first NAV stay NaN. Returns (scheme ids, dates as datetime64[D], matrix).
+    """
+    navs = NAV.objects.filter(scheme_id__in=scheme_ids)
+    if start:
+        navs = navs.filter(date__gte=start)
+    if end:
+        navs = navs.filter(date__lte=end)
+    rows = list(navs.order_by().values_list("scheme_id", "date", "nav").iterator(chunk_size=10000))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[D]"), np.empty((0, 0))
+
+    # Going through ordinals is an order of magnitude faster than numpy parsing date objects
+    ids = np.fromiter(map(itemgetter(0), rows), dtype=np.int64, count=len(rows))
+    days = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    days = (days - EPOCH_ORDINAL).astype("datetime64[D]")
+    navs = np.fromiter(map(itemgetter(2), rows), dtype=np.float64, count=len(rows))
+
+    schemes = np.unique(ids)
+    dates = np.unique(days)
+    matrix = np.full((len(schemes), len(dates)), np.nan)
+    matrix[np.searchsorted(schemes, ids), np.searchsorted(dates, days)] = navs
+    return schemes, dates, forward_fill(matrix)
+
+
+def forward_fill(matrix):
+    """Replace NaNs with the previous value in the same row; leading NaNs are kept."""
+    columns = np.arange(matrix.shape[1])
+    source = np.where(np.isnan(matrix), 0, columns)
+    np.maximum.accumulate(source, axis=1, out=source)
+    return matrix[np.arange(matrix.shape[0])[:, None], source]
+
+
+def _lag_index(dates, years):
+    """For every date, the index of the last date at least `years` earlier, or -1."""
+    targets = dates - np.timedelta64(int(round(years * DAYS_PER_YEAR)), "D")
+    return np.searchsorted(dates, targets, side="right") - 1
+
+
+def _annualise(growth, years):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.power(growth, 1 / years) - 1
+
+
+def _masked_mean(values, axis=1):
+    valid = np.isfinite(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0).sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan), count
+
+
+def compute_metrics(dates, matrix, risk_free_rate=None):
+    """
+    Returns, risk and drawdown of every row of a forward-filled NAV matrix, as a
+    dict of arrays with one value per row (NaN where the history is too short).
+    """
+    if risk_free_rate is None:
+        risk_free_rate = settings.METRICS_RISK_FREE_RATE
+    schemes = np.arange(matrix.shape[0])
+    valid = ~np.isnan(matrix)
+    first = valid.argmax(axis=1)
+    last_nav = matrix[:, -1]
+    metrics = {}
+
+    # CAGR since inception
+    years = (dates[-1] - dates[first]).astype(np.float64) / DAYS_PER_YEAR
+    metrics["cagr"] = _annualise(last_nav / matrix[schemes, first], np.where(years > 0, years, np.nan))
+
+    for period in RETURN_PERIODS:
+        lag = _lag_index(dates, period)
+
+        # Trailing return up to the latest date, annualised beyond one year
+        if lag[-1] >= 0:
+            metrics[f"return_{period}y"] = _annualise(last_nav / matrix[:, lag[-1]], period)
+        else:
+            metrics[f"return_{period}y"] = np.full(len(schemes), np.nan)
+
+        # Mean of the period return started on every date with enough history
+        ends = np.flatnonzero(lag >= 0)
+        if len(ends):
+            rolling = _annualise(matrix[:, ends] / matrix[:, lag[ends]], period)
+            metrics[f"rolling_{period}y"], _ = _masked_mean(rolling)
+        else:
+            metrics[f"rolling_{period}y"] = np.full(len(schemes), np.nan)
+
+    # Volatility and Sharpe ratio from daily returns over the risk window
+    window = max(_lag_index(dates, RISK_WINDOW_YEARS)[-1], 0)
+    prices = matrix[:, window:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = prices[:, 1:] / prices[:, :-1] - 1
+    mean, count = _masked_mean(daily)
+    squares, _ = _masked_mean((daily - mean[:, None]) ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = np.where(count > 1, squares * count / np.maximum(count - 1, 1), np.nan)
+        metrics["volatility"] = np.sqrt(variance * TRADING_DAYS)
+        metrics["sharpe"] = np.where(
+            metrics["volatility"] > 0,
+            (mean * TRADING_DAYS - risk_free_rate) / metrics["volatility"],
+            np.nan,
+        )
+
+    # Deepest fall from a running peak, as a negative fraction
+    peaks = np.fmax.accumulate(matrix, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = matrix / peaks - 1
+    metrics["max_drawdown"] = np.where(valid.any(axis=1), np.nan_to_num(drawdown, nan=0.0).min(axis=1), np.nan)
+
+    metrics["start_date"] = dates[first]
+    return metrics
+
+
+def xirr(amounts, days, tol=1e-8, max_iterations=100):
+    """
+    Annualised internal rate of return of every row of `amounts`, cash flows that
+    are negative for money paid in, occurring `days` days after the first flow.
+    `days` is either one row shared by all rows or a matrix like `amounts`;
+    pad unused cells of `amounts` with 0.
+
+    All rows are solved at once with Newton steps safeguarded by a bracket: a
+    step that would leave the bracket is replaced by bisection, so every row
+    with a sign change converges. Rows without one return NaN.
+    """
+    amounts = np.atleast_2d(np.asarray(amounts, dtype=np.float64))
+    years = np.asarray(days, dtype=np.float64) / 365.0
+
+    def npv(rate):
+        with np.errstate(over="ignore", invalid="ignore"):
+            discounted = amounts * np.power(1 + rate[:, None], -years)
+            return discounted.sum(axis=1), (-years * discounted).sum(axis=1) / (1 + rate)
+
+    rows = amounts.shape[0]
+    lo, hi = np.full(rows, -0.9999), np.full(rows, 100.0)
+    f_lo, f_hi = npv(lo)[0], npv(hi)[0]
+    solvable = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) != np.sign(f_hi))
+    tolerance = tol * np.maximum(np.abs(amounts).sum(axis=1), 1.0)
+
+    rate = np.full(rows, 0.1)
+    for _ in range(max_iterations):
+        value, slope = npv(rate)
+        if np.all(~solvable | (np.abs(value) < tolerance)):
+            break
+        # Keep the root bracketed between lo and hi
+        below = np.sign(value) == np.sign(f_lo)
+        lo, f_lo = np.where(below, rate, lo), np.where(below, value, f_lo)
+        hi = np.where(below, hi, rate)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = rate - value / slope
+        rate = np.where(np.isfinite(step) & (step > lo) & (step < hi), step, (lo + hi) / 2)
+
+    return np.where(solvable, rate, np.nan)
+
+
+def _to_python(value):
+    value = float(value)
+    return None if np.isnan(value) or np.isinf(value) else round(value, 6)
+
+
+def refresh_scheme_metrics(scheme_ids=None, batch_size=BATCH_SIZE):
+    """
+    Recompute SchemeMetrics for `scheme_ids` (default: every scheme with NAVs) in
+    batches of `batch_size` schemes, each costing one NAV read and one upsert.
+    """
+    started = time.perf_counter()
+    if scheme_ids is None:
+        scheme_ids = NAV.objects.order_by("scheme_id").values_list("scheme_id", flat=True).distinct()
+    stats = {"schemes": 0, "load_seconds": 0.0, "compute_seconds": 0.0, "write_seconds": 0.0}
+
+    for batch in chunked(scheme_ids, batch_size):
+        phase = time.perf_counter()
+        schemes, dates, matrix = load_nav_matrix(batch)
+        loaded = time.perf_counter()
+        if not len(schemes):
+            continue
+        metrics = compute_metrics(dates, matrix)
+        computed = time.perf_counter()
+
+        as_of = dates[-1].item()
+        rows = []
+        for i, scheme_id in enumerate(schemes.tolist()):
+            values = {name: _to_python(metrics[name][i]) for name in METRIC_FIELDS[2:]}
+            rows.append(SchemeMetrics(scheme_id=scheme_id, as_of=as_of, start_date=metrics["start_date"][i].item(), **values))
+        with transaction.atomic():
+            SchemeMetrics.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["scheme"],
+                update_fields=METRIC_FIELDS + ["updated_at"],
+            )
+
+        stats["schemes"] += len(rows)
+        stats["load_seconds"] += loaded - phase
+        stats["compute_seconds"] += computed - loaded
+        stats["write_seconds"] += time.perf_counter() - computed
+
+    elapsed = time.perf_counter() - started
+    for key in ("load_seconds", "compute_seconds", "write_seconds"):
+        stats[key] = round(stats[key], 3)
+    stats["elapsed"] = round(elapsed, 3)
+    stats["schemes_per_sec"] = round(stats["schemes"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def _ordinals(days):
+    return np.fromiter((day.toordinal() for day in days), dtype=np.int64, count=len(days))
+
+
+def portfolio_analytics(user, start=None, end=None, history=True):
+    """
+    Gain/loss and XIRR of a user's portfolio and of each holding, plus the daily
+    value of the portfolio next to the money invested in it.
+
+    The ledger and the NAVs are each read with one query; cash flows, units held
+    and values over time are then built as NumPy arrays, and the XIRR of every
+    holding is solved in a single vectorised pass.
+    """
+    ledger = list(
+        Transaction.objects.filter(user=user)
+        .order_by("date", "id")
+        .values_list("scheme_id", "kind", "date", "units", "price")
+    )
+    if not ledger:
+        return None
+
+    scheme_ids, kinds, days, units, prices = zip(*ledger)
+    schemes = np.unique(np.array(scheme_ids, dtype=np.int64))
+    holding = np.searchsorted(schemes, np.array(scheme_ids, dtype=np.int64))
+    sign = np.where(np.array(kinds) == Transaction.KIND_SELL, -1.0, 1.0)
+    units = sign * np.array(units, dtype=np.float64)
+    cash = -units * np.array(prices, dtype=np.float64)
+    ordinals = _ordinals(days)
+
+    latest = {
+        scheme_id: (nav_date, nav)
+        for scheme_id, nav_date, nav in LatestNAV.objects.filter(scheme_id__in=schemes.tolist()).values_list("scheme_id", "date", "nav")
+    }
+    latest_nav = np.array([latest[scheme_id][1] if scheme_id in latest else 0.0 for scheme_id in schemes.tolist()])
+    held = np.bincount(holding, weights=units, minlength=len(schemes))
+    invested = -np.bincount(holding, weights=cash, minlength=len(schemes))
+    value = held * latest_nav
+
+    # One row of cash flows per holding, padded with zeros to the busiest one,
+    # ending with a final flow for what the holding is worth at the latest NAV
+    as_of = max([nav_date.toordinal() for nav_date, _ in latest.values()] + [int(ordinals[-1])])
+    counts = np.bincount(holding, minlength=len(schemes))
+    order = np.argsort(holding, kind="stable")
+    rank = np.empty_like(holding)
+    rank[order] = np.arange(len(holding)) - (np.cumsum(counts) - counts)[holding[order]]
+    flows = np.zeros((len(schemes), counts.max() + 1))
+    flow_days = np.zeros_like(flows)
+    flows[holding, rank] = cash
+    flow_days[holding, rank] = ordinals - ordinals[0]
+    flows[:, -1] = value
+    flow_days[:, -1] = as_of - ordinals[0]
+    holding_xirr = xirr(flows, flow_days)
+    total_xirr = xirr(np.append(cash, value.sum()), np.append(ordinals, as_of) - ordinals[0])[0]
+
+    info = {row[0]: row[1:] for row in Scheme.objects.filter(id__in=schemes.tolist()).values_list("id", "scheme_code", "scheme_name")}
+    holdings = []
+    for i, scheme_id in enumerate(schemes.tolist()):
+        scheme_code, scheme_name = info[scheme_id]
+        holdings.append({
+            "scheme_code": scheme_code,
+            "scheme_name": scheme_name,
+            "units": round(float(held[i]), 6),
+            "invested": round(float(invested[i]), 2),
+            "current_value": round(float(value[i]), 2),
+            "gain": round(float(value[i] - invested[i]), 2),
+            "xirr": _rate(holding_xirr[i]),
+        })
+
+    total_invested, total_value = float(invested.sum()), float(value.sum())
+    result = {
+        "as_of": date.fromordinal(as_of).isoformat(),
+        "invested": round(total_invested, 2),
+        "current_value": round(total_value, 2),
+        "gain": round(total_value - total_invested, 2),
+        "gain_pct": round((total_value - total_invested) / total_invested * 100, 2) if total_invested > 0 else None,
+        "xirr": _rate(total_xirr),
+        "holdings": holdings,
+    }
+    if history:
+        result["history"] = value_history(schemes, holding, ordinals, units, cash, start, end)
+    return result
+
+
+def value_history(schemes, holding, ordinals, units, cash, start=None, end=None):
+    """
+    Portfolio value and net amount invested on every NAV date between `start`
+    (default: the first transaction) and `end`, as parallel arrays.
+    """
+    first_day = date.fromordinal(int(ordinals[0]))
+    start = max(start or first_day, first_day)
+    navs_ids, dates, navs = load_nav_matrix(schemes.tolist(), start=start - HISTORY_LOOKBACK, end=end)
+    empty = {"dates": [], "value": [], "invested": []}
+    if not len(dates):
+        return empty
+    keep = dates >= np.datetime64(start)
+    dates, navs = dates[keep], navs[:, keep]
+    if not len(dates):
+        return empty
+
+    # Each transaction takes effect from the first NAV date on or after it; earlier ones from the start
+    position = np.searchsorted(dates.astype(np.int64) + EPOCH_ORDINAL, ordinals, side="left")
+    effective = position < len(dates)
+    unit_changes = np.zeros((len(schemes), len(dates)))
+    np.add.at(unit_changes, (holding[effective], position[effective]), units[effective])
+    invested = np.cumsum(np.bincount(position[effective], weights=-cash[effective], minlength=len(dates)))
+
+    # Rows of the NAV matrix line up with `schemes`; schemes without NAVs are worth 0
+    nav_rows = np.zeros((len(schemes), len(dates)))
+    nav_rows[np.searchsorted(schemes, navs_ids)] = np.nan_to_num(navs)
+    value = (np.cumsum(unit_changes, axis=1) * nav_rows).sum(axis=0)
+
+    return {
+        "dates": [str(day) for day in dates],
+        "value": np.round(value, 2).tolist(),
+        "invested": np.round(invested, 2).tolist(),
+    }
+
+
+def _rate(value):
+    return None if np.isnan(value) else round(float(value), 6)
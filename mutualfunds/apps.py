@@ -1,32 +1,30 @@
 from django.apps import AppConfig
-from django.db.utils import OperationalError, ProgrammingError
+from django.conf import settings
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def register_schedules(sender, **kwargs):
+    from django.db.utils import OperationalError, ProgrammingError
+    from .schedule import register_nav_schedule
+
+    try:
+        register_nav_schedule(using=kwargs.get("using"))
+    except (OperationalError, ProgrammingError):
+        # django_celery_beat's tables are not migrated yet
+        pass
+
 
 class MutualfundsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mutualfunds'
 
     def ready(self):
-        try:
-            from django_celery_beat.models import PeriodicTask, IntervalSchedule
-            import json
-
-            # Create or get the interval
-            schedule, _ = IntervalSchedule.objects.get_or_create(
-                every=1,
-                period=IntervalSchedule.HOURS
-            )
-
-            task_name = 'Update NAVs and Portfolios Every Hour'
-
-            # Only create if task with same name doesn't exist
-            if not PeriodicTask.objects.filter(name=task_name).exists():
-                PeriodicTask.objects.create(
-                    interval=schedule,
-                    name=task_name,
-                    task='mutualfunds.tasks.update_nav_and_portfolio',  # Make sure this path is correct
-                    args=json.dumps([])
-                )
-
-        except (OperationalError, ProgrammingError):
-            # Avoid DB access during migrations
-            pass
+        # No queries here: every process runs ready(). The periodic NAV task is
+        # (re)registered after migrate, or with `manage.py register_schedules`.
+        post_migrate.connect(register_schedules, sender=self, dispatch_uid="mutualfunds.register_schedules")
+
+        from .authentication import invalidate_user
+
+        # Deactivation and password changes must not be hidden by the JWT user cache
+        post_save.connect(invalidate_user, sender=settings.AUTH_USER_MODEL, dispatch_uid="mutualfunds.invalidate_user.save")
+        post_delete.connect(invalidate_user, sender=settings.AUTH_USER_MODEL, dispatch_uid="mutualfunds.invalidate_user.delete")
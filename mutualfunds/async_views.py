@@ -0,0 +1,207 @@
+"""
+Async versions of the read endpoints and the catalogue fetch, under /api/async/.
+
+Served by the ASGI application (e.g. `uvicorn mutualfund_project.asgi:application`),
+they use the async ORM and httpx, so a slow client or a slow RapidAPI response
+does not hold a worker thread. Responses have the same envelope as the DRF views,
+but lists are keyset-paginated with ?after=<last value>&page_size=N (a `next` link,
+no `previous` or opaque ?cursor=) and are not served from the listing cache, so
+they carry no ETag. Like DRF's views they are CSRF-exempt: they authenticate with
+the Authorization header, never with the session cookie.
+"""
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .authentication import CachedJWTAuthentication
+from .jobs import start_import_job
+from .ledger import refresh_summaries
+from .models import FundHouse, ImportJob, Portfolio, PortfolioSummary, Scheme, SchemeMetrics
+from .routers import ais_sticky, replica_reads
+from .serializers import (
+    FundHouseSerializer,
+    ImportJobSerializer,
+    PortfolioHoldingSerializer,
+    PortfolioSummarySerializer,
+    SchemeMetricsSerializer,
+    SchemeSerializer,
+)
+from .tasks import run_catalogue_import
+from .utils import concrete_fields, error_payload, requested_fields, success_payload
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+_jwt = CachedJWTAuthentication()
+
+
+def json_success(message, data=None, status=status.HTTP_200_OK):
+    return JsonResponse(success_payload(message, data), status=status)
+
+
+def json_error(message, errors=None, status=status.HTTP_400_BAD_REQUEST):
+    return JsonResponse(error_payload(message, errors), status=status)
+
+
+async def authenticate(request):
+    """User of the request's JWT access token, or None if it is missing or invalid."""
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return await _jwt.aget_user(_jwt.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken):
+        return None
+
+
+async def keyset_page(request, queryset, ordering, serializer_class, sparse=True):
+    """
+    One page of `queryset` ordered by the unique column `ordering`, continuing after ?after=.
+    With `sparse`, only the columns named in ?fields= are loaded.
+    """
+    try:
+        page_size = min(max(int(request.GET.get("page_size", PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = PAGE_SIZE
+
+    context = {"request": Request(request)}
+    fields = requested_fields(context["request"])
+    if sparse and fields:
+        queryset = queryset.only(*concrete_fields(queryset.model, fields), ordering)
+    if request.GET.get("after"):
+        queryset = queryset.filter(**{f"{ordering}__gt": request.GET["after"]})
+
+    rows = [row async for row in queryset.order_by(ordering)[:page_size + 1]]
+    next_link = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        query = {**request.GET.dict(), "after": getattr(rows[-1], ordering)}
+        next_link = request.build_absolute_uri(f"{request.path}?{urlencode(query)}")
+    return {"next": next_link, "results": serializer_class(rows, many=True, context=context).data}
+
+
+class AsyncAPIView(View):
+    """Async JSON view authenticated with the same JWT access tokens as the DRF views."""
+    # Serve GET requests from the read replica, as ReplicaReadMixin does
+    use_replica = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated, so CSRF-exempt like DRF's APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        with replica_reads() as reads:
+            user = await authenticate(request)
+            if user is None:
+                return json_error("Authentication credentials were not provided or are invalid.",
+                                  status=status.HTTP_401_UNAUTHORIZED)
+            request.user = user
+            reads.enabled = self.use_replica and request.method == "GET" and not await ais_sticky(user)
+            return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncFundHouseListView(AsyncAPIView):
+    use_replica = True
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            page = await keyset_page(request, FundHouse.objects.all(), "name", FundHouseSerializer)
+            return json_success("Fund houses fetched", page)
+        except Exception as e:
+            return json_error("Error fetching fund houses", str(e))
+
+
+class AsyncSchemeListView(AsyncAPIView):
+    use_replica = True
+
+    async def get(self, request, fund_house_id, *args, **kwargs):
+        try:
+            schemes = Scheme.objects.filter(fund_house_id=fund_house_id, is_open_ended=True)
+            return json_success("Schemes fetched", await keyset_page(request, schemes, "scheme_code", SchemeSerializer))
+        except Exception as e:
+            return json_error("Error fetching schemes", str(e))
+
+
+class AsyncSchemeMetricsView(AsyncAPIView):
+    use_replica = True
+
+    async def get(self, request, scheme_code, *args, **kwargs):
+        try:
+            metrics = await SchemeMetrics.objects.select_related("scheme").filter(scheme__scheme_code=scheme_code).afirst()
+            if metrics is None:
+                return json_error("Scheme metrics not found", status=status.HTTP_404_NOT_FOUND)
+            return json_success("Scheme metrics fetched", SchemeMetricsSerializer(metrics).data)
+        except Exception as e:
+            return json_error("Error fetching scheme metrics", str(e))
+
+
+class AsyncPortfolioView(AsyncAPIView):
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            holdings = (
+                Portfolio.objects.filter(user=request.user)
+                .annotate(latest_nav=F("scheme__latest_nav__nav"))
+                .select_related("scheme")
+            )
+            page = await keyset_page(request, holdings, "id", PortfolioHoldingSerializer, sparse=False)
+            return json_success("Portfolio fetched", page)
+        except Exception as e:
+            return json_error("Failed to fetch portfolio", str(e))
+
+
+class AsyncPortfolioSummaryView(AsyncAPIView):
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            summary = await PortfolioSummary.objects.filter(user=request.user).afirst()
+            if summary is None:
+                await sync_to_async(refresh_summaries)([request.user.pk])
+                summary = await PortfolioSummary.objects.aget(user=request.user)
+            return json_success("Portfolio summary fetched", PortfolioSummarySerializer(summary).data)
+        except Exception as e:
+            return json_error("Error fetching portfolio summary", str(e))
+
+
+class AsyncCatalogueFetchView(AsyncAPIView):
+    """Queue a catalogue import on Celery and answer 202 with the job, like the WSGI endpoint."""
+    kind = None
+    label = None
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            job, created = await sync_to_async(start_import_job)(self.kind, request.user)
+            if not created:
+                return json_success(f"{self.label} import already in progress.", ImportJobSerializer(job).data,
+                                    status.HTTP_202_ACCEPTED)
+
+            try:
+                await sync_to_async(run_catalogue_import.delay)(str(job.id))
+            except Exception as e:
+                await ImportJob.objects.filter(pk=job.pk).aupdate(status=ImportJob.STATUS_FAILED, error=str(e))
+                return json_error(f"Failed to queue {self.label.lower()} import", str(e),
+                                  status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            return json_success(f"{self.label} import queued.", ImportJobSerializer(job).data,
+                                status.HTTP_202_ACCEPTED)
+        except Exception as e:
+            return json_error("Error occurred", str(e))
+
+
+class AsyncFetchFundHousesView(AsyncCatalogueFetchView):
+    kind = ImportJob.KIND_FUND_HOUSES
+    label = "Fund house"
+
+
+class AsyncFetchSchemesView(AsyncCatalogueFetchView):
+    kind = ImportJob.KIND_SCHEMES
+    label = "Scheme"
@@ -0,0 +1,130 @@
+"""
+JWT authentication that resolves users from a short-lived cache instead of
+loading the user row on every request.
+
+The signed access token already names the user (and carries their email); the
+cache only holds what may change after the token was issued: whether the user is
+active, their staff flags and a marker of their password hash. Entries live
+JWT_USER_CACHE_TIMEOUT seconds in the shared cache, fronted by a per-process
+copy kept JWT_USER_LOCAL_CACHE_TIMEOUT seconds. Saving or deleting a user drops
+their entry, so deactivation and password changes apply on the next request
+(within the local timeout in other processes). Queryset update()s bypass this.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_KEY = "jwt-user:{}"
+
+# User fields kept in the cache; the rest of a cached user is left at its defaults
+CACHED_FIELDS = ["email", "is_active", "is_staff", "is_superuser"]
+
+_local = {}
+_local_lock = threading.Lock()
+
+
+def user_key(user_id):
+    return USER_KEY.format(user_id)
+
+
+def user_state(user):
+    state = {field: getattr(user, field) for field in CACHED_FIELDS}
+    state["password"] = get_md5_hash_password(user.password)
+    return state
+
+
+def _get_state(user_id):
+    key = user_key(user_id)
+    with _local_lock:
+        entry = _local.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    state = cache.get(key)
+    if state is not None:
+        _set_local(key, state)
+    return state
+
+
+def _set_local(key, state):
+    with _local_lock:
+        _local[key] = (time.monotonic() + settings.JWT_USER_LOCAL_CACHE_TIMEOUT, state)
+
+
+def cache_user(user):
+    key = user_key(user.pk)
+    state = user_state(user)
+    cache.set(key, state, timeout=settings.JWT_USER_CACHE_TIMEOUT)
+    _set_local(key, state)
+
+
+def forget_user(user_id):
+    key = user_key(user_id)
+    with _local_lock:
+        _local.pop(key, None)
+    cache.delete(key)
+
+
+def _read_only(*args, **kwargs):
+    raise TypeError("Users resolved from the JWT user cache are read-only; load the user to change it")
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """post_save/post_delete receiver: forget the cached state of a saved or deleted user."""
+    forget_user(instance.pk)
+    # Again once committed, in case a request re-cached the old row in between
+    transaction.on_commit(lambda: forget_user(instance.pk))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication whose user lookup goes through the JWT user cache when
+    JWT_USER_CACHE is set. A user served from the cache is a partial instance
+    with the primary key, email and flags only, enough for permission checks and
+    filtering by user. It is read-only: its other fields (the password included)
+    are blank, so save() and delete() raise instead of overwriting the stored row.
+    Views that change the user must load it from the database.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_USER_CACHE:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        state = _get_state(user_id)
+        if state is None:
+            # Unknown or inactive users fail here exactly as without the cache
+            user = super().get_user(validated_token)
+            cache_user(user)
+            return user
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not state["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if jwt_settings.CHECK_REVOKE_TOKEN and validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != state["password"]:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        user = self.user_model(**{jwt_settings.USER_ID_FIELD: user_id})
+        for field in CACHED_FIELDS:
+            setattr(user, field, state[field])
+        # Trust the signed email claim (see CustomTokenObtainPairSerializer) over the cached one
+        user.email = validated_token.get("email", user.email)
+        user._state.adding = False
+        user._state.db = "default"
+        for method in ("save", "asave", "delete", "adelete"):
+            setattr(user, method, _read_only)
+        return user
+
+    async def aget_user(self, validated_token):
+        return await sync_to_async(self.get_user)(validated_token)
+
@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .feed import stream_history
+from .ingestion import _upsert_latest_navs, load_navs, revalue_portfolios
+from .ledger import holders_of, refresh_summaries
+from .locks import LockBusy, heartbeat, nav_lock
+from .models import NAV, NAVBackfill, NAVBackfillChunk, Scheme
+
+
+def date_ranges(start_date, end_date, days):
+    """Split the inclusive range into consecutive (start, end) ranges of at most `days` days."""
+    ranges = []
+    while start_date <= end_date:
+        last = min(start_date + timedelta(days=days - 1), end_date)
+        ranges.append((start_date, last))
+        start_date = last + timedelta(days=1)
+    return ranges
+
+
+def create_backfill(start_date, end_date, scheme_codes=None, chunk_days=None):
+    """
+    Plan a backfill of the NAVs published from `start_date` to `end_date` for
+    `scheme_codes` (every scheme if None), cut into chunks of `chunk_days` days.
+    """
+    chunk_days = chunk_days or settings.NAV_BACKFILL_CHUNK_DAYS
+    if start_date > end_date:
+        raise ValueError("The backfill must start on or before its end date")
+    if chunk_days < 1:
+        raise ValueError("Chunks must cover at least one day")
+
+    with transaction.atomic():
+        backfill = NAVBackfill.objects.create(
+            start_date=start_date, end_date=end_date, scheme_codes=sorted(scheme_codes) if scheme_codes else None
+        )
+        NAVBackfillChunk.objects.bulk_create([
+            NAVBackfillChunk(backfill=backfill, start_date=first, end_date=last)
+            for first, last in date_ranges(start_date, end_date, chunk_days)
+        ])
+    return backfill
+
+
+def unfinished_chunks(backfill_id):
+    """Ids of the chunks still to load: pending, failed, or left running by a worker that died."""
+    return list(
+        NAVBackfillChunk.objects.filter(backfill_id=backfill_id)
+        .exclude(status=NAVBackfill.STATUS_SUCCEEDED)
+        .values_list("id", flat=True)
+    )
+
+
+def _scheme_ids(scheme_codes):
+    schemes = Scheme.objects.all()
+    if scheme_codes:
+        schemes = schemes.filter(scheme_code__in=scheme_codes)
+    return dict(schemes.values_list("scheme_code", "id"))
+
+
+def load_chunk(chunk_id, client=None):
+    """
+    Load the NAVs of every day of a chunk, resuming after its checkpoint. Each day
+    is upserted and checkpointed in one transaction, so a chunk interrupted at any
+    point picks up at the first day not stored. Errors are recorded on the chunk
+    rather than raised, so the other chunks and the callback still run.
+    """
+    chunk = NAVBackfillChunk.objects.select_related("backfill").get(pk=chunk_id)
+    result = {"chunk": chunk.pk, "start_date": chunk.start_date.isoformat(), "end_date": chunk.end_date.isoformat(),
+              "loaded": 0, "error": None}
+    if chunk.status == NAVBackfill.STATUS_SUCCEEDED:
+        return result
+
+    NAVBackfillChunk.objects.filter(pk=chunk.pk).update(status=NAVBackfill.STATUS_RUNNING, error="")
+    scheme_ids = _scheme_ids(chunk.backfill.scheme_codes)
+    day = chunk.loaded_through + timedelta(days=1) if chunk.loaded_through else chunk.start_date
+    try:
+        while day <= chunk.end_date:
+            # A scheme's NAV may only be touched once per statement, last record wins
+            navs = {
+                (scheme_ids[record.scheme_code], record.nav_date): record.nav
+                for record in stream_history(day, client=client)
+                if record.scheme_code in scheme_ids and record.nav and record.nav_date is not None
+            }
+            with transaction.atomic():
+                written = load_navs([(scheme_id, nav_date, nav) for (scheme_id, nav_date), nav in navs.items()])
+                NAVBackfillChunk.objects.filter(pk=chunk.pk).update(
+                    loaded_through=day, loaded=F("loaded") + written, updated_at=timezone.now()
+                )
+            result["loaded"] += written
+            day += timedelta(days=1)
+    except Exception as e:
+        result["error"] = f"{day.isoformat()}: {e}"
+        NAVBackfillChunk.objects.filter(pk=chunk.pk).update(status=NAVBackfill.STATUS_FAILED, error=result["error"])
+        return result
+
+    NAVBackfillChunk.objects.filter(pk=chunk.pk).update(status=NAVBackfill.STATUS_SUCCEEDED)
+    return result
+
+
+def _update_latest_navs(backfill):
+    """
+    Bring LatestNAV in line with the days the backfill loaded: each scheme's two
+    newest loaded NAVs go through the same upsert as the NAV update, so they can
+    only become its latest or previous NAV. Returns the scheme ids touched.
+    """
+    loaded_days = Q()
+    for start_date, loaded_through in backfill.chunks.exclude(loaded_through=None).values_list(
+            "start_date", "loaded_through"):
+        loaded_days |= Q(date__range=(start_date, loaded_through))
+    if not loaded_days:
+        return set()
+    navs = NAV.objects.filter(loaded_days)
+    if backfill.scheme_codes:
+        navs = navs.filter(scheme__scheme_code__in=backfill.scheme_codes)
+    newest = (
+        navs.annotate(rank=Window(RowNumber(), partition_by=F("scheme_id"), order_by=F("date").desc()))
+        .filter(rank__lte=2)
+    )
+    # The older of the two first, so the newest moves it to previous when both are newer than LatestNAV
+    ranked = {1: [], 2: []}
+    for nav in newest:
+        ranked[nav.rank].append(nav)
+    return _upsert_latest_navs(ranked[2]) | _upsert_latest_navs(ranked[1])
+
+
+def finish_backfill(backfill_id):
+    """
+    Settle a backfill once its chunks have run: it succeeds if every chunk did.
+    LatestNAV is moved for the loaded days and the affected holdings and
+    summaries revalued, holding the NAV lock so no NAV update interleaves.
+    Raises LockBusy, settling nothing, while a NAV update holds the lock.
+    """
+    backfill = NAVBackfill.objects.get(pk=backfill_id)
+    chunks = backfill.chunks.all()
+    loaded = chunks.aggregate(total=Sum("loaded"))["total"] or 0
+    failed = [chunk for chunk in chunks if chunk.status != NAVBackfill.STATUS_SUCCEEDED]
+
+    latest_updated = set()
+    if loaded:
+        lock = nav_lock()
+        if not lock.acquire():
+            raise LockBusy("A NAV update is running")
+        try:
+            with heartbeat(lock), transaction.atomic():
+                latest_updated = _update_latest_navs(backfill)
+                revalue_portfolios(latest_updated)
+                refresh_summaries(holders_of(latest_updated))
+        finally:
+            lock.release()
+
+    NAVBackfill.objects.filter(pk=backfill.pk).update(
+        status=NAVBackfill.STATUS_FAILED if failed else NAVBackfill.STATUS_SUCCEEDED,
+        loaded=loaded,
+        error="\n".join(f"{chunk.start_date} to {chunk.end_date}: {chunk.error}" for chunk in failed),
+        finished_at=timezone.now(),
+    )
+    return {"backfill": str(backfill.pk), "loaded": loaded, "failed_chunks": len(failed),
+            "latest_updated": len(latest_updated)}
@@ -0,0 +1,92 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.functional import cached_property
+from rest_framework.renderers import JSONRenderer
+
+CATALOGUE_VERSION_KEY = "catalogue-version"
+RESPONSE_KEY = "response:{endpoint}:v{version}:{variant}"
+COUNTER_KEY = "response-cache:{endpoint}:{outcome}"
+
+# Endpoints served through cached_json_response, reported by cache_stats()
+CACHED_ENDPOINTS = ["fundhouses", "schemes"]
+
+
+class CachedJSONResponse(HttpResponse):
+    """Response built from pre-rendered JSON bytes; `data` is decoded only if someone asks for it."""
+
+    def __init__(self, content, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content, **kwargs)
+
+    @cached_property
+    def data(self):
+        return json.loads(self.content)
+
+
+def catalogue_version():
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalogue_version():
+    """Invalidate every cached catalogue response; old entries simply age out."""
+    cache.add(CATALOGUE_VERSION_KEY, 1, timeout=None)
+    return cache.incr(CATALOGUE_VERSION_KEY)
+
+
+def _count(endpoint, outcome):
+    key = COUNTER_KEY.format(endpoint=endpoint, outcome=outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def cache_stats():
+    keys = {
+        COUNTER_KEY.format(endpoint=endpoint, outcome=outcome): (endpoint, outcome)
+        for endpoint in CACHED_ENDPOINTS
+        for outcome in ("hits", "misses")
+    }
+    values = cache.get_many(list(keys))
+    stats = {endpoint: {"hits": 0, "misses": 0} for endpoint in CACHED_ENDPOINTS}
+    for key, (endpoint, outcome) in keys.items():
+        stats[endpoint][outcome] = values.get(key, 0)
+    return stats
+
+
+def cached_json_response(request, endpoint, variant, build):
+    """
+    Serve `build()` (JSON-serialisable data) from the cache as pre-rendered bytes.
+
+    Entries are keyed by endpoint, variant, query string and the catalogue version, and carry
+    an ETag so clients revalidating with If-None-Match get 304 Not Modified.
+    """
+    # Pages, field selections and the host used in pagination links are cached separately
+    query = "&".join(sorted(request.GET.urlencode().split("&")))
+    fingerprint = hashlib.md5(f"{request.get_host()}?{query}".encode(), usedforsecurity=False).hexdigest()
+    key = RESPONSE_KEY.format(endpoint=endpoint, version=catalogue_version(), variant=f"{variant}:{fingerprint}")
+    entry = cache.get(key)
+    if entry is None:
+        _count(endpoint, "misses")
+        payload = JSONRenderer().render(build())
+        entry = (f'"{hashlib.md5(payload, usedforsecurity=False).hexdigest()}"', payload)
+        cache.set(key, entry, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    else:
+        _count(endpoint, "hits")
+
+    etag, payload = entry
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = CachedJSONResponse(payload)
+    response["ETag"] = etag
+    return response
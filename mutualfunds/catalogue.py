@@ -0,0 +1,113 @@
+from .caching import bump_catalogue_version
+from .feed import chunked
+from .loader import copy_upsert
+from .models import FundHouse, Scheme
+
+# Feed records handled per round of bulk statements
+BATCH_SIZE = 2000
+
+# Scheme columns refreshed from the feed when they change
+SCHEME_SYNC_FIELDS = ["scheme_name", "scheme_type", "scheme_category", "isin_growth", "isin_reinvestment"]
+
+# Columns of the rows merged into Scheme; only SCHEME_SYNC_FIELDS change on existing schemes
+SCHEME_LOAD_FIELDS = ["scheme_code", "fund_house_id", "is_open_ended", *SCHEME_SYNC_FIELDS]
+
+
+def is_open_ended(record):
+    return "open" in record.scheme_type.lower()
+
+
+def _scheme_values(record):
+    return (
+        record.scheme_name or "",
+        record.scheme_type,
+        record.scheme_category or "",
+        record.isin_growth,
+        record.isin_reinvestment,
+    )
+
+
+def _create_fund_houses(names, fund_house_ids):
+    """Insert fund houses missing from `fund_house_ids` and add their ids to it. Returns the number created."""
+    missing = set(names) - fund_house_ids.keys()
+    if not missing:
+        return 0
+    FundHouse.objects.bulk_create([FundHouse(name=name) for name in missing], ignore_conflicts=True)
+    # ignore_conflicts does not hand back primary keys, so read them back
+    fund_house_ids.update(FundHouse.objects.filter(name__in=missing).values_list("name", "id"))
+    return len(missing)
+
+
+def sync_fund_houses(records, batch_size=BATCH_SIZE, progress=None):
+    """Create every fund house named in the feed that does not exist yet."""
+    fund_house_ids = dict(FundHouse.objects.values_list("name", "id"))
+    stats = {"processed": 0, "created": 0, "skipped": 0}
+    names = set()
+
+    for chunk in chunked(records, batch_size):
+        stats["processed"] += len(chunk)
+        for record in chunk:
+            if record.fund_house:
+                names.add(record.fund_house)
+            else:
+                stats["skipped"] += 1
+        if progress:
+            progress(stats)
+
+    stats["created"] = _create_fund_houses(names, fund_house_ids)
+    if stats["created"]:
+        bump_catalogue_version()
+    return stats
+
+
+def sync_schemes(records, batch_size=BATCH_SIZE, progress=None):
+    """
+    Create missing open-ended schemes and refresh changed ones from an iterable of FeedRecords.
+
+    Existing fund houses and schemes are preloaded into dicts once, then each
+    chunk of the feed costs a fixed number of statements: new and changed
+    schemes are merged together by one COPY upsert. `progress` is called with
+    the running stats after every chunk.
+    """
+    fund_house_ids = dict(FundHouse.objects.values_list("name", "id"))
+    existing = {row[0]: row[1:] for row in Scheme.objects.values_list("scheme_code", *SCHEME_SYNC_FIELDS)}
+    stats = {"processed": 0, "created": 0, "updated": 0, "skipped": 0, "fund_houses_created": 0}
+
+    for chunk in chunked(records, batch_size):
+        stats["processed"] += len(chunk)
+        rows = {}
+        for record in chunk:
+            if not is_open_ended(record) or not record.fund_house:
+                continue
+            if not record.scheme_code:
+                stats["skipped"] += 1
+                continue
+            rows[record.scheme_code] = record
+
+        stats["fund_houses_created"] += _create_fund_houses(
+            {record.fund_house for record in rows.values()}, fund_house_ids
+        )
+
+        new_schemes = []
+        changed_schemes = []
+        for scheme_code, record in rows.items():
+            values = _scheme_values(record)
+            current = existing.get(scheme_code)
+            if current == values:
+                continue
+            row = (scheme_code, fund_house_ids[record.fund_house], True, *values)
+            (new_schemes if current is None else changed_schemes).append(row)
+            existing[scheme_code] = values
+
+        if new_schemes or changed_schemes:
+            copy_upsert(Scheme, SCHEME_LOAD_FIELDS, new_schemes + changed_schemes,
+                        unique_fields=["scheme_code"], update_fields=SCHEME_SYNC_FIELDS)
+
+        stats["created"] += len(new_schemes)
+        stats["updated"] += len(changed_schemes)
+        if progress:
+            progress(stats)
+
+    if stats["created"] or stats["updated"] or stats["fund_houses_created"]:
+        bump_catalogue_version()
+    return stats
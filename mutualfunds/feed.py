@@ -0,0 +1,223 @@
+import codecs
+import json
+import re
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+
+from .rapidapi import get_client, load_validators, response_validators, save_validators
+
+LATEST_PATH = "/latest"
+
+# NAVs published on one date, GET /historical?Date=20-Jun-2025
+HISTORY_PATH = "/historical"
+
+# Bytes read from the socket per iteration
+CHUNK_SIZE = 64 * 1024
+
+# Date format used by the feed, e.g. "20-Jun-2025"
+FEED_DATE_FORMAT = "%d-%b-%Y"
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class FeedError(Exception):
+    def __init__(self, message, status_code=None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+FeedRecord = namedtuple("FeedRecord", [
+    "scheme_code",
+    "scheme_name",
+    "scheme_type",
+    "scheme_category",
+    "fund_house",
+    "isin_growth",
+    "isin_reinvestment",
+    "nav",
+    "nav_date",
+])
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_date(value):
+    if not isinstance(value, str):
+        return None
+    return _parse_date(value)
+
+
+# The whole feed shares a handful of dates, so parse each string once
+@lru_cache(maxsize=64)
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, FEED_DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def parse_record(item):
+    """Build a FeedRecord from a raw feed dict; fields that are missing or malformed become None."""
+    return FeedRecord(
+        scheme_code=_to_int(item.get("Scheme_Code")),
+        scheme_name=item.get("Scheme_Name"),
+        scheme_type=item.get("Scheme_Type") or "",
+        scheme_category=item.get("Scheme_Category"),
+        fund_house=item.get("Mutual_Fund_Family"),
+        isin_growth=item.get("ISIN_Div_Payout_ISIN_Growth"),
+        isin_reinvestment=item.get("ISIN_Div_Reinvestment"),
+        nav=_to_float(item.get("Net_Asset_Value")),
+        nav_date=_to_date(item.get("Date")),
+    )
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally decode a top-level JSON array from an iterable of byte chunks,
+    yielding each element as soon as it is complete.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos = "", 0
+    state = "start"
+
+    for chunk, final in _mark_last(chunks):
+        buffer = buffer[pos:] + text.decode(chunk, final=final)
+        pos = 0
+
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+
+            if state == "start":
+                if char != "[":
+                    raise FeedError("Feed is not a JSON array")
+                pos += 1
+                state = "first"
+            elif state in ("first", "value"):
+                if state == "first" and char == "]":
+                    pos += 1
+                    state = "end"
+                    continue
+                try:
+                    obj, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if final:
+                        raise FeedError(f"Malformed feed record: {e}") from e
+                    break
+                # A bare number or literal may continue in the next chunk
+                if end == len(buffer) and not final and char not in '{["':
+                    break
+                yield obj
+                pos = end
+                state = "separator"
+            elif state == "separator":
+                if char == ",":
+                    state = "value"
+                elif char == "]":
+                    state = "end"
+                else:
+                    raise FeedError(f"Unexpected {char!r} between feed records")
+                pos += 1
+            else:
+                raise FeedError("Unexpected data after the feed array")
+
+    if state != "end":
+        raise FeedError("Feed ended before the array was closed")
+
+
+def _mark_last(chunks):
+    previous = None
+    for chunk in chunks:
+        if previous is not None:
+            yield previous, False
+        previous = chunk
+    yield previous or b"", True
+
+
+def parse_feed(chunks):
+    """Yield a FeedRecord for every object in a streamed feed body."""
+    for item in iter_json_array(chunks):
+        if isinstance(item, dict):
+            yield parse_record(item)
+
+
+class LatestFeed:
+    """
+    Iterable of FeedRecords streamed from the /latest feed without holding the payload in memory.
+
+    With a `conditional_key` the request carries the ETag/Last-Modified saved by the
+    previous run under that key; a 304 yields no records and sets `not_modified`.
+    Call `commit()` once the records have been stored to save the new validators.
+    """
+
+    def __init__(self, conditional_key=None, client=None, chunk_size=CHUNK_SIZE):
+        self.conditional_key = conditional_key
+        self.client = client
+        self.chunk_size = chunk_size
+        self.not_modified = False
+        self.validators = None
+
+    def __iter__(self):
+        client = self.client or get_client()
+        previous = load_validators(self.conditional_key) if self.conditional_key else None
+
+        with client.get(LATEST_PATH, validators=previous, stream=True) as response:
+            if response.status_code == 304:
+                self.not_modified = True
+                return
+            if response.status_code != 200:
+                raise FeedError("Failed to fetch feed", response.status_code, response.text)
+            self.validators = response_validators(response)
+            yield from parse_feed(response.iter_content(chunk_size=self.chunk_size))
+
+    def commit(self):
+        if self.conditional_key and self.validators:
+            save_validators(self.conditional_key, self.validators)
+
+
+def stream_latest(client=None):
+    """Stream every record of the /latest feed, unconditionally."""
+    return iter(LatestFeed(client=client))
+
+
+def stream_history(nav_date, client=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream the records of the NAVs published on `nav_date`. A date without a
+    recording (404), such as a weekend or market holiday, yields nothing.
+    """
+    client = client or get_client()
+    params = {"Date": nav_date.strftime(FEED_DATE_FORMAT)}
+    with client.get(HISTORY_PATH, stream=True, params=params) as response:
+        if response.status_code == 404:
+            return
+        if response.status_code != 200:
+            raise FeedError("Failed to fetch NAV history", response.status_code, response.text)
+        yield from parse_feed(response.iter_content(chunk_size=chunk_size))
+
+
+def chunked(records, size):
+    """Group an iterable of records into lists of at most `size` items."""
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,255 @@
+import math
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .feed import FeedRecord, chunked
+from .ledger import holders_of, refresh_summaries
+from .loader import copy_upsert
+from .models import NAV, LatestNAV, Scheme, Portfolio
+
+# Records handled per round of writes (NAV upsert, LatestNAV, portfolios, summaries)
+BATCH_SIZE = 2000
+
+# Columns of the (scheme_id, date, nav) rows loaded into NAV
+NAV_FIELDS = ["scheme_id", "date", "nav"]
+
+FINGERPRINT_KEY = "nav-fingerprint:{}"
+
+# Template for records rebuilt from compact NAV rows
+EMPTY_RECORD = FeedRecord(*[None] * len(FeedRecord._fields))
+
+
+def fingerprint_key(scheme_code):
+    return FINGERPRINT_KEY.format(scheme_code)
+
+
+def fingerprint(nav_date, nav_value):
+    """Compact marker of the last ingested NAV of a scheme."""
+    return f"{nav_date.isoformat()}|{nav_value!r}"
+
+
+def to_nav_row(record):
+    """Compact, JSON-serialisable form of the parts of a FeedRecord that ingestion uses."""
+    return [record.scheme_code, record.nav_date.isoformat(), record.nav]
+
+
+def from_nav_row(row):
+    scheme_code, nav_date, nav_value = row
+    return EMPTY_RECORD._replace(scheme_code=scheme_code, nav_date=date.fromisoformat(nav_date), nav=nav_value)
+
+
+def nav_rows(records):
+    """Compact rows of the ingestible records. Returns (rows, number of records skipped)."""
+    rows, skipped = [], 0
+    for record in records:
+        if record.scheme_code and record.nav and record.nav_date is not None:
+            rows.append(to_nav_row(record))
+        else:
+            skipped += 1
+    return rows, skipped
+
+
+def split_by_scheme_code(rows, chunk_size, max_chunks):
+    """
+    Sort NAV rows by scheme code and cut them into contiguous scheme-code ranges
+    of about `chunk_size` rows, growing the chunks so there are at most
+    `max_chunks`. A scheme code never spans two chunks, so chunks processed in
+    parallel never write the same LatestNAV row.
+    """
+    if not rows:
+        return []
+    rows = sorted(rows, key=lambda row: row[0])
+    size = max(chunk_size, math.ceil(len(rows) / max_chunks))
+    chunks, start = [], 0
+    while start < len(rows):
+        end = min(start + size, len(rows))
+        while end < len(rows) and rows[end][0] == rows[end - 1][0]:
+            end += 1
+        chunks.append(rows[start:end])
+        start = end
+    return chunks
+
+
+def revalue_portfolios(scheme_ids):
+    """Recompute current_nav/current_value of every holding in the given schemes with one UPDATE."""
+    latest_nav = Subquery(LatestNAV.objects.filter(scheme=OuterRef("scheme")).values("nav")[:1])
+    return Portfolio.objects.filter(scheme_id__in=scheme_ids).update(
+        current_nav=latest_nav,
+        current_value=Round(F("units") * latest_nav, 2),
+        last_updated=timezone.now(),
+    )
+
+
+def ingest_navs(records, batch_size=BATCH_SIZE, force=False):
+    """
+    Upsert NAVs for an iterable of FeedRecords and revalue the affected portfolios.
+
+    Scheme codes are resolved from a single lookup query, NAVs are written in
+    batches (COPY into a staging table merged with ON CONFLICT (scheme, date)
+    DO UPDATE, see loader.copy_upsert) and portfolios are revalued
+    per batch, so the number of queries depends on the batch count only.
+    Records are consumed lazily, so a streamed feed is never fully materialised.
+
+    Records whose (date, nav) matches the fingerprint cached for their scheme
+    are counted as unchanged and not written, unless `force` is set.
+    """
+    started = time.perf_counter()
+    scheme_ids = dict(Scheme.objects.values_list("scheme_code", "id"))
+
+    stats = {"received": 0, "updated": 0, "unchanged": 0, "skipped": 0, "batches": []}
+
+    for chunk in chunked(records, batch_size):
+        candidates = {}
+        for record in chunk:
+            stats["received"] += 1
+            if record.scheme_code not in scheme_ids or not record.nav or record.nav_date is None:
+                stats["skipped"] += 1
+                continue
+            # A conflicting row may only be touched once per statement, last record wins
+            candidates[(record.scheme_code, record.nav_date)] = record.nav
+
+        fingerprints = {
+            fingerprint_key(scheme_code): fingerprint(nav_date, nav_value)
+            for (scheme_code, nav_date), nav_value in candidates.items()
+        }
+        if not force and fingerprints:
+            known = cache.get_many(list(fingerprints))
+            unchanged = {key for key, value in fingerprints.items() if known.get(key) == value}
+            stats["unchanged"] += len(unchanged)
+            fingerprints = {key: value for key, value in fingerprints.items() if key not in unchanged}
+
+        pending = {
+            (scheme_ids[scheme_code], nav_date): nav_value
+            for (scheme_code, nav_date), nav_value in candidates.items()
+            if fingerprint_key(scheme_code) in fingerprints
+        }
+        if pending:
+            _write_batch(pending, stats)
+            # Only remember what has been committed
+            cache.set_many(fingerprints, timeout=settings.NAV_FINGERPRINT_TIMEOUT)
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed"] = round(elapsed, 3)
+    stats["records_per_sec"] = round(stats["received"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def _write_batch(pending, stats):
+    started = time.perf_counter()
+    navs = [NAV(scheme_id=scheme_id, date=nav_date, nav=nav_value)
+            for (scheme_id, nav_date), nav_value in pending.items()]
+
+    with transaction.atomic():
+        load_navs((nav.scheme_id, nav.date, nav.nav) for nav in navs)
+        scheme_ids = _upsert_latest_navs(navs)
+        portfolios = revalue_portfolios(scheme_ids)
+        summaries = refresh_summaries(holders_of(scheme_ids))
+
+    stats["updated"] += len(navs)
+    stats["batches"].append({
+        "size": len(navs),
+        "portfolios": portfolios,
+        "summaries": summaries,
+        "seconds": round(time.perf_counter() - started, 3),
+    })
+
+
+def load_navs(rows):
+    """
+    Upsert (scheme_id, date, nav) rows into the NAV history only, leaving LatestNAV
+    and portfolios alone. Loaded with COPY on PostgreSQL. Returns the number of rows written.
+    """
+    return copy_upsert(NAV, NAV_FIELDS, rows, unique_fields=["scheme_id", "date"], update_fields=["nav"])
+
+
+def _upsert_latest_navs(navs):
+    """
+    Move LatestNAV forward for the given NAVs, never back to an older date; a NAV
+    between the previous and the latest date becomes the previous one. Returns the
+    scheme ids touched.
+    """
+    newest = {}
+    for nav in navs:
+        if nav.scheme_id not in newest or nav.date >= newest[nav.scheme_id].date:
+            newest[nav.scheme_id] = nav
+
+    current = {
+        row[0]: row[1:]
+        for row in LatestNAV.objects.filter(scheme_id__in=newest).values_list(
+            "scheme_id", "date", "nav", "previous_date", "previous_nav"
+        )
+    }
+    rows = []
+    for scheme_id, nav in newest.items():
+        if scheme_id not in current:
+            rows.append(LatestNAV(scheme_id=scheme_id, date=nav.date, nav=nav.nav))
+            continue
+        current_date, current_nav, previous_date, previous_nav = current[scheme_id]
+        if nav.date > current_date:
+            # The current NAV becomes the previous one
+            rows.append(LatestNAV(scheme_id=scheme_id, date=nav.date, nav=nav.nav,
+                                  previous_date=current_date, previous_nav=current_nav))
+        elif nav.date == current_date:
+            rows.append(LatestNAV(scheme_id=scheme_id, date=nav.date, nav=nav.nav,
+                                  previous_date=previous_date, previous_nav=previous_nav))
+        elif previous_date is None or nav.date >= previous_date:
+            # An older NAV (e.g. backfilled) that is newer than the previous one replaces it
+            rows.append(LatestNAV(scheme_id=scheme_id, date=current_date, nav=current_nav,
+                                  previous_date=nav.date, previous_nav=nav.nav))
+    LatestNAV.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["scheme"],
+        update_fields=["date", "nav", "previous_date", "previous_nav"],
+    )
+    return {row.scheme_id for row in rows}
+
+
+def rebuild_latest_navs(batch_size=BATCH_SIZE):
+    """Rebuild LatestNAV from the full NAV history. Returns the number of rows written."""
+    if connection.features.can_distinct_on_fields:
+        # PostgreSQL: one index walk with DISTINCT ON (scheme_id)
+        latest = NAV.objects.order_by("scheme_id", "-date").distinct("scheme_id")
+    else:
+        newest_date = NAV.objects.filter(scheme=OuterRef("scheme")).order_by("-date").values("date")[:1]
+        latest = NAV.objects.order_by().filter(date=Subquery(newest_date))
+    rows = latest.values_list("scheme_id", "date", "nav").iterator(chunk_size=batch_size)
+
+    written = 0
+    with transaction.atomic():
+        LatestNAV.objects.all().delete()
+        for chunk in chunked(rows, batch_size):
+            LatestNAV.objects.bulk_create(
+                [LatestNAV(scheme_id=scheme_id, date=nav_date, nav=nav_value) for scheme_id, nav_date, nav_value in chunk]
+            )
+            written += len(chunk)
+        _rebuild_previous_navs(batch_size)
+    return written
+
+
+def _rebuild_previous_navs(batch_size):
+    """Fill LatestNAV.previous_* with the newest NAV before each scheme's latest one."""
+    older = NAV.objects.filter(date__lt=F("scheme__latest_nav__date"))
+    if connection.features.can_distinct_on_fields:
+        previous = older.order_by("scheme_id", "-date").distinct("scheme_id")
+    else:
+        newest_date = (
+            NAV.objects.filter(scheme=OuterRef("scheme"), date__lt=OuterRef("scheme__latest_nav__date"))
+            .order_by("-date").values("date")[:1]
+        )
+        previous = older.order_by().filter(date=Subquery(newest_date))
+    rows = previous.values_list("scheme_id", "date", "nav").iterator(chunk_size=batch_size)
+    for chunk in chunked(rows, batch_size):
+        LatestNAV.objects.bulk_update(
+            [LatestNAV(scheme_id=scheme_id, previous_date=nav_date, previous_nav=nav_value)
+             for scheme_id, nav_date, nav_value in chunk],
+            ["previous_date", "previous_nav"],
+        )
+
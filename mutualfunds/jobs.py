@@ -0,0 +1,76 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .catalogue import sync_fund_houses, sync_schemes
+from .feed import FeedError, stream_latest
+from .models import ImportJob
+
+SYNC_FUNCTIONS = {
+    ImportJob.KIND_FUND_HOUSES: sync_fund_houses,
+    ImportJob.KIND_SCHEMES: sync_schemes,
+}
+
+
+def expire_stale_jobs(kind):
+    """Fail active jobs that stopped reporting progress, e.g. because their worker died."""
+    cutoff = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_TIMEOUT)
+    return ImportJob.objects.filter(
+        kind=kind, status__in=ImportJob.ACTIVE_STATUSES, updated_at__lt=cutoff
+    ).update(status=ImportJob.STATUS_FAILED, error="Import stopped reporting progress", finished_at=timezone.now())
+
+
+def start_import_job(kind, user=None):
+    """
+    Create a pending import of `kind`, or return the one already pending/running.
+    Returns (job, created).
+    """
+    expire_stale_jobs(kind)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return ImportJob.objects.create(kind=kind, requested_by=user), True
+        except IntegrityError:
+            job = ImportJob.objects.filter(kind=kind, status__in=ImportJob.ACTIVE_STATUSES).first()
+            if job:
+                return job, False
+    raise RuntimeError(f"Could not start a {kind} import")
+
+
+def _save_progress(job_id, stats, **fields):
+    ImportJob.objects.filter(pk=job_id).update(
+        processed=stats.get("processed", 0),
+        created=stats.get("created", 0),
+        skipped=stats.get("skipped", 0),
+        updated_at=timezone.now(),
+        **fields,
+    )
+
+
+def run_import_job(job_id):
+    """Run a pending catalogue import against the streamed feed, recording progress on the job."""
+    job = ImportJob.objects.get(pk=job_id)
+    ImportJob.objects.filter(pk=job_id).update(
+        status=ImportJob.STATUS_RUNNING, started_at=timezone.now(), updated_at=timezone.now()
+    )
+
+    try:
+        result = SYNC_FUNCTIONS[job.kind](
+            stream_latest(), progress=lambda stats: _save_progress(job_id, stats)
+        )
+    except FeedError as e:
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.STATUS_FAILED, error=f"{e} {e.body or ''}".strip(), finished_at=timezone.now()
+        )
+        return None
+    except Exception:
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.STATUS_FAILED, error=traceback.format_exc(), finished_at=timezone.now()
+        )
+        raise
+
+    _save_progress(job_id, result, status=ImportJob.STATUS_SUCCEEDED, result=result, finished_at=timezone.now())
+    return result
@@ -0,0 +1,153 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .feed import chunked
+from .models import LatestNAV, Portfolio, PortfolioSummary, Transaction
+
+# Users whose PortfolioSummary is recomputed per aggregate query
+SUMMARY_BATCH_SIZE = 1000
+
+
+def signed_units():
+    """Units of a transaction as they count towards the holding: redemptions are negative."""
+    return Case(
+        When(kind=Transaction.KIND_SELL, then=-F("units")),
+        default=F("units"),
+        output_field=FloatField(),
+    )
+
+
+def held_units(user, scheme_id):
+    total = Transaction.objects.filter(user=user, scheme_id=scheme_id).aggregate(units=Sum(signed_units()))["units"]
+    return total or 0.0
+
+
+def sync_holdings(user, scheme_ids):
+    """
+    Recompute the user's Portfolio rows for `scheme_ids` from the ledger: units
+    are the net of all transactions and the value uses LatestNAV.
+    """
+    scheme_ids = set(scheme_ids)
+    totals = dict(
+        Transaction.objects.filter(user=user, scheme_id__in=scheme_ids)
+        .values("scheme_id")
+        .annotate(units=Sum(signed_units()))
+        .values_list("scheme_id", "units")
+    )
+    latest = dict(LatestNAV.objects.filter(scheme_id__in=scheme_ids).values_list("scheme_id", "nav"))
+    holdings = {holding.scheme_id: holding for holding in Portfolio.objects.filter(user=user, scheme_id__in=scheme_ids)}
+
+    now = timezone.now()
+    new_holdings, changed_holdings = [], []
+    for scheme_id in scheme_ids:
+        units = round(totals.get(scheme_id) or 0.0, 6)
+        nav = latest.get(scheme_id, 0.0)
+        holding = holdings.get(scheme_id)
+        if holding is None:
+            holding = Portfolio(user=user, scheme_id=scheme_id)
+            new_holdings.append(holding)
+        else:
+            changed_holdings.append(holding)
+        holding.units = units
+        holding.current_nav = nav
+        holding.current_value = round(units * nav, 2)
+        holding.last_updated = now
+
+    Portfolio.objects.bulk_create(new_holdings)
+    Portfolio.objects.bulk_update(changed_holdings, ["units", "current_nav", "current_value", "last_updated"])
+    refresh_summaries([user.pk])
+    return new_holdings + changed_holdings
+
+
+def holders_of(scheme_ids):
+    """Ids of the users holding any of `scheme_ids`."""
+    if not scheme_ids:
+        return set()
+    return set(Portfolio.objects.filter(scheme_id__in=scheme_ids).values_list("user_id", flat=True).distinct())
+
+
+def refresh_summaries(user_ids, batch_size=SUMMARY_BATCH_SIZE):
+    """
+    Recompute PortfolioSummary for `user_ids` only, with two grouped aggregates
+    and one upsert per batch of users. Returns the number of summaries written.
+    """
+    written = 0
+    for chunk in chunked(sorted(user_ids), batch_size):
+        totals = {
+            row["user_id"]: row
+            for row in Portfolio.objects.filter(user_id__in=chunk)
+            .values("user_id")
+            .annotate(
+                holdings=Count("id", filter=Q(units__gt=0)),
+                current_value=Sum(F("units") * F("scheme__latest_nav__nav")),
+                previous_value=Sum(F("units") * Coalesce("scheme__latest_nav__previous_nav", "scheme__latest_nav__nav")),
+                last_nav_date=Max("scheme__latest_nav__date"),
+            )
+        }
+        invested = dict(
+            Transaction.objects.filter(user_id__in=chunk)
+            .values("user_id")
+            .annotate(total=Sum(signed_units() * F("price")))
+            .values_list("user_id", "total")
+        )
+
+        summaries = []
+        for user_id in chunk:
+            row = totals.get(user_id, {})
+            current_value = row.get("current_value") or 0.0
+            summaries.append(PortfolioSummary(
+                user_id=user_id,
+                holdings=row.get("holdings", 0),
+                invested=round(invested.get(user_id) or 0.0, 2),
+                current_value=round(current_value, 2),
+                day_change=round(current_value - (row.get("previous_value") or 0.0), 2),
+                last_nav_date=row.get("last_nav_date"),
+            ))
+        PortfolioSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["holdings", "invested", "current_value", "day_change", "last_nav_date", "updated_at"],
+        )
+        written += len(summaries)
+    return written
+
+
+def rebuild_summaries(batch_size=SUMMARY_BATCH_SIZE):
+    """Recompute every PortfolioSummary from scratch. Returns the number written."""
+    user_ids = set(Portfolio.objects.values_list("user_id", flat=True).distinct())
+    user_ids |= set(Transaction.objects.values_list("user_id", flat=True).distinct())
+    with transaction.atomic():
+        PortfolioSummary.objects.all().delete()
+        return refresh_summaries(user_ids, batch_size=batch_size)
+
+
+def record_transactions(user, transactions):
+    """
+    Save transactions (dicts of Transaction fields) of `user` and bring the
+    affected holdings in line with the ledger. Raises ValueError, saving nothing,
+    if a redemption would leave a holding with negative units at any point.
+    """
+    with transaction.atomic():
+        created = Transaction.objects.bulk_create([Transaction(user=user, **fields) for fields in transactions])
+        scheme_ids = {item.scheme_id for item in created}
+        _check_running_units(user, scheme_ids)
+        sync_holdings(user, scheme_ids)
+    return created
+
+
+def _check_running_units(user, scheme_ids):
+    """Raise ValueError if a scheme's units go negative anywhere in the ledger, in (date, id) order."""
+    balances = {}
+    rows = (
+        Transaction.objects.filter(user=user, scheme_id__in=scheme_ids)
+        .order_by("date", "id")
+        .values_list("scheme_id", "kind", "date", "units")
+    )
+    for scheme_id, kind, entry_date, units in rows:
+        balance = balances.get(scheme_id, 0.0) + (-units if kind == Transaction.KIND_SELL else units)
+        if round(balance, 6) < 0:
+            raise ValueError(f"Cannot sell more units than are held on {entry_date.isoformat()}")
+        balances[scheme_id] = balance
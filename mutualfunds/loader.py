@@ -0,0 +1,88 @@
+"""
+Bulk loading through PostgreSQL COPY.
+
+Rows are streamed with COPY FROM STDIN into a temporary staging table with the
+target's columns, then merged with a single INSERT ... SELECT ... ON CONFLICT.
+Other databases fall back to bulk_create with the same conflict handling.
+"""
+import io
+
+from django.db import connection, transaction
+
+from .feed import chunked
+
+# Rows buffered per COPY under psycopg2, whose copy_expert reads from a file
+COPY_BUFFER_ROWS = 10000
+
+# Rows per INSERT of the bulk_create fallback
+BATCH_SIZE = 2000
+
+
+def _copy_value(value):
+    """A value in COPY's text format."""
+    if value is None:
+        return r"\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _copy_rows(cursor, sql, rows):
+    raw = cursor.cursor
+    if hasattr(raw, "copy"):
+        # psycopg 3 streams rows as they come
+        with raw.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+        return
+    for chunk in chunked(rows, COPY_BUFFER_ROWS):
+        data = "".join("\t".join(_copy_value(value) for value in row) + "\n" for row in chunk)
+        raw.copy_expert(sql, io.StringIO(data))
+
+
+def copy_upsert(model, fields, rows, unique_fields, update_fields=None):
+    """
+    Insert `rows`, tuples of values for the model fields `fields`. Rows conflicting
+    on `unique_fields` get their `update_fields` overwritten, or are left alone if
+    there are none. Rows must be unique on `unique_fields`, as one statement may
+    only touch a row once. Returns the number of rows inserted or updated.
+    """
+    if connection.vendor != "postgresql":
+        return _bulk_create_upsert(model, fields, rows, unique_fields, update_fields)
+
+    quote = connection.ops.quote_name
+
+    def columns(names):
+        return ", ".join(quote(model._meta.get_field(name).column) for name in names)
+
+    table = quote(model._meta.db_table)
+    staging = quote(f"{model._meta.db_table}_staging")
+    if update_fields:
+        action = "DO UPDATE SET " + ", ".join(
+            f"{column} = EXCLUDED.{column}" for column in columns(update_fields).split(", ")
+        )
+    else:
+        action = "DO NOTHING"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Same column types as the target, but no constraints or indexes to maintain
+        cursor.execute(f"CREATE TEMPORARY TABLE {staging} AS SELECT {columns(fields)} FROM {table} WITH NO DATA")
+        _copy_rows(cursor, f"COPY {staging} ({columns(fields)}) FROM STDIN", rows)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns(fields)}) SELECT {columns(fields)} FROM {staging} "
+            f"ON CONFLICT ({columns(unique_fields)}) {action}"
+        )
+        merged = cursor.rowcount
+        cursor.execute(f"DROP TABLE {staging}")
+    return merged
+
+
+def _bulk_create_upsert(model, fields, rows, unique_fields, update_fields):
+    written = 0
+    for chunk in chunked((model(**dict(zip(fields, row))) for row in rows), BATCH_SIZE):
+        if update_fields:
+            model.objects.bulk_create(
+                chunk, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields
+            )
+        else:
+            model.objects.bulk_create(chunk, ignore_conflicts=True)
+        written += len(chunk)
+    return written
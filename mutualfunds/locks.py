@@ -0,0 +1,94 @@
+import threading
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+from redis.exceptions import LockError
+
+LOCK_KEY = "lock:{}"
+
+# One NAV update at a time: the lock covers the fetch, every chunk and the callback.
+# Backfills take it too while they move LatestNAV.
+NAV_LOCK_NAME = "update_nav_and_portfolio"
+
+_client = None
+
+
+def get_redis():
+    """Process-wide Redis client for locks."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.LOCK_REDIS_URL)
+    return _client
+
+
+class LockBusy(Exception):
+    """Raised when a job cannot start because another one holds its lock."""
+
+
+class JobLock:
+    """
+    Redis lock for a job that may span several Celery tasks.
+
+    The lock expires `timeout` seconds after the last acquire or heartbeat, so a
+    crashed run cannot block the next one forever. Its token can be handed to
+    other tasks, which then heartbeat and release it as the owner.
+    """
+
+    def __init__(self, name, timeout, token=None, client=None):
+        self.name = name
+        self.timeout = timeout
+        self.lock = (client or get_redis()).lock(LOCK_KEY.format(name), timeout=timeout, thread_local=False)
+        if token:
+            self.lock.local.token = token.encode()
+
+    @property
+    def token(self):
+        token = self.lock.local.token
+        return token.decode() if token else None
+
+    def acquire(self):
+        return self.lock.acquire(blocking=False)
+
+    def is_locked(self):
+        return self.lock.locked()
+
+    def heartbeat(self):
+        """Push the expiry back to a full `timeout`. Returns False if the lock is no longer ours."""
+        try:
+            self.lock.reacquire()
+            return True
+        except LockError:
+            return False
+
+    def release(self):
+        try:
+            self.lock.release()
+            return True
+        except LockError:
+            return False
+
+
+def nav_lock(token=None):
+    return JobLock(NAV_LOCK_NAME, settings.NAV_LOCK_TIMEOUT, token=token)
+
+
+@contextmanager
+def heartbeat(lock, interval=None):
+    """Keep `lock` alive from a background thread while the block runs."""
+    interval = interval or max(lock.timeout / 3, 1)
+    stopped = threading.Event()
+
+    def beat():
+        while not stopped.wait(interval):
+            if not lock.heartbeat():
+                print(f">>> Lost lock {lock.name}, it expired or was taken over.")
+                return
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{lock.name}", daemon=True)
+    thread.start()
+    try:
+        yield lock
+    finally:
+        stopped.set()
+        thread.join()
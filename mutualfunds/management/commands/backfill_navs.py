@@ -0,0 +1,66 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from mutualfunds.backfill import create_backfill, finish_backfill, load_chunk, unfinished_chunks
+from mutualfunds.locks import LockBusy
+from mutualfunds.models import NAVBackfill
+from mutualfunds.tasks import run_nav_backfill
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill NAV history over a date range, for every scheme or the given scheme codes. "
+        "The range is split into chunks loaded by parallel Celery tasks; --resume continues "
+        "an interrupted backfill from its checkpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start_date", type=date.fromisoformat, help="First day, YYYY-MM-DD")
+        parser.add_argument("--to", dest="end_date", type=date.fromisoformat, help="Last day (default: today)")
+        parser.add_argument("--scheme", dest="scheme_codes", type=int, action="append",
+                            help="Scheme code to backfill; repeat for several (default: all schemes)")
+        parser.add_argument("--chunk-days", type=int, help="Days per chunk (default: NAV_BACKFILL_CHUNK_DAYS)")
+        parser.add_argument("--resume", metavar="BACKFILL_ID", help="Resume an interrupted backfill")
+        parser.add_argument("--sync", action="store_true", help="Load the chunks in this process, one after another")
+
+    def handle(self, *args, **options):
+        if options["resume"]:
+            try:
+                backfill = NAVBackfill.objects.get(pk=options["resume"])
+            except (NAVBackfill.DoesNotExist, ValidationError):
+                raise CommandError(f"No backfill {options['resume']}.")
+        elif options["start_date"]:
+            try:
+                backfill = create_backfill(
+                    options["start_date"], options["end_date"] or date.today(),
+                    scheme_codes=options["scheme_codes"], chunk_days=options["chunk_days"],
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+        else:
+            raise CommandError("Give --from to start a backfill or --resume to continue one.")
+
+        if not options["sync"]:
+            run_nav_backfill.delay(str(backfill.pk))
+            self.stdout.write(self.style.SUCCESS(f"Backfill {backfill.pk} queued."))
+            return
+
+        NAVBackfill.objects.filter(pk=backfill.pk).update(status=NAVBackfill.STATUS_RUNNING)
+        for chunk_id in unfinished_chunks(backfill.pk):
+            result = load_chunk(chunk_id)
+            message = f"{result['start_date']} to {result['end_date']}: {result['loaded']} NAVs"
+            if result["error"]:
+                self.stderr.write(f"{message}, failed at {result['error']}")
+            else:
+                self.stdout.write(message)
+
+        try:
+            totals = finish_backfill(backfill.pk)
+        except LockBusy:
+            raise CommandError(f"A NAV update is running. Rerun with --resume {backfill.pk} once it has finished.")
+        summary = f"Backfill {backfill.pk}: {totals['loaded']} NAVs loaded"
+        if totals["failed_chunks"]:
+            raise CommandError(f"{summary}, {totals['failed_chunks']} chunks failed. Rerun with --resume {backfill.pk}.")
+        self.stdout.write(self.style.SUCCESS(summary + "."))
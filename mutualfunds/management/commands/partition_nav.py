@@ -0,0 +1,104 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from mutualfunds.models import NAV
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the NAV table to PostgreSQL declarative range partitions by year, "
+        "or add missing yearly partitions if it is already partitioned."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start-year", type=int, help="First yearly partition (default: oldest NAV year)")
+        parser.add_argument("--end-year", type=int, help="Last yearly partition (default: next year)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("NAV partitioning is only supported on PostgreSQL.")
+
+        table = NAV._meta.db_table
+        end_year = options["end_year"] or date.today().year + 1
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if self.is_partitioned(cursor, table):
+                start_year = options["start_year"] or date.today().year
+                created = self.create_partitions(cursor, table, start_year, end_year)
+                self.stdout.write(self.style.SUCCESS(f"{table} is already partitioned, {created} partitions added."))
+                return
+
+            cursor.execute(f"SELECT MIN(date) FROM {table}")
+            oldest = cursor.fetchone()[0]
+            start_year = options["start_year"] or (oldest.year if oldest else date.today().year)
+            self.convert(cursor, table, start_year, end_year)
+
+        self.stdout.write(self.style.SUCCESS(f"{table} partitioned by year from {start_year} to {end_year}."))
+
+    def is_partitioned(self, cursor, table):
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [table])
+        return cursor.fetchone() is not None
+
+    def create_partitions(self, cursor, table, start_year, end_year):
+        created = 0
+        for year in range(start_year, end_year + 1):
+            cursor.execute("SELECT to_regclass(%s)", [f"{table}_y{year}"])
+            if cursor.fetchone()[0] is not None:
+                continue
+            cursor.execute(
+                f"CREATE TABLE {table}_y{year} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            )
+            created += 1
+        return created
+
+    def convert(self, cursor, table, start_year, end_year):
+        # Capture the unique/foreign key constraints and secondary indexes so they can be replayed
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('u', 'f')",
+            [table],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT i.indisprimary "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+            [table],
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+        # Identity columns cannot live on a partitioned table, so ids come from a plain sequence
+        cursor.execute(f"CREATE SEQUENCE {table}_partitioned_id_seq")
+        cursor.execute(
+            f"CREATE TABLE {table} ("
+            f"id bigint NOT NULL DEFAULT nextval('{table}_partitioned_id_seq'), "
+            f"date date NOT NULL, "
+            f"nav double precision NOT NULL, "
+            f"scheme_id bigint NOT NULL"
+            f") PARTITION BY RANGE (date)"
+        )
+        self.create_partitions(cursor, table, start_year, end_year)
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        cursor.execute(
+            f"INSERT INTO {table} (id, date, nav, scheme_id) "
+            f"SELECT id, date, nav, scheme_id FROM {table}_unpartitioned"
+        )
+        cursor.execute(
+            f"SELECT setval('{table}_partitioned_id_seq', COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        )
+        cursor.execute(f"DROP TABLE {table}_unpartitioned")
+
+        # Build keys and indexes once the data is in place; the primary key must include the partition key
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, date)")
+        for name, definition in constraints:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {connection.ops.quote_name(name)} {definition}")
+        for definition in indexes:
+            cursor.execute(definition)
+
+        cursor.execute(f"ALTER SEQUENCE {table}_partitioned_id_seq RENAME TO {table}_id_seq")
+        cursor.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from mutualfunds.ingestion import BATCH_SIZE, rebuild_latest_navs
+
+
+class Command(BaseCommand):
+    help = "Rebuild the LatestNAV table from the full NAV history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = rebuild_latest_navs(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"LatestNAV rebuilt for {written} schemes."))
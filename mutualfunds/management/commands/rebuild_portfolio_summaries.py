@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from mutualfunds.ledger import SUMMARY_BATCH_SIZE, rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild every user's PortfolioSummary from holdings, the ledger and LatestNAV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=SUMMARY_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = rebuild_summaries(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Portfolio summaries rebuilt for {written} users."))
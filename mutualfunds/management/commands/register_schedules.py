@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from mutualfunds.schedule import register_nav_schedule
+
+
+class Command(BaseCommand):
+    help = "Create or update the periodic tasks from settings. Also runs after every migrate."
+
+    def handle(self, *args, **options):
+        task = register_nav_schedule()
+        self.stdout.write(self.style.SUCCESS(f"Registered '{task.name}' on crontab {task.crontab}."))
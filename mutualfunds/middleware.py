@@ -0,0 +1,41 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import astick_to_primary, replica_alias, stick_to_primary
+
+
+class StickyPrimaryMiddleware:
+    """After a user's successful write, keep their reads on the primary for REPLICA_STICKY_SECONDS."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Under ASGI the middleware chain runs without a thread hop
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user = self.writer(request, response)
+        if user is not None:
+            stick_to_primary(user)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user = self.writer(request, response)
+        if user is not None:
+            await astick_to_primary(user)
+        return response
+
+    def writer(self, request, response):
+        """The user who just wrote something, if any."""
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not replica_alias():
+            return None
+        # DRF and the async views put the token-authenticated user on the Django request
+        user = getattr(request, "user", None)
+        return user if user is not None and user.is_authenticated else None
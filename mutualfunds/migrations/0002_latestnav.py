@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mutualfunds', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestNAV',
+            fields=[
+                ('scheme', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_nav', serialize=False, to='mutualfunds.scheme')),
+                ('date', models.DateField()),
+                ('nav', models.FloatField()),
+            ],
+        ),
+    ]
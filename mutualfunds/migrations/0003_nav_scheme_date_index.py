@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mutualfunds', '0002_latestnav'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='nav',
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name='nav',
+            index=models.Index(fields=['scheme', '-date'], include=('nav',), name='nav_scheme_date_desc_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mutualfunds', '0004_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchemeMetrics',
+            fields=[
+                ('scheme', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to='mutualfunds.scheme')),
+                ('as_of', models.DateField()),
+                ('start_date', models.DateField()),
+                ('cagr', models.FloatField(null=True)),
+                ('return_1y', models.FloatField(null=True)),
+                ('return_3y', models.FloatField(null=True)),
+                ('return_5y', models.FloatField(null=True)),
+                ('rolling_1y', models.FloatField(null=True)),
+                ('rolling_3y', models.FloatField(null=True)),
+                ('rolling_5y', models.FloatField(null=True)),
+                ('volatility', models.FloatField(null=True)),
+                ('sharpe', models.FloatField(null=True)),
+                ('max_drawdown', models.FloatField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def opening_price(NAV, LatestNAV, holding):
+    """NAV of the holding's scheme on (or last before) its date, else its latest NAV; None if there is none."""
+    price = (
+        NAV.objects.filter(scheme_id=holding.scheme_id, date__lte=holding.last_updated.date(), nav__gt=0)
+        .order_by('-date').values_list('nav', flat=True).first()
+    )
+    if not price:
+        price = LatestNAV.objects.filter(scheme_id=holding.scheme_id, nav__gt=0).values_list('nav', flat=True).first()
+    return price or (holding.current_nav if holding.current_nav and holding.current_nav > 0 else None)
+
+
+def open_ledger(apps, schema_editor):
+    """
+    Record every existing holding as an opening purchase at the scheme's NAV on its
+    date, and merge duplicate (user, scheme) holdings into one row. Holdings of
+    schemes without any NAV get no opening purchase and are reported instead.
+    """
+    Portfolio = apps.get_model('mutualfunds', 'Portfolio')
+    Transaction = apps.get_model('mutualfunds', 'Transaction')
+    NAV = apps.get_model('mutualfunds', 'NAV')
+    LatestNAV = apps.get_model('mutualfunds', 'LatestNAV')
+
+    openings, unpriced, merged = [], [], {}
+    for holding in Portfolio.objects.order_by('id').iterator():
+        key = (holding.user_id, holding.scheme_id)
+        if key in merged:
+            merged[key][1].append(holding.id)
+        else:
+            merged[key] = (holding, [])
+        if holding.units <= 0:
+            continue
+        price = opening_price(NAV, LatestNAV, holding)
+        if price is None:
+            unpriced.append(holding.id)
+            continue
+        openings.append(Transaction(
+            user_id=holding.user_id,
+            scheme_id=holding.scheme_id,
+            kind='buy',
+            date=holding.last_updated.date(),
+            units=holding.units,
+            price=price,
+        ))
+    Transaction.objects.bulk_create(openings, batch_size=2000)
+
+    for (user_id, scheme_id), (kept, duplicates) in merged.items():
+        if not duplicates:
+            continue
+        rows = Portfolio.objects.filter(id__in=[kept.id, *duplicates])
+        units = sum(units for units in rows.values_list('units', flat=True) if units > 0)
+        Portfolio.objects.filter(id=kept.id).update(units=units, current_value=round(units * kept.current_nav, 2))
+        Portfolio.objects.filter(id__in=duplicates).delete()
+    if unpriced:
+        print(f"\n  No NAV to open the ledger at for holdings {unpriced}; they have no opening purchase")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mutualfunds', '0005_schememetrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell'), ('sip', 'SIP instalment')], max_length=10)),
+                ('date', models.DateField()),
+                ('units', models.FloatField()),
+                ('price', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('scheme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mutualfunds.scheme')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'scheme', 'date'], name='transaction_user_scheme_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='portfolio',
+            constraint=models.UniqueConstraint(fields=('user', 'scheme'), name='unique_portfolio_holding'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mutualfunds', '0006_transaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='portfolio_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('holdings', models.PositiveIntegerField(default=0)),
+                ('invested', models.FloatField(default=0.0)),
+                ('current_value', models.FloatField(default=0.0)),
+                ('day_change', models.FloatField(default=0.0)),
+                ('last_nav_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='latestnav',
+            name='previous_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='latestnav',
+            name='previous_nav',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
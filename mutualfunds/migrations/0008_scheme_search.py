@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    """
+    GIN full-text index behind scheme name search. The expression is the one
+    SearchVector('scheme_name', config='simple') compiles to. Other databases
+    search without it.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS scheme_name_search_idx ON mutualfunds_scheme '
+        "USING gin (to_tsvector('simple'::regconfig, COALESCE(scheme_name, '')))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS scheme_name_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mutualfunds', '0007_portfoliosummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheme',
+            index=models.Index(fields=['isin_growth'], name='scheme_isin_growth_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheme',
+            index=models.Index(fields=['isin_reinvestment'], name='scheme_isin_reinvest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheme',
+            index=models.Index(fields=['scheme_category', 'scheme_type'], name='scheme_category_type_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
@@ -49,6 +51,14 @@ class Scheme(models.Model):
     isin_reinvestment = models.CharField(max_length=20, blank=True, null=True) 
     is_open_ended = models.BooleanField(default=False)  
 
+    class Meta:
+        # Name search uses a full-text GIN index, created in migration 0008 on PostgreSQL only
+        indexes = [
+            models.Index(fields=['isin_growth'], name='scheme_isin_growth_idx'),
+            models.Index(fields=['isin_reinvestment'], name='scheme_isin_reinvest_idx'),
+            models.Index(fields=['scheme_category', 'scheme_type'], name='scheme_category_type_idx'),
+        ]
+
     def __str__(self):
         return f"{self.scheme_name} ({self.scheme_code})"
 
@@ -60,12 +70,49 @@ class NAV(models.Model):
 
     class Meta:
         unique_together = ('scheme', 'date')
-        ordering = ['-date']
+        # No default ordering: sort explicitly where it is needed
+        indexes = [
+            # Latest-NAV and history-range lookups are index-only scans
+            models.Index(fields=['scheme', '-date'], include=['nav'], name='nav_scheme_date_desc_idx'),
+        ]
 
     def __str__(self):
         return f"{self.scheme.scheme_name} - {self.date} - {self.nav}"
 
 
+class LatestNAV(models.Model):
+    # One row per scheme, kept in step with NAV by the ingestion task
+    scheme = models.OneToOneField(Scheme, on_delete=models.CASCADE, primary_key=True, related_name='latest_nav')
+    date = models.DateField()
+    nav = models.FloatField()
+    # NAV before `date`, for day-on-day changes
+    previous_date = models.DateField(null=True, blank=True)
+    previous_nav = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.scheme_id} - {self.date} - {self.nav}"
+
+
+class SchemeMetrics(models.Model):
+    # Return and risk figures per scheme, recomputed from NAV history after each ingestion
+    scheme = models.OneToOneField(Scheme, on_delete=models.CASCADE, primary_key=True, related_name='metrics')
+    as_of = models.DateField()
+    start_date = models.DateField()
+    cagr = models.FloatField(null=True)
+    return_1y = models.FloatField(null=True)
+    return_3y = models.FloatField(null=True)
+    return_5y = models.FloatField(null=True)
+    rolling_1y = models.FloatField(null=True)
+    rolling_3y = models.FloatField(null=True)
+    rolling_5y = models.FloatField(null=True)
+    volatility = models.FloatField(null=True)
+    sharpe = models.FloatField(null=True)
+    max_drawdown = models.FloatField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.scheme_id} metrics as of {self.as_of}"
+
 
 class Portfolio(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -75,9 +122,159 @@ class Portfolio(models.Model):
     current_value = models.FloatField(default=0.0)
     last_updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # One holding per scheme; its units are the net of the user's ledger
+            models.UniqueConstraint(fields=['user', 'scheme'], name='unique_portfolio_holding'),
+        ]
+
     def update_current_value(self):
         self.current_value = self.units * self.current_nav
         self.save()
 
     def __str__(self):
         return f"{self.user.username} - {self.scheme.scheme_name}"
+
+
+class Transaction(models.Model):
+    # Ledger of purchases and redemptions; Portfolio units are derived from it
+    KIND_BUY = 'buy'
+    KIND_SELL = 'sell'
+    KIND_SIP = 'sip'
+    KIND_CHOICES = [
+        (KIND_BUY, 'Buy'),
+        (KIND_SELL, 'Sell'),
+        (KIND_SIP, 'SIP instalment'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transactions')
+    scheme = models.ForeignKey(Scheme, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    date = models.DateField()
+    units = models.FloatField()
+    price = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'scheme', 'date'], name='transaction_user_scheme_idx'),
+        ]
+
+    @property
+    def amount(self):
+        return round(self.units * self.price, 2)
+
+    def __str__(self):
+        return f"{self.user_id} {self.kind} {self.units} of {self.scheme_id} on {self.date}"
+
+
+class PortfolioSummary(models.Model):
+    # Per-user totals, refreshed for the affected users whenever their holdings or NAVs change
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name='portfolio_summary')
+    holdings = models.PositiveIntegerField(default=0)
+    invested = models.FloatField(default=0.0)
+    current_value = models.FloatField(default=0.0)
+    day_change = models.FloatField(default=0.0)
+    last_nav_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.current_value}"
+
+
+class ImportJob(models.Model):
+    KIND_FUND_HOUSES = 'fund_houses'
+    KIND_SCHEMES = 'schemes'
+    KIND_CHOICES = [
+        (KIND_FUND_HOUSES, 'Fund houses'),
+        (KIND_SCHEMES, 'Schemes'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    processed = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Duplicate triggers coalesce onto the one active import of a kind
+            models.UniqueConstraint(
+                fields=['kind'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_import_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} import {self.id} ({self.status})"
+
+
+
+class NAVBackfill(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    # None backfills every scheme in the catalogue
+    scheme_codes = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    loaded = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"NAV backfill {self.start_date} to {self.end_date} ({self.status})"
+
+
+class NAVBackfillChunk(models.Model):
+    """A range of consecutive days of a backfill, loaded by one task."""
+    backfill = models.ForeignKey(NAVBackfill, on_delete=models.CASCADE, related_name='chunks')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    # Checkpoint: the last day whose NAVs are stored, so a rerun resumes the day after
+    loaded_through = models.DateField(null=True, blank=True)
+    loaded = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=NAVBackfill.STATUS_CHOICES, default=NAVBackfill.STATUS_PENDING)
+    error = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['start_date']
+        unique_together = ('backfill', 'start_date')
+
+    def __str__(self):
+        return f"{self.start_date} to {self.end_date} ({self.status})"
@@ -0,0 +1,51 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination: each page continues from the last ordering value of the
+    previous one, so deep pages cost the same as the first. `ordering` must be a unique,
+    indexed column.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = 'id'
+
+    def get_paginated_data(self, data):
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+
+class SchemeKeysetPagination(KeysetPagination):
+    ordering = 'scheme_code'
+
+
+class FundHouseKeysetPagination(KeysetPagination):
+    ordering = 'name'
+
+
+class TransactionKeysetPagination(KeysetPagination):
+    # Newest entries first
+    ordering = '-id'
+
+
+class SchemeSearchPagination(PageNumberPagination):
+    """
+    Numbered pages for ranked search results: the rank is not a unique column, so
+    keyset pagination does not apply, and searches are rarely paged deeply.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_data(self, data):
+        return {
+            "count": self.page.paginator.count,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
@@ -0,0 +1,225 @@
+import asyncio
+import io
+import random
+import weakref
+from email.utils import formatdate
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+# Responses worth retrying; anything else is returned to the caller as is
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+VALIDATORS_KEY = "rapidapi-validators:{}"
+
+
+def recorded_response(directory, url, if_none_match=None):
+    """
+    (status, headers, body file or bytes) of the recording answering `url`, e.g. GET /latest
+    is answered with <directory>/latest.json and GET /historical?Date=16-Jun-2025 with
+    <directory>/historical/Date=16-Jun-2025.json. Honours If-None-Match with the file's ETag.
+    """
+    parts = urlparse(url)
+    path = parts.path.strip("/") or "index"
+    if parts.query:
+        path = f"{path}/{unquote(parts.query)}"
+    recording = Path(directory) / f"{path}.json"
+    if not recording.is_file():
+        return 404, {}, b'{"message": "No recording for this path"}'
+
+    stat = recording.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "Content-Type": "application/json",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+    if if_none_match == etag:
+        return 304, headers, b""
+    return 200, headers, open(recording, "rb")
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport that serves recorded responses from a local directory instead of the network.
+    Supports ETag and Last-Modified validators, so conditional requests can be exercised offline.
+    """
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = Path(directory)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        status, headers, body = recorded_response(self.directory, request.url, request.headers.get("If-None-Match"))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.encoding = "utf-8"
+        response.status_code = status
+        response.reason = {200: "OK", 304: "Not Modified", 404: "Not Found"}[status]
+        response.headers = CaseInsensitiveDict(headers)
+        response.raw = io.BytesIO(body) if isinstance(body, bytes) else body
+        return response
+
+    def close(self):
+        pass
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """ReplayAdapter for the async client."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    async def handle_async_request(self, request):
+        status, headers, body = recorded_response(self.directory, str(request.url), request.headers.get("If-None-Match"))
+        if not isinstance(body, bytes):
+            with body:
+                body = body.read()
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+
+def conditional_headers(validators):
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+class RapidAPIClient:
+    """RapidAPI client sharing one keep-alive connection pool, with bounded, jittered retries."""
+
+    def __init__(self, host, api_key, timeout=60, retries=3, backoff_factor=0.5, backoff_jitter=0.5,
+                 pool_maxsize=10, replay_dir=None):
+        self.base_url = f"https://{host}"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-RapidAPI-Key": api_key,
+            "X-RapidAPI-Host": host,
+        })
+
+        if replay_dir:
+            self.session.mount(self.base_url, ReplayAdapter(replay_dir))
+        else:
+            retry = Retry(
+                total=retries,
+                backoff_factor=backoff_factor,
+                backoff_jitter=backoff_jitter,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(["GET"]),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry))
+
+    def get(self, path, validators=None, stream=False, params=None):
+        return self.session.get(
+            f"{self.base_url}{path}", params=params, headers=conditional_headers(validators), timeout=self.timeout,
+            stream=stream,
+        )
+
+
+class AsyncRapidAPIClient:
+    """
+    httpx counterpart of RapidAPIClient for async views: waiting on RapidAPI holds
+    no thread. Same headers, retry policy and replay directory.
+    """
+
+    def __init__(self, host, api_key, timeout=60, retries=3, backoff_factor=0.5, backoff_jitter=0.5,
+                 pool_maxsize=10, replay_dir=None):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        if replay_dir:
+            transport = AsyncReplayTransport(replay_dir)
+        else:
+            # Transport-level retries only cover failed connects; statuses are retried in send()
+            transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=pool_maxsize), retries=retries)
+        self.client = httpx.AsyncClient(
+            base_url=f"https://{host}",
+            headers={"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": host},
+            timeout=timeout,
+            transport=transport,
+        )
+
+    def _delay(self, response, attempt):
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return int(retry_after)
+        return self.backoff_factor * 2 ** attempt + random.uniform(0, self.backoff_jitter)
+
+    async def get(self, path, validators=None):
+        """Streamed response to GET `path`; the caller reads it and calls `aclose()`."""
+        request = self.client.build_request("GET", path, headers=conditional_headers(validators))
+        for attempt in range(self.retries + 1):
+            response = await self.client.send(request, stream=True)
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            await response.aclose()
+            await asyncio.sleep(self._delay(response, attempt))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def response_validators(response):
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    return {name: value for name, value in validators.items() if value}
+
+
+def load_validators(key):
+    return cache.get(VALIDATORS_KEY.format(key))
+
+
+def save_validators(key, validators):
+    cache.set(VALIDATORS_KEY.format(key), validators, timeout=None)
+
+
+_client = None
+
+
+def get_client():
+    """Process-wide client, so every caller reuses the same connection pool."""
+    global _client
+    if _client is None:
+        _client = RapidAPIClient(
+            settings.RAPID_API_HOST,
+            settings.RAPIDAPI_KEY,
+            timeout=settings.RAPIDAPI_TIMEOUT,
+            retries=settings.RAPIDAPI_RETRIES,
+            replay_dir=settings.RAPIDAPI_REPLAY_DIR,
+        )
+    return _client
+
+
+# httpx clients cannot be shared between event loops, so there is one per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Async client of the running event loop, reused by every caller on that loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncRapidAPIClient(
+            settings.RAPID_API_HOST,
+            settings.RAPIDAPI_KEY,
+            timeout=settings.RAPIDAPI_TIMEOUT,
+            retries=settings.RAPIDAPI_RETRIES,
+            replay_dir=settings.RAPIDAPI_REPLAY_DIR,
+        )
+    return client
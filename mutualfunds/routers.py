@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_KEY = "primary-sticky:{}"
+
+_reads = ContextVar("replica_reads", default=None)
+
+
+class ReplicaReads:
+    """Whether reads in the current request may go to the replica; decided once the user is known."""
+
+    def __init__(self):
+        self.enabled = False
+
+
+@contextmanager
+def replica_reads():
+    state = ReplicaReads()
+    token = _reads.set(state)
+    try:
+        yield state
+    finally:
+        _reads.reset(token)
+
+
+def replica_alias():
+    alias = settings.REPLICA_DATABASE
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def stick_to_primary(user):
+    """Serve `user` from the primary for a while after a write, so they read their own writes."""
+    cache.set(STICKY_KEY.format(user.pk), 1, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+async def astick_to_primary(user):
+    await cache.aset(STICKY_KEY.format(user.pk), 1, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user):
+    return user.is_authenticated and cache.get(STICKY_KEY.format(user.pk)) is not None
+
+
+async def ais_sticky(user):
+    return user.is_authenticated and await cache.aget(STICKY_KEY.format(user.pk)) is not None
+
+
+class ReplicaRouter:
+    """
+    Send reads to the replica inside replica_reads() (read-only views); every
+    other read, and all writes and migrations, use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _reads.get()
+        if state is None or not state.enabled:
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.REPLICA_DATABASE:
+            return False
+        return None
@@ -0,0 +1,35 @@
+import json
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+NAV_TASK = "mutualfunds.tasks.update_nav_and_portfolio"
+NAV_TASK_NAME = "Update NAVs and Portfolios"
+
+# Name of the hourly interval task registered by earlier versions
+LEGACY_NAV_TASK_NAME = "Update NAVs and Portfolios Every Hour"
+
+
+def register_nav_schedule(using=None):
+    """
+    Create or update the periodic NAV update from NAV_UPDATE_CRONTAB. Safe to run
+    repeatedly; a changed setting moves the existing task to the new schedule.
+    """
+    from django_celery_beat.models import CrontabSchedule, PeriodicTask
+
+    using = using or DEFAULT_DB_ALIAS
+    minute, hour, day_of_month, month_of_year, day_of_week = settings.NAV_UPDATE_CRONTAB.split()
+    schedule, _ = CrontabSchedule.objects.using(using).get_or_create(
+        minute=minute,
+        hour=hour,
+        day_of_month=day_of_month,
+        month_of_year=month_of_year,
+        day_of_week=day_of_week,
+        timezone=settings.NAV_UPDATE_TIMEZONE,
+    )
+    PeriodicTask.objects.using(using).filter(name=LEGACY_NAV_TASK_NAME).delete()
+    task, _ = PeriodicTask.objects.using(using).update_or_create(
+        name=NAV_TASK_NAME,
+        defaults={"crontab": schedule, "interval": None, "task": NAV_TASK, "args": json.dumps([])},
+    )
+    return task
@@ -0,0 +1,69 @@
+import re
+
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Length
+
+from .models import Scheme
+
+# e.g. INF254K01746; ISINs are matched exactly instead of by name
+ISIN_PATTERN = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+
+# Text search configuration of scheme_name_search_idx: lower-cased words, no stemming
+SEARCH_CONFIG = "simple"
+
+
+
+def search_schemes(q=None, scheme_code=None, isin=None, category=None, scheme_type=None):
+    """
+    Schemes matching the given lookups, best matches first.
+
+    A `q` that is a scheme code or an ISIN is looked up exactly; anything else is
+    a name search where every word of `q` must start a word of the name, so
+    "hdfc liq" finds "HDFC Liquid Fund". Names starting with `q` come first, then
+    shorter names, which carry fewer words beyond the query. On PostgreSQL the
+    match is a full-text query served by the scheme_name_search_idx GIN index;
+    other databases fall back to substring matching.
+    """
+    schemes = Scheme.objects.all()
+    if category:
+        schemes = schemes.filter(scheme_category=category)
+    if scheme_type:
+        schemes = schemes.filter(scheme_type=scheme_type)
+
+    q = (q or "").strip()
+    if q.isdigit() and scheme_code is None:
+        scheme_code = q
+    elif ISIN_PATTERN.match(q.upper()) and not isin:
+        isin = q
+    elif q:
+        return _search_names(schemes, q)
+
+    if scheme_code is not None:
+        schemes = schemes.filter(scheme_code=scheme_code)
+    if isin:
+        isin = isin.strip().upper()
+        schemes = schemes.filter(Q(isin_growth=isin) | Q(isin_reinvestment=isin))
+    return schemes.order_by("scheme_code")
+
+
+def _search_names(schemes, q):
+    words = re.findall(r"\w+", q.lower())
+    if not words:
+        return schemes.none()
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+
+        # Must match the indexed expression for the GIN index to be used
+        vector = SearchVector("scheme_name", config=SEARCH_CONFIG)
+        query = SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config=SEARCH_CONFIG)
+        schemes = schemes.alias(search=vector).filter(search=query)
+    else:
+        matches = Q()
+        for word in words:
+            matches &= Q(scheme_name__icontains=word)
+        schemes = schemes.filter(matches)
+
+    # Cheap to compute for every match, unlike ts_rank, which re-parses each name
+    rank = Case(When(scheme_name__istartswith=q, then=Value(1)), default=Value(0), output_field=IntegerField())
+    return schemes.annotate(rank=rank).order_by(F("rank").desc(), Length("scheme_name"), "scheme_code")
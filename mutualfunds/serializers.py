@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import FundHouse, Scheme, Portfolio
+from .models import FundHouse, Scheme, Portfolio, ImportJob, SchemeMetrics, Transaction, PortfolioSummary
 from django.contrib.auth import get_user_model
 from rest_framework.exceptions import AuthenticationFailed
+from .utils import requested_fields
 
 
 User = get_user_model()
@@ -44,19 +45,104 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         attrs['username'] = user.username  # Important: required by parent serializer
         return super().validate(attrs)
 
-class FundHouseSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """Limit the output to the fields named in the request's ?fields= (or `fields_param`) list."""
+    fields_param = 'fields'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = requested_fields(self.context.get('request'), self.fields_param)
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+class FundHouseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = FundHouse
         fields = '__all__'
 
-class SchemeSerializer(serializers.ModelSerializer):
+class SchemeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Scheme
         fields = '__all__'
 
+class HoldingSchemeSerializer(SchemeSerializer):
+    # Nested scheme of a holding, narrowed with ?scheme_fields=
+    fields_param = 'scheme_fields'
+
 class PortfolioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Portfolio
         fields = ['id', 'scheme', 'units', 'current_nav', 'current_value', 'last_updated']
         read_only_fields = ['id', 'current_nav', 'current_value', 'last_updated']
 
+    def validate_units(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Units must be positive")
+        return value
+
+class PortfolioHoldingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    scheme = HoldingSchemeSerializer(read_only=True)
+    current_value = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Portfolio
+        fields = ['id', 'scheme', 'units', 'current_value', 'last_updated']
+
+    def get_current_value(self, obj):
+        # latest_nav is annotated by PortfolioListCreateView
+        return round(obj.units * (obj.latest_nav or 0.0), 2)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'kind', 'status', 'processed', 'created', 'skipped', 'result', 'error',
+                  'created_at', 'started_at', 'finished_at']
+
+
+class SchemeMetricsSerializer(serializers.ModelSerializer):
+    scheme_code = serializers.IntegerField(source='scheme.scheme_code', read_only=True)
+    scheme_name = serializers.CharField(source='scheme.scheme_name', read_only=True)
+
+    class Meta:
+        model = SchemeMetrics
+        fields = ['scheme_code', 'scheme_name', 'as_of', 'start_date', 'cagr',
+                  'return_1y', 'return_3y', 'return_5y', 'rolling_1y', 'rolling_3y', 'rolling_5y',
+                  'volatility', 'sharpe', 'max_drawdown', 'updated_at']
+
+
+class TransactionSerializer(serializers.ModelSerializer):
+    amount = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Transaction
+        fields = ['id', 'scheme', 'kind', 'date', 'units', 'price', 'amount', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def validate_units(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Units must be positive")
+        return value
+
+    def validate_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Price must be positive")
+        return value
+
+
+class PortfolioSummarySerializer(serializers.ModelSerializer):
+    gain = serializers.SerializerMethodField()
+    day_change_pct = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PortfolioSummary
+        fields = ['holdings', 'invested', 'current_value', 'gain', 'day_change', 'day_change_pct',
+                  'last_nav_date', 'updated_at']
+
+    def get_gain(self, obj):
+        return round(obj.current_value - obj.invested, 2)
+
+    def get_day_change_pct(self, obj):
+        previous_value = obj.current_value - obj.day_change
+        return round(obj.day_change / previous_value * 100, 2) if previous_value else None
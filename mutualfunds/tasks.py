@@ -1,78 +1,202 @@
-from decouple import config
-from celery import shared_task
-from .models import NAV, Scheme, Portfolio
-import requests
-from datetime import datetime
+from celery import chord, shared_task
+from contextlib import nullcontext
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+from .backfill import finish_backfill, load_chunk, unfinished_chunks
+from .feed import FeedError, LatestFeed
+from .ingestion import from_nav_row, ingest_navs, nav_rows, split_by_scheme_code
+from .jobs import run_import_job
+from .locks import LockBusy, heartbeat, nav_lock
+from .models import NAVBackfill
+from .rapidapi import save_validators
+import time
 import traceback
 
-# RapidAPI endpoint
-API_URL = f"https://{config('RAPID_API_HOST')}/latest"
+# Key under which the feed's ETag/Last-Modified are kept between runs
+NAV_FEED_KEY = "update_nav_and_portfolio"
+
+NAV_QUEUED_KEY = "update_nav_and_portfolio:queued"
+
+
+def _skip_or_queue(force):
+    """Handle a run triggered while another holds the lock, per NAV_LOCK_POLICY."""
+    if settings.NAV_LOCK_POLICY == "queue":
+        # At most one follow-up run waits behind the active one
+        if cache.add(NAV_QUEUED_KEY, True, timeout=settings.NAV_LOCK_TIMEOUT):
+            update_nav_and_portfolio.apply_async(
+                kwargs={"force": force, "follow_up": True}, countdown=settings.NAV_LOCK_RETRY_DELAY
+            )
+            print(">>> NAV update already running, queued a follow-up run.")
+            return {"queued": True}
+    print(">>> NAV update already running, skipping this run.")
+    return {"skipped": True}
 
-# Headers with API Key and Host from .env
-HEADERS = {
-    "X-RapidAPI-Key": config("RAPIDAPI_KEY"),
-    "X-RapidAPI-Host": config("RAPID_API_HOST")
-}
 
 # --- Celery Task ---
 @shared_task
-def update_nav_and_portfolio():
+def update_nav_and_portfolio(force=False, follow_up=False):
+    """
+    Fetch the feed and fan it out as a chord of ingest_nav_chunk tasks, one per
+    scheme-code range, with aggregate_nav_chunks as the callback.
+
+    The run holds a Redis lock, heartbeated by whichever task is working and
+    released by the callback. A run triggered meanwhile is skipped or queued.
+    """
     print(">>> Running NAV update task...")
+    if follow_up:
+        cache.delete(NAV_QUEUED_KEY)
+    lock = nav_lock()
+    if not lock.acquire():
+        return _skip_or_queue(force)
+
+    handed_over = False
     try:
-        print(">>> Sending request to:", API_URL)
-        response = requests.get(API_URL, headers=HEADERS, timeout=60)
-
-        print(">>> Status code:", response.status_code)
-        if response.status_code != 200:
-            print(">>> Failed to fetch NAVs. Response:", response.text)
-            return
-
-        data = response.json()
-        print(f">>> Received {len(data)} NAV records")
-
-        today = datetime.today().date()
-        updated = 0
-        skipped = 0
-
-        for item in data:
-            scheme_code = item.get("Scheme_Code")
-            nav_value = item.get("Net_Asset_Value")
-            date_str = item.get("Date")
-
-            if not (scheme_code and nav_value and date_str):
-                skipped += 1
-                continue
-
-            try:
-                nav_date = datetime.strptime(date_str, "%d-%b-%Y").date()
-                scheme = Scheme.objects.get(scheme_code=scheme_code)
-
-                # Update or create NAV entry
-                NAV.objects.update_or_create(
-                    scheme=scheme,
-                    date=nav_date,
-                    defaults={"nav": nav_value}
-                )
-
-                # Update all portfolios linked to this scheme
-                portfolios = Portfolio.objects.filter(scheme=scheme)
-                for p in portfolios:
-                    p.current_nav = nav_value
-                    p.current_value = round(p.units * nav_value, 2)
-                    p.save()
-
-                updated += 1
-
-            except Scheme.DoesNotExist:
-                skipped += 1
-                continue
-            except Exception as inner_e:
-                print(">>> Error processing scheme:", scheme_code, str(inner_e))
-                skipped += 1
-
-        print(f">>> NAV updated: {updated}, Skipped: {skipped}")
-        print(">>> NAV and Portfolio update task completed.")
+        started = time.time()
+        with heartbeat(lock):
+            # Conditional fetch: an unchanged feed answers 304 and nothing is parsed
+            feed = LatestFeed(conditional_key=None if force else NAV_FEED_KEY)
+            print(">>> Streaming NAV records...")
+            rows, skipped = nav_rows(feed)
+
+        if feed.not_modified:
+            print(">>> Feed not modified since the last run, nothing to ingest.")
+            return {"not_modified": True}
+
+        chunks = split_by_scheme_code(rows, settings.NAV_CHUNK_SIZE, settings.NAV_CHUNK_MAX_PARALLEL)
+        print(f">>> Dispatching {len(rows)} NAV records in {len(chunks)} chunks...")
+        # Validators are only saved by the callback, once every chunk has been stored
+        summary = {
+            "received": len(rows) + skipped,
+            "skipped": skipped,
+            "started": started,
+            "validators": feed.validators if feed.conditional_key else None,
+            "lock_token": lock.token,
+        }
+        handed_over = True
+        if not chunks:
+            return aggregate_nav_chunks([], **summary)
+        result = chord(
+            ingest_nav_chunk.s(chunk, force=force, lock_token=lock.token) for chunk in chunks
+        )(aggregate_nav_chunks.s(**summary))
+        return {"records": len(rows), "skipped": skipped, "chunks": len(chunks), "chord": result.id}
+
+    except FeedError as e:
+        print(">>> Failed to fetch NAVs:", e, e.status_code, e.body)
 
     except Exception as e:
         print(">>> Top-level error in task:")
         print(traceback.format_exc())
+
+    finally:
+        if not handed_over:
+            lock.release()
+
+
+# Idempotent upserts, so a failed chunk is simply retried on its own
+@shared_task(autoretry_for=(DatabaseError,), retry_backoff=True, retry_kwargs={"max_retries": 3})
+def ingest_nav_chunk(rows, force=False, lock_token=None):
+    with heartbeat(nav_lock(lock_token)) if lock_token else nullcontext():
+        result = ingest_navs([from_nav_row(row) for row in rows], force=force)
+    result["scheme_codes"] = [rows[0][0], rows[-1][0]] if rows else []
+    print(f">>> Chunk {result['scheme_codes']}: {result['updated']} updated, "
+          f"{result['unchanged']} unchanged, {result['skipped']} skipped in {result['elapsed']}s")
+    return result
+
+
+@shared_task
+def aggregate_nav_chunks(results, received=0, skipped=0, started=None, validators=None, lock_token=None):
+    try:
+        totals = {"received": received, "updated": 0, "unchanged": 0, "skipped": skipped, "chunks": []}
+        for result in results:
+            totals["updated"] += result["updated"]
+            totals["unchanged"] += result["unchanged"]
+            totals["skipped"] += result["skipped"]
+            totals["chunks"].append({
+                "scheme_codes": result["scheme_codes"],
+                "size": result["received"],
+                "batches": len(result["batches"]),
+                "seconds": result["elapsed"],
+            })
+        elapsed = time.time() - started if started else sum(result["elapsed"] for result in results)
+        totals["elapsed"] = round(elapsed, 3)
+        totals["records_per_sec"] = round(received / elapsed, 1) if elapsed else 0.0
+
+        if validators:
+            save_validators(NAV_FEED_KEY, validators)
+        if totals["updated"]:
+            update_scheme_metrics.delay()
+    finally:
+        if lock_token:
+            nav_lock(lock_token).release()
+
+    for number, chunk in enumerate(totals["chunks"], start=1):
+        print(f">>> Chunk {number} {chunk['scheme_codes']}: {chunk['size']} NAVs in {chunk['seconds']}s")
+    print(f">>> NAV updated: {totals['updated']}, Unchanged: {totals['unchanged']}, Skipped: {totals['skipped']}")
+    print(f">>> Ingested {received} records in {totals['elapsed']}s ({totals['records_per_sec']} records/sec)")
+    print(">>> NAV and Portfolio update task completed.")
+    return totals
+
+
+@shared_task
+def update_scheme_metrics():
+    # NumPy is only loaded by the worker that runs this task
+    from .analytics import refresh_scheme_metrics
+
+    print(">>> Refreshing scheme metrics...")
+    result = refresh_scheme_metrics()
+    print(f">>> Metrics for {result['schemes']} schemes in {result['elapsed']}s ({result['schemes_per_sec']} schemes/sec)")
+    return result
+
+
+@shared_task
+def run_catalogue_import(job_id):
+    print(f">>> Running catalogue import {job_id}...")
+    result = run_import_job(job_id)
+    print(f">>> Catalogue import {job_id} finished:", result)
+    return result
+
+
+
+@shared_task
+def run_nav_backfill(backfill_id):
+    """
+    Load a NAV backfill as a chord of backfill_nav_chunk tasks, one per date range,
+    with finish_nav_backfill as the callback. Running it again for the same
+    backfill resumes it: finished chunks are skipped and the others continue
+    from their checkpoint.
+    """
+    chunk_ids = unfinished_chunks(backfill_id)
+    NAVBackfill.objects.filter(pk=backfill_id).update(
+        status=NAVBackfill.STATUS_RUNNING, error="", finished_at=None, updated_at=timezone.now()
+    )
+    print(f">>> Backfill {backfill_id}: dispatching {len(chunk_ids)} chunks...")
+    if not chunk_ids:
+        return finish_nav_backfill([], backfill_id)
+    result = chord(backfill_nav_chunk.s(chunk_id) for chunk_id in chunk_ids)(finish_nav_backfill.s(backfill_id))
+    return {"chunks": len(chunk_ids), "chord": result.id}
+
+
+@shared_task
+def backfill_nav_chunk(chunk_id):
+    result = load_chunk(chunk_id)
+    if result["error"]:
+        print(f">>> Backfill chunk {result['start_date']} to {result['end_date']} failed: {result['error']}")
+    else:
+        print(f">>> Backfill chunk {result['start_date']} to {result['end_date']}: {result['loaded']} NAVs")
+    return result
+
+
+@shared_task(bind=True, max_retries=None)
+def finish_nav_backfill(self, results, backfill_id):
+    try:
+        totals = finish_backfill(backfill_id)
+    except LockBusy:
+        # LatestNAV is only moved while no NAV update runs
+        print(f">>> Backfill {backfill_id}: NAV update running, finishing in {settings.NAV_LOCK_RETRY_DELAY}s.")
+        raise self.retry(countdown=settings.NAV_LOCK_RETRY_DELAY)
+    if totals["loaded"]:
+        update_scheme_metrics.delay()
+    print(f">>> Backfill {backfill_id} finished: {totals['loaded']} NAVs, {totals['failed_chunks']} chunks failed")
+    return totals
@@ -1,12 +1,82 @@
-from rest_framework.test import APITestCase
+import json
+import math
+import time
+from io import StringIO
+from unittest import mock
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase
 from rest_framework import status
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django_celery_beat.models import PeriodicTask
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import FundHouse, Scheme, Portfolio
+from .backfill import create_backfill, date_ranges, finish_backfill, load_chunk
+from .authentication import CachedJWTAuthentication, user_key
+from .analytics import compute_metrics, forward_fill, refresh_scheme_metrics, xirr
+from .caching import cache_stats
+from .catalogue import sync_fund_houses, sync_schemes
+from .feed import FeedError, LatestFeed, parse_feed, parse_record, stream_history
+from .ingestion import ingest_navs, nav_rows, split_by_scheme_code
+from .jobs import run_import_job
+from .ledger import record_transactions
+from .models import (
+    FundHouse, Scheme, Portfolio, NAV, LatestNAV, ImportJob, SchemeMetrics, Transaction, PortfolioSummary, NAVBackfill,
+)
+from .rapidapi import AsyncRapidAPIClient, RapidAPIClient, load_validators
+from .routers import ReplicaRouter
+from .locks import JobLock, LockBusy
+from .schedule import NAV_TASK_NAME, register_nav_schedule
+from . import loader, search
+from .tasks import NAV_FEED_KEY, aggregate_nav_chunks, nav_lock, run_nav_backfill, update_nav_and_portfolio
+from mutualfund_project.celery import app as celery_app
+from mutualfund_project.database import connection_settings
+from .timeseries import lttb, ohlc
 
 User = get_user_model()
 
+TESTDATA_DIR = Path(__file__).resolve().parent / "testdata"
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def load_feed_fixture():
+    with open(TESTDATA_DIR / "latest.json") as f:
+        return json.load(f)
+
+
+def feed_records(items):
+    return [parse_record(item) for item in items]
+
+
+def create_schemes_for_feed(records):
+    fund_houses = {}
+    schemes = []
+    for item in records:
+        name = item["Mutual_Fund_Family"]
+        if name not in fund_houses:
+            fund_houses[name] = FundHouse.objects.create(name=name)
+        schemes.append(Scheme.objects.create(
+            scheme_code=item["Scheme_Code"],
+            scheme_name=item["Scheme_Name"],
+            fund_house=fund_houses[name],
+            scheme_type=item["Scheme_Type"],
+            scheme_category=item["Scheme_Category"],
+            is_open_ended="open" in item["Scheme_Type"].lower()
+        ))
+    return schemes
+
 
 class MutualFundAPITests(APITestCase):
 
@@ -71,6 +141,8 @@ class MutualFundAPITests(APITestCase):
             isin_reinvestment="INF179K01BY2",
             is_open_ended=True
         )
+        # The purchase is recorded at the latest NAV
+        LatestNAV.objects.create(scheme=scheme, date=date(2025, 6, 20), nav=25.0)
         url = reverse('portfolio')
         data = {
             "scheme": scheme.id,
@@ -97,3 +169,1226 @@ class MutualFundAPITests(APITestCase):
         response = self.client.get(url, **self.auth_header)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['message'], "Portfolio fetched")
+
+
+class FeedParserTests(SimpleTestCase):
+
+    def setUp(self):
+        self.body = (TESTDATA_DIR / "latest.json").read_bytes()
+
+    def split(self, body, size):
+        return [body[i:i + size] for i in range(0, len(body), size)]
+
+    def test_parse_feed_across_chunk_boundaries(self):
+        expected = feed_records(load_feed_fixture())
+        for size in (1, 7, 64, len(self.body)):
+            self.assertEqual(list(parse_feed(self.split(self.body, size))), expected)
+
+    def test_parse_record_types(self):
+        record = parse_record({
+            "Scheme_Code": "119551",
+            "Net_Asset_Value": "N.A.",
+            "Date": "20-Jun-2025",
+        })
+        self.assertEqual(record.scheme_code, 119551)
+        self.assertIsNone(record.nav)
+        self.assertEqual(record.nav_date, date(2025, 6, 20))
+
+    def test_truncated_feed_raises(self):
+        with self.assertRaises(FeedError):
+            list(parse_feed(self.split(self.body[:-10], 64)))
+
+    def test_non_array_feed_raises(self):
+        with self.assertRaises(FeedError):
+            list(parse_feed([b'{"message": "You are not subscribed to this API."}']))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RapidAPIClientTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = RapidAPIClient("example.p.rapidapi.com", "test-key", replay_dir=TESTDATA_DIR)
+
+    def test_replay_backend_serves_recorded_feed(self):
+        records = list(LatestFeed(client=self.client))
+        self.assertEqual(records, feed_records(load_feed_fixture()))
+
+    def test_unchanged_feed_is_not_modified_after_commit(self):
+        feed = LatestFeed(conditional_key="test", client=self.client)
+        self.assertEqual(len(list(feed)), len(load_feed_fixture()))
+        self.assertFalse(feed.not_modified)
+
+        # Validators are only saved on commit, so an unfinished run fetches the full feed again
+        retry = LatestFeed(conditional_key="test", client=self.client)
+        self.assertEqual(len(list(retry)), len(load_feed_fixture()))
+        retry.commit()
+
+        unchanged = LatestFeed(conditional_key="test", client=self.client)
+        self.assertEqual(list(unchanged), [])
+        self.assertTrue(unchanged.not_modified)
+
+    def test_error_status_raises_feed_error(self):
+        client = RapidAPIClient("example.p.rapidapi.com", "test-key", replay_dir=TESTDATA_DIR / "missing")
+        with self.assertRaises(FeedError) as ctx:
+            list(LatestFeed(client=client))
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_retries_are_bounded(self):
+        client = RapidAPIClient("example.p.rapidapi.com", "test-key", retries=2)
+        retry = client.session.get_adapter("https://example.p.rapidapi.com/latest").max_retries
+        self.assertEqual(retry.total, 2)
+        self.assertIn(503, retry.status_forcelist)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NAVIngestionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.feed = load_feed_fixture()
+        self.records = feed_records(self.feed)
+        self.schemes = create_schemes_for_feed(self.feed)
+        self.user = User.objects.create_user(email='investor@example.com', password='testpass123')
+
+    def count_ingest_queries(self, records):
+        with CaptureQueriesContext(connection) as ctx:
+            ingest_navs(records)
+        return len(ctx.captured_queries)
+
+    def test_ingest_upserts_navs_and_revalues_portfolios(self):
+        scheme = self.schemes[0]
+        NAV.objects.create(scheme=scheme, date=date(2025, 6, 20), nav=1.0)
+        holding = Portfolio.objects.create(user=self.user, scheme=scheme, units=10.0)
+
+        result = ingest_navs(self.records)
+
+        self.assertEqual(result["received"], len(self.feed))
+        self.assertEqual(result["updated"], len(self.feed))
+        self.assertEqual(result["skipped"], 0)
+        self.assertEqual(NAV.objects.count(), len(self.feed))
+
+        expected_nav = self.feed[0]["Net_Asset_Value"]
+        self.assertEqual(NAV.objects.get(scheme=scheme, date=date(2025, 6, 20)).nav, expected_nav)
+        holding.refresh_from_db()
+        self.assertEqual(holding.current_nav, expected_nav)
+        self.assertEqual(holding.current_value, round(10.0 * expected_nav, 2))
+
+    def test_ingest_skips_unknown_and_incomplete_records(self):
+        records = [
+            {"Scheme_Code": 999999, "Net_Asset_Value": 10.0, "Date": "20-Jun-2025"},
+            {"Scheme_Code": self.feed[0]["Scheme_Code"], "Net_Asset_Value": None, "Date": "20-Jun-2025"},
+            {"Scheme_Code": self.feed[1]["Scheme_Code"], "Net_Asset_Value": 12.5, "Date": "N.A."},
+        ]
+        result = ingest_navs(feed_records(records))
+        self.assertEqual(result["skipped"], 3)
+        self.assertFalse(NAV.objects.exists())
+
+    def test_query_count_is_independent_of_feed_size(self):
+        for scheme in self.schemes:
+            Portfolio.objects.create(user=self.user, scheme=scheme, units=5.0)
+
+        small = self.count_ingest_queries(self.records[:5])
+        large = self.count_ingest_queries(self.records)
+        self.assertEqual(small, large)
+
+    def test_unchanged_records_are_not_rewritten(self):
+        ingest_navs(self.records)
+
+        result = ingest_navs(self.records)
+        self.assertEqual(result["unchanged"], len(self.records))
+        self.assertEqual(result["updated"], 0)
+        self.assertEqual(result["batches"], [])
+
+        changed = self.records[0]._replace(nav=self.records[0].nav + 1)
+        result = ingest_navs([changed] + self.records[1:])
+        self.assertEqual(result["updated"], 1)
+        self.assertEqual(result["unchanged"], len(self.records) - 1)
+        self.assertEqual(NAV.objects.get(scheme=self.schemes[0]).nav, changed.nav)
+
+    def test_latest_nav_follows_newest_date(self):
+        scheme = self.schemes[0]
+        ingest_navs(self.records[:1])
+        self.assertEqual(LatestNAV.objects.get(scheme=scheme).nav, self.records[0].nav)
+
+        older = self.records[0]._replace(nav_date=date(2025, 6, 1), nav=1.0)
+        ingest_navs([older])
+        latest = LatestNAV.objects.get(scheme=scheme)
+        self.assertEqual(latest.date, date(2025, 6, 20))
+        self.assertEqual(latest.nav, self.records[0].nav)
+        self.assertEqual(NAV.objects.filter(scheme=scheme).count(), 2)
+
+    def test_rebuild_latest_nav_command(self):
+        scheme = self.schemes[0]
+        NAV.objects.create(scheme=scheme, date=date(2025, 6, 18), nav=11.0)
+        NAV.objects.create(scheme=scheme, date=date(2025, 6, 19), nav=12.0)
+        LatestNAV.objects.create(scheme=self.schemes[1], date=date(2025, 6, 1), nav=1.0)
+
+        call_command('rebuild_latest_nav', stdout=StringIO())
+
+        self.assertEqual(LatestNAV.objects.count(), 1)
+        latest = LatestNAV.objects.get(scheme=scheme)
+        self.assertEqual((latest.date, latest.nav), (date(2025, 6, 19), 12.0))
+
+    def test_force_rewrites_unchanged_records(self):
+        ingest_navs(self.records)
+        result = ingest_navs(self.records, force=True)
+        self.assertEqual(result["unchanged"], 0)
+        self.assertEqual(result["updated"], len(self.records))
+
+
+class CopyLoaderTests(TestCase):
+
+    def setUp(self):
+        self.schemes = create_schemes_for_feed(load_feed_fixture()[:3])
+        NAV.objects.create(scheme=self.schemes[0], date=date(2025, 6, 20), nav=1.0)
+        self.rows = [(scheme.id, date(2025, 6, 20), 10.0 + i) for i, scheme in enumerate(self.schemes)]
+
+    def test_copy_upsert_inserts_and_updates(self):
+        written = loader.copy_upsert(NAV, ["scheme_id", "date", "nav"], iter(self.rows),
+                                     unique_fields=["scheme_id", "date"], update_fields=["nav"])
+        self.assertEqual(written, 3)
+        self.assertEqual(sorted(NAV.objects.values_list("nav", flat=True)), [10.0, 11.0, 12.0])
+
+    def test_conflicts_are_left_alone_without_update_fields(self):
+        loader.copy_upsert(NAV, ["scheme_id", "date", "nav"], self.rows, unique_fields=["scheme_id", "date"])
+        self.assertEqual(NAV.objects.get(scheme=self.schemes[0]).nav, 1.0)
+        self.assertEqual(NAV.objects.count(), 3)
+
+    def test_bulk_create_fallback(self):
+        with mock.patch.object(loader.connection, 'vendor', 'sqlite'):
+            written = loader.copy_upsert(NAV, ["scheme_id", "date", "nav"], self.rows,
+                                         unique_fields=["scheme_id", "date"], update_fields=["nav"])
+        self.assertEqual(written, 3)
+        self.assertEqual(NAV.objects.get(scheme=self.schemes[0]).nav, 10.0)
+
+    def test_psycopg2_rows_are_escaped_for_copy_expert(self):
+        raw = mock.Mock(spec=['copy_expert'])
+        raw.copy_expert.side_effect = lambda sql, data: copied.append(data.read())
+        copied = []
+        loader._copy_rows(mock.Mock(cursor=raw), "COPY t FROM STDIN", [(1, None, "a\tb\n"), (2, date(2025, 6, 20), "x")])
+        self.assertEqual(copied, ["1\t\\N\ta\\tb\\n\n2\t2025-06-20\tx\n"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CatalogueSyncTests(TestCase):
+
+    def setUp(self):
+        self.feed = load_feed_fixture()
+        self.records = feed_records(self.feed)
+        self.open_ended = [r for r in self.records if "open" in r.scheme_type.lower()]
+
+    def count_sync_queries(self, records):
+        with CaptureQueriesContext(connection) as ctx:
+            result = sync_schemes(records)
+        return result, len(ctx.captured_queries)
+
+    def test_sync_creates_open_ended_schemes_and_fund_houses(self):
+        result = sync_schemes(self.records)
+        self.assertEqual(result["created"], len(self.open_ended))
+        self.assertEqual(Scheme.objects.count(), len(self.open_ended))
+        self.assertFalse(Scheme.objects.filter(is_open_ended=False).exists())
+        self.assertEqual(FundHouse.objects.count(), len({r.fund_house for r in self.open_ended}))
+
+        result = sync_schemes(self.records)
+        self.assertEqual((result["created"], result["updated"]), (0, 0))
+
+    def test_sync_updates_changed_schemes(self):
+        sync_schemes(self.records)
+        renamed = self.open_ended[0]._replace(scheme_name="Renamed Fund", scheme_category="Debt Scheme - Gilt Fund")
+
+        result = sync_schemes([renamed])
+
+        self.assertEqual(result["updated"], 1)
+        scheme = Scheme.objects.get(scheme_code=renamed.scheme_code)
+        self.assertEqual((scheme.scheme_name, scheme.scheme_category), ("Renamed Fund", "Debt Scheme - Gilt Fund"))
+
+    def test_sync_fund_houses(self):
+        FundHouse.objects.create(name=self.records[0].fund_house)
+        result = sync_fund_houses(self.records)
+        self.assertEqual(result["created"], len({r.fund_house for r in self.records}) - 1)
+
+    def test_query_count_is_independent_of_feed_size(self):
+        _, small = self.count_sync_queries(self.open_ended[:5])
+        _, large = self.count_sync_queries(self.open_ended)
+        self.assertEqual(small, large)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImportJobTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='admin@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.records = feed_records(load_feed_fixture())
+
+    @mock.patch('mutualfunds.views.run_catalogue_import.delay')
+    def test_post_queues_job_and_returns_202(self, delay):
+        response = self.client.post(reverse('fetch-schemes'), **self.auth_header)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = ImportJob.objects.get()
+        self.assertEqual(response.data['data']['id'], str(job.id))
+        self.assertEqual(job.kind, ImportJob.KIND_SCHEMES)
+        delay.assert_called_once_with(str(job.id))
+
+    @mock.patch('mutualfunds.views.run_catalogue_import.delay')
+    def test_duplicate_triggers_are_coalesced(self, delay):
+        first = self.client.post(reverse('fundhouses'), **self.auth_header)
+        second = self.client.post(reverse('fundhouses'), **self.auth_header)
+
+        self.assertEqual(first.data['data']['id'], second.data['data']['id'])
+        self.assertEqual(ImportJob.objects.count(), 1)
+        delay.assert_called_once()
+
+        # A different kind of import is not blocked
+        self.client.post(reverse('fetch-schemes'), **self.auth_header)
+        self.assertEqual(ImportJob.objects.count(), 2)
+
+    def test_run_import_job_records_progress_and_result(self):
+        job = ImportJob.objects.create(kind=ImportJob.KIND_SCHEMES, requested_by=self.user)
+        with mock.patch('mutualfunds.jobs.stream_latest', return_value=iter(self.records)):
+            run_import_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.processed, len(self.records))
+        self.assertEqual(job.created, Scheme.objects.count())
+        self.assertEqual(job.result['created'], job.created)
+
+        response = self.client.get(reverse('import-job', kwargs={'pk': job.id}), **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['status'], ImportJob.STATUS_SUCCEEDED)
+
+    def test_finished_job_allows_a_new_import(self):
+        ImportJob.objects.create(kind=ImportJob.KIND_SCHEMES, status=ImportJob.STATUS_SUCCEEDED)
+        with mock.patch('mutualfunds.views.run_catalogue_import.delay'):
+            response = self.client.post(reverse('fetch-schemes'), **self.auth_header)
+        self.assertEqual(response.data['message'], "Scheme import queued.")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ListingCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='reader@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.records = feed_records(load_feed_fixture())
+        sync_schemes(self.records)
+        self.fund_house = FundHouse.objects.get(name=self.records[0].fund_house)
+        self.scheme_url = reverse('scheme-list', kwargs={'fund_house_id': self.fund_house.id})
+
+    def test_listing_is_served_from_cache(self):
+        first = self.client.get(self.scheme_url, **self.auth_header)
+        with self.assertNumQueries(0):  # the user comes from the JWT user cache
+            second = self.client.get(self.scheme_url, **self.auth_header)
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(second.data['data']['results']), Scheme.objects.filter(fund_house=self.fund_house).count())
+        self.assertEqual(cache_stats()['schemes'], {'hits': 1, 'misses': 1})
+
+    def test_etag_revalidation_returns_304(self):
+        first = self.client.get(reverse('fundhouses'), **self.auth_header)
+        self.assertEqual(first.data['message'], "Fund houses fetched")
+
+        second = self.client.get(reverse('fundhouses'), HTTP_IF_NONE_MATCH=first['ETag'], **self.auth_header)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_catalogue_sync_invalidates_cache(self):
+        first = self.client.get(self.scheme_url, **self.auth_header)
+        renamed = next(r for r in self.records if r.fund_house == self.fund_house.name and "open" in r.scheme_type.lower())
+        sync_schemes([renamed._replace(scheme_name="Renamed Fund")])
+
+        second = self.client.get(self.scheme_url, **self.auth_header)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertIn("Renamed Fund", [scheme['scheme_name'] for scheme in second.data['data']['results']])
+
+    def test_cache_stats_requires_admin(self):
+        response = self.client.get(reverse('cache-stats'), **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='mobile@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.fund_house = FundHouse.objects.create(name="Paged Mutual Fund")
+        for code in range(300001, 300026):
+            Scheme.objects.create(
+                scheme_code=code, scheme_name=f"Paged Scheme {code}", fund_house=self.fund_house,
+                scheme_type="Open Ended Schemes", scheme_category="Equity", is_open_ended=True
+            )
+        self.url = reverse('scheme-list', kwargs={'fund_house_id': self.fund_house.id})
+
+    def test_pages_follow_scheme_code(self):
+        codes = []
+        url = f"{self.url}?page_size=10"
+        while url:
+            response = self.client.get(url, **self.auth_header)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page = response.data['data']
+            codes += [scheme['scheme_code'] for scheme in page['results']]
+            url = page['next']
+        self.assertEqual(codes, list(range(300001, 300026)))
+
+    def test_sparse_fieldset_narrows_output_and_projection(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"{self.url}?fields=scheme_code,scheme_name", **self.auth_header)
+        row = response.data['data']['results'][0]
+        self.assertEqual(set(row), {'scheme_code', 'scheme_name'})
+
+        scheme_query = next(q['sql'] for q in ctx.captured_queries if 'mutualfunds_scheme' in q['sql'])
+        self.assertNotIn('isin_growth', scheme_query)
+
+    def test_portfolio_sparse_fieldsets(self):
+        scheme = Scheme.objects.first()
+        Portfolio.objects.create(user=self.user, scheme=scheme, units=2.0)
+        response = self.client.get(
+            f"{reverse('portfolio')}?fields=id,scheme,current_value&scheme_fields=scheme_code", **self.auth_header
+        )
+        holding = response.data['data']['results'][0]
+        self.assertEqual(set(holding), {'id', 'scheme', 'current_value'})
+        self.assertEqual(holding['scheme'], {'scheme_code': scheme.scheme_code})
+
+
+class PortfolioListQueryTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='holder@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.schemes = create_schemes_for_feed(load_feed_fixture())
+        for scheme in self.schemes:
+            NAV.objects.create(scheme=scheme, date=date(2025, 6, 19), nav=10.0)
+            NAV.objects.create(scheme=scheme, date=date(2025, 6, 20), nav=12.5)
+        call_command('rebuild_latest_nav', stdout=StringIO())
+
+    def add_holdings(self, count):
+        for scheme in self.schemes[:count]:
+            Portfolio.objects.get_or_create(user=self.user, scheme=scheme, defaults={"units": 4.0})
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('portfolio'), **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(ctx.captured_queries)
+
+    def test_list_uses_latest_nav(self):
+        self.add_holdings(1)
+        response, _ = self.list_queries()
+        holding = response.data['data']['results'][0]
+        self.assertEqual(holding['current_value'], 50.0)
+        self.assertEqual(holding['scheme']['scheme_code'], self.schemes[0].scheme_code)
+
+    def test_query_count_is_independent_of_holdings(self):
+        self.add_holdings(2)
+        self.list_queries()  # caches the authenticated user
+        _, few = self.list_queries()
+        self.add_holdings(30)
+        response, many = self.list_queries()
+        self.assertEqual(len(response.data['data']['results']), 30)
+        self.assertEqual(few, many)
+
+
+class NAVHistoryTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='charts@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.scheme = create_schemes_for_feed(load_feed_fixture())[0]
+        self.start = date(2025, 1, 1)
+        NAV.objects.bulk_create([
+            NAV(scheme=self.scheme, date=self.start + timedelta(days=d), nav=10 + d)
+            for d in range(90)
+        ])
+
+    def history(self, **params):
+        url = reverse('scheme-navs', args=[self.scheme.scheme_code])
+        return self.client.get(url, params, **self.auth_header)
+
+    def test_full_history_in_date_order(self):
+        response = self.history()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = response.data['data']
+        self.assertEqual(len(rows), 90)
+        self.assertEqual(rows[0], {'date': '2025-01-01', 'nav': 10.0})
+        self.assertEqual(rows[-1]['date'], '2025-03-31')
+
+    def test_date_range_and_columnar_layout(self):
+        response = self.history(**{'from': '2025-02-01', 'to': '2025-02-10', 'layout': 'columnar'})
+        data = response.data['data']
+        self.assertEqual(data['dates'][0], '2025-02-01')
+        self.assertEqual(data['dates'][-1], '2025-02-10')
+        self.assertEqual(data['navs'], [10.0 + d for d in range(31, 41)])
+
+    def test_monthly_ohlc(self):
+        response = self.history(interval='monthly')
+        bars = response.data['data']
+        self.assertEqual([bar['date'] for bar in bars], ['2025-01-01', '2025-02-01', '2025-03-01'])
+        self.assertEqual(bars[1], {'date': '2025-02-01', 'open': 41.0, 'high': 68.0, 'low': 41.0, 'close': 68.0})
+
+    def test_points_keeps_endpoints(self):
+        response = self.history(points=10)
+        rows = response.data['data']
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]['date'], '2025-01-01')
+        self.assertEqual(rows[-1]['date'], '2025-03-31')
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.history(interval='daily').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.history(points='abc').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.history(**{'from': '2025-13-01'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.history(**{'from': '2025/01/01'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.history(to='yesterday').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_scheme(self):
+        url = reverse('scheme-navs', args=[999999999])
+        response = self.client.get(url, **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TimeSeriesTests(SimpleTestCase):
+
+    def test_weekly_ohlc(self):
+        rows = [(date(2025, 6, 2) + timedelta(days=d), nav) for d, nav in enumerate([5, 7, 3, 6, 4, 8, 9])]
+        self.assertEqual(list(ohlc(rows, 'weekly')), [(date(2025, 6, 2), 5, 9, 3, 9)])
+
+    def test_lttb_picks_spike(self):
+        rows = [(date(2025, 1, 1) + timedelta(days=d), 50.0 if d == 47 else 10.0) for d in range(100)]
+        sampled = lttb(rows, 5)
+        self.assertEqual(len(sampled), 5)
+        self.assertIn(rows[47], sampled)
+        self.assertEqual(lttb(rows[:4], 10), rows[:4])
+
+
+class SchemeMetricsTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='metrics@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.growth, self.young = create_schemes_for_feed(load_feed_fixture())[:2]
+        start = date(2019, 1, 1)
+        rows = []
+        for d in range(6 * 365 + 2):
+            day = start + timedelta(days=d)
+            if day.weekday() >= 5:
+                continue
+            # 10% a year, with a 20% dip during 2020
+            nav = 10 * 1.1 ** (d / 365.25)
+            if date(2020, 3, 1) <= day < date(2020, 6, 1):
+                nav *= 0.8
+            rows.append(NAV(scheme=self.growth, date=day, nav=nav))
+            if d >= 6 * 365 - 200:
+                rows.append(NAV(scheme=self.young, date=day, nav=20.0))
+        NAV.objects.bulk_create(rows)
+
+    def test_forward_fill(self):
+        nan = float('nan')
+        filled = forward_fill(np.array([[nan, 1, nan, 3], [2, nan, nan, nan]]))
+        self.assertTrue(math.isnan(filled[0, 0]))
+        self.assertEqual(filled[0, 1:].tolist(), [1, 1, 3])
+        self.assertEqual(filled[1].tolist(), [2, 2, 2, 2])
+
+    def test_refresh_computes_metrics_for_every_scheme(self):
+        stats = refresh_scheme_metrics(batch_size=1)
+        self.assertEqual(stats['schemes'], 2)
+
+        growth = SchemeMetrics.objects.get(scheme=self.growth)
+        self.assertAlmostEqual(growth.cagr, 0.1, places=3)
+        self.assertAlmostEqual(growth.return_1y, 0.1, places=2)
+        self.assertAlmostEqual(growth.return_5y, 0.1, places=2)
+        # Windows starting inside the dip lift the average rolling return
+        self.assertGreater(growth.rolling_3y, growth.return_3y)
+        self.assertAlmostEqual(growth.max_drawdown, -0.2, places=2)
+        self.assertEqual(growth.start_date, date(2019, 1, 1))
+
+        # Not enough history for yearly figures, and a flat NAV has no drawdown
+        young = SchemeMetrics.objects.get(scheme=self.young)
+        self.assertIsNone(young.return_1y)
+        self.assertIsNone(young.rolling_1y)
+        self.assertEqual(young.max_drawdown, 0.0)
+        self.assertEqual(young.as_of, growth.as_of)
+
+    def test_metrics_are_computed_per_row(self):
+        dates = np.array(['2024-01-01', '2024-01-02', '2024-01-03'], dtype='datetime64[D]')
+        metrics = compute_metrics(dates, np.array([[10.0, 12.0, 9.0], [float('nan'), 5.0, 5.0]]), risk_free_rate=0)
+        self.assertAlmostEqual(metrics['max_drawdown'][0], -0.25)
+        self.assertEqual(metrics['max_drawdown'][1], 0.0)
+        self.assertEqual(metrics['start_date'][1], np.datetime64('2024-01-02'))
+
+    def test_metrics_endpoint(self):
+        refresh_scheme_metrics()
+        url = reverse('scheme-metrics', args=[self.growth.scheme_code])
+        response = self.client.get(url, **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['scheme_code'], self.growth.scheme_code)
+        self.assertAlmostEqual(response.data['data']['cagr'], 0.1, places=3)
+
+        response = self.client.get(reverse('scheme-metrics', args=[999999999]), **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TransactionLedgerTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='investor@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.equity, self.debt = create_schemes_for_feed(load_feed_fixture())[:2]
+        # Equity goes from 10 to 11 over 2024, debt stays at 20
+        NAV.objects.bulk_create([
+            NAV(scheme=self.equity, date=date(2024, 1, 1), nav=10.0),
+            NAV(scheme=self.equity, date=date(2024, 7, 1), nav=12.0),
+            NAV(scheme=self.equity, date=date(2025, 1, 1), nav=11.0),
+            NAV(scheme=self.debt, date=date(2024, 7, 1), nav=20.0),
+            NAV(scheme=self.debt, date=date(2025, 1, 1), nav=20.0),
+        ])
+        call_command('rebuild_latest_nav', stdout=StringIO())
+
+    def record(self, data):
+        return self.client.post(reverse('transactions'), data, format='json', **self.auth_header)
+
+    def analytics(self, **params):
+        response = self.client.get(reverse('portfolio-analytics'), params, **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['data']
+
+    def test_holdings_follow_the_ledger(self):
+        response = self.record([
+            {'scheme': self.equity.id, 'kind': 'buy', 'date': '2024-01-01', 'units': 100, 'price': 10},
+            {'scheme': self.equity.id, 'kind': 'sip', 'date': '2024-07-01', 'units': 10, 'price': 12},
+            {'scheme': self.equity.id, 'kind': 'sell', 'date': '2024-08-01', 'units': 30, 'price': 12},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        holding = Portfolio.objects.get(user=self.user, scheme=self.equity)
+        self.assertEqual(holding.units, 80)
+        self.assertEqual(holding.current_value, 880.0)
+
+    def test_overselling_is_rejected_atomically(self):
+        self.record({'scheme': self.equity.id, 'kind': 'buy', 'date': '2024-01-01', 'units': 5, 'price': 10})
+        response = self.record({'scheme': self.equity.id, 'kind': 'sell', 'date': '2024-02-01', 'units': 6, 'price': 10})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Portfolio.objects.get(user=self.user, scheme=self.equity).units, 5)
+
+    def test_selling_before_buying_is_rejected(self):
+        self.record({'scheme': self.equity.id, 'kind': 'buy', 'date': '2024-01-01', 'units': 5, 'price': 10})
+        response = self.record({'scheme': self.equity.id, 'kind': 'sell', 'date': '2023-01-01', 'units': 5, 'price': 10})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+        response = self.record([
+            {'scheme': self.debt.id, 'kind': 'sell', 'date': '2023-01-01', 'units': 5, 'price': 20},
+            {'scheme': self.debt.id, 'kind': 'buy', 'date': '2024-01-01', 'units': 5, 'price': 20},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Portfolio.objects.filter(user=self.user, scheme=self.debt).exists())
+
+    def test_adding_a_holding_records_a_purchase(self):
+        response = self.client.post(reverse('portfolio'), {'scheme': self.debt.id, 'units': 3}, **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        entry = Transaction.objects.get(user=self.user)
+        self.assertEqual((entry.kind, entry.units, entry.price), ('buy', 3, 20.0))
+
+    def test_adding_a_holding_without_a_nav_is_rejected(self):
+        scheme = Scheme.objects.exclude(pk__in=[self.equity.pk, self.debt.pk]).first()
+        response = self.client.post(reverse('portfolio'), {'scheme': scheme.id, 'units': 3}, **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+
+    def test_xirr_and_gain(self):
+        self.record([
+            {'scheme': self.equity.id, 'kind': 'buy', 'date': '2024-01-01', 'units': 100, 'price': 10},
+            {'scheme': self.debt.id, 'kind': 'buy', 'date': '2024-07-01', 'units': 10, 'price': 20},
+        ])
+        data = self.analytics(history='false')
+        self.assertEqual(data['as_of'], '2025-01-01')
+        self.assertEqual(data['invested'], 1200.0)
+        self.assertEqual(data['current_value'], 1300.0)
+        self.assertNotIn('history', data)
+
+        holdings = {holding['scheme_code']: holding for holding in data['holdings']}
+        # 10 -> 11 over 366 days
+        self.assertAlmostEqual(holdings[self.equity.scheme_code]['xirr'], 1.1 ** (365 / 366) - 1, places=6)
+        self.assertAlmostEqual(holdings[self.debt.scheme_code]['xirr'], 0.0, places=6)
+        self.assertGreater(data['xirr'], 0)
+        self.assertLess(data['xirr'], holdings[self.equity.scheme_code]['xirr'])
+
+    def test_value_history(self):
+        self.record([
+            {'scheme': self.equity.id, 'kind': 'buy', 'date': '2024-01-01', 'units': 100, 'price': 10},
+            {'scheme': self.debt.id, 'kind': 'buy', 'date': '2024-06-30', 'units': 10, 'price': 20},
+        ])
+        history = self.analytics()['history']
+        self.assertEqual(history['dates'], ['2024-01-01', '2024-07-01', '2025-01-01'])
+        self.assertEqual(history['value'], [1000.0, 1400.0, 1300.0])
+        self.assertEqual(history['invested'], [1000.0, 1200.0, 1200.0])
+
+        history = self.analytics(**{'from': '2024-12-01'})['history']
+        self.assertEqual(history['dates'], ['2025-01-01'])
+        self.assertEqual(history['value'], [1300.0])
+
+    def test_vectorised_xirr_solves_rows_independently(self):
+        rates = xirr([[-1000, 0, 1100], [-1000, -1000, 2500], [100, 100, 100]], [0, 182, 365])
+        self.assertAlmostEqual(rates[0], 0.1, places=8)
+        self.assertTrue(0.3 < rates[1] < 0.4)
+        self.assertTrue(math.isnan(rates[2]))
+
+
+class OpenLedgerMigrationTests(TransactionTestCase):
+    """Migration 0006 opens the ledger from the holdings the old POST /portfolio/ created."""
+    migrate_from = [('mutualfunds', '0005_schememetrics')]
+    migrate_to = [('mutualfunds', '0006_transaction')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.migrate_from)
+        apps = self.executor.loader.project_state(self.migrate_from).apps
+        user = apps.get_model('mutualfunds', 'CustomUser').objects.create(email='legacy@example.com', password='!')
+        fund_house = apps.get_model('mutualfunds', 'FundHouse').objects.create(name='Legacy Mutual Fund')
+        Scheme = apps.get_model('mutualfunds', 'Scheme')
+        self.priced = Scheme.objects.create(fund_house=fund_house, scheme_code=900001, scheme_name='Priced',
+                                            scheme_type='Open Ended Schemes', scheme_category='Equity Scheme')
+        unpriced = Scheme.objects.create(fund_house=fund_house, scheme_code=900002, scheme_name='Unpriced',
+                                         scheme_type='Open Ended Schemes', scheme_category='Equity Scheme')
+        apps.get_model('mutualfunds', 'NAV').objects.create(scheme=self.priced, date=date(2020, 1, 1), nav=10.0)
+        Portfolio = apps.get_model('mutualfunds', 'Portfolio')
+        for scheme in [self.priced, self.priced, unpriced]:
+            Portfolio.objects.create(user=user, scheme=scheme, units=5, current_nav=0.0, current_value=0.0)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged_and_opened_at_a_nav(self):
+        self.executor.loader.build_graph()
+        with mock.patch('builtins.print'):
+            self.executor.migrate(self.migrate_to)
+        apps = self.executor.loader.project_state(self.migrate_to).apps
+        holdings = apps.get_model('mutualfunds', 'Portfolio').objects.filter(scheme_id=self.priced.id)
+        self.assertEqual(list(holdings.values_list('units', flat=True)), [10.0])
+        openings = apps.get_model('mutualfunds', 'Transaction').objects.all()
+        self.assertEqual(sorted(openings.values_list('scheme_id', 'units', 'price')),
+                         [(self.priced.id, 5.0, 10.0), (self.priced.id, 5.0, 10.0)])
+
+
+class PortfolioSummaryTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='summary@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='bystander@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        items = load_feed_fixture()
+        self.records = feed_records(items)
+        self.schemes = create_schemes_for_feed(items)
+        self.held, self.unheld = self.schemes[0], self.schemes[1]
+        NAV.objects.bulk_create([
+            NAV(scheme=scheme, date=date(2025, 6, 18), nav=10.0) for scheme in (self.held, self.unheld)
+        ] + [
+            NAV(scheme=scheme, date=date(2025, 6, 19), nav=11.0) for scheme in (self.held, self.unheld)
+        ])
+        call_command('rebuild_latest_nav', stdout=StringIO())
+        record_transactions(self.user, [
+            {'scheme': self.held, 'kind': 'buy', 'date': date(2025, 6, 18), 'units': 10, 'price': 10.0},
+        ])
+        record_transactions(self.other, [
+            {'scheme': self.unheld, 'kind': 'buy', 'date': date(2025, 6, 18), 'units': 5, 'price': 10.0},
+        ])
+
+    def test_holdings_change_refreshes_summary(self):
+        summary = PortfolioSummary.objects.get(user=self.user)
+        self.assertEqual((summary.holdings, summary.invested, summary.current_value), (1, 100.0, 110.0))
+        self.assertEqual(summary.day_change, 10.0)
+        self.assertEqual(summary.last_nav_date, date(2025, 6, 19))
+
+    def test_nav_ingestion_touches_only_holders(self):
+        untouched = PortfolioSummary.objects.get(user=self.other).updated_at
+        record = next(r for r in self.records if r.scheme_code == self.held.scheme_code)
+        ingest_navs([record._replace(nav=12.0)], force=True)
+
+        summary = PortfolioSummary.objects.get(user=self.user)
+        self.assertEqual(summary.current_value, 120.0)
+        self.assertEqual(summary.day_change, 10.0)
+        self.assertEqual(summary.last_nav_date, record.nav_date)
+        self.assertEqual(PortfolioSummary.objects.get(user=self.other).updated_at, untouched)
+
+    def test_summary_endpoint(self):
+        response = self.client.get(reverse('portfolio-summary'), **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['gain'], 10.0)
+        self.assertEqual(data['day_change_pct'], 10.0)
+
+    def test_rebuild_command(self):
+        PortfolioSummary.objects.all().delete()
+        call_command('rebuild_portfolio_summaries', stdout=StringIO())
+        self.assertEqual(PortfolioSummary.objects.count(), 2)
+        self.assertEqual(PortfolioSummary.objects.get(user=self.user).current_value, 110.0)
+
+
+class FakeFeed:
+    """Stands in for LatestFeed in tasks, serving fixture records."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def __call__(self, conditional_key=None):
+        self.conditional_key = conditional_key
+        self.not_modified = False
+        self.validators = {"etag": '"v1"'}
+        return self
+
+    def __iter__(self):
+        return iter(self.records)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, NAV_CHUNK_SIZE=10, NAV_CHUNK_MAX_PARALLEL=3)
+class ShardedNAVUpdateTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.feed = load_feed_fixture()
+        self.records = feed_records(self.feed)
+        create_schemes_for_feed(self.feed)
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+
+    def test_chunks_are_disjoint_scheme_code_ranges(self):
+        rows, skipped = nav_rows(self.records)
+        chunks = split_by_scheme_code(rows + rows[:5], chunk_size=10, max_chunks=3)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(rows) + 5)
+        for before, after in zip(chunks, chunks[1:]):
+            self.assertLess(before[-1][0], after[0][0])
+
+    @mock.patch('mutualfunds.tasks.update_scheme_metrics.delay')
+    def test_update_fans_out_and_aggregates(self, refresh_metrics):
+        with mock.patch('mutualfunds.tasks.LatestFeed', FakeFeed(self.records)):
+            result = update_nav_and_portfolio()
+
+        self.assertEqual(result['chunks'], 3)
+        self.assertEqual(NAV.objects.count(), len(self.records))
+        self.assertEqual(load_validators(NAV_FEED_KEY), {"etag": '"v1"'})
+        refresh_metrics.assert_called_once()
+
+    @mock.patch('mutualfunds.tasks.update_scheme_metrics.delay')
+    def test_aggregate_sums_chunk_results(self, refresh_metrics):
+        chunk = {'received': 5, 'updated': 3, 'unchanged': 1, 'skipped': 1, 'batches': [{}], 'elapsed': 0.5,
+                 'scheme_codes': [1, 9]}
+        totals = aggregate_nav_chunks([chunk, dict(chunk, scheme_codes=[10, 20])], received=11, skipped=1)
+        self.assertEqual((totals['updated'], totals['unchanged'], totals['skipped']), (6, 2, 3))
+        self.assertEqual([c['scheme_codes'] for c in totals['chunks']], [[1, 9], [10, 20]])
+        self.assertIsNone(load_validators(NAV_FEED_KEY))
+
+
+class JobLockTests(SimpleTestCase):
+
+    def setUp(self):
+        self.lock = JobLock('tests:job-lock', timeout=5)
+        self.addCleanup(self.lock.lock.redis.delete, 'lock:tests:job-lock')
+
+    def test_single_holder_and_token_handover(self):
+        self.assertTrue(self.lock.acquire())
+        self.assertFalse(JobLock('tests:job-lock', timeout=5).acquire())
+
+        # Another task holding the token can heartbeat and release it
+        handed = JobLock('tests:job-lock', timeout=5, token=self.lock.token)
+        self.assertTrue(handed.heartbeat())
+        self.assertTrue(handed.release())
+        self.assertFalse(self.lock.is_locked())
+        self.assertFalse(self.lock.heartbeat())
+
+    def test_lock_expires_without_heartbeat(self):
+        lock = JobLock('tests:job-lock', timeout=0.2)
+        self.assertTrue(lock.acquire())
+        time.sleep(0.3)
+        self.assertTrue(JobLock('tests:job-lock', timeout=5).acquire())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NAVScheduleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.running = nav_lock()
+        self.running.acquire()
+        self.addCleanup(self.running.release)
+
+    @mock.patch('mutualfunds.tasks.LatestFeed')
+    def test_overlapping_run_is_skipped(self, feed):
+        self.assertEqual(update_nav_and_portfolio(), {"skipped": True})
+        feed.assert_not_called()
+        self.assertTrue(self.running.is_locked())
+
+    @override_settings(NAV_LOCK_POLICY='queue')
+    @mock.patch('mutualfunds.tasks.update_nav_and_portfolio.apply_async')
+    def test_overlapping_runs_queue_one_follow_up(self, apply_async):
+        self.assertEqual(update_nav_and_portfolio(), {"queued": True})
+        self.assertEqual(update_nav_and_portfolio(), {"skipped": True})
+        apply_async.assert_called_once()
+        self.assertTrue(apply_async.call_args.kwargs['kwargs']['follow_up'])
+
+    def test_schedule_follows_crontab_setting(self):
+        register_nav_schedule()
+        with override_settings(NAV_UPDATE_CRONTAB='15 21 * * 1-6'):
+            task = register_nav_schedule()
+        self.assertEqual(PeriodicTask.objects.filter(name=NAV_TASK_NAME).count(), 1)
+        self.assertEqual((task.crontab.minute, task.crontab.hour, task.crontab.day_of_week), ('15', '21', '1-6'))
+        self.assertEqual(str(task.crontab.timezone), 'Asia/Kolkata')
+        self.assertIsNone(task.interval)
+
+
+class ConnectionSettingsTests(SimpleTestCase):
+    profile = {"CONN_MAX_AGE": 60, "POOL_MIN_SIZE": 2, "POOL_MAX_SIZE": 10}
+
+    def test_persistent_connections_are_health_checked(self):
+        db = connection_settings(self.profile)
+        self.assertEqual(db["CONN_MAX_AGE"], 60)
+        self.assertTrue(db["CONN_HEALTH_CHECKS"])
+        self.assertEqual(db["OPTIONS"], {})
+
+    @mock.patch('mutualfund_project.database.PSYCOPG3', True)
+    def test_pool_replaces_persistent_connections(self):
+        db = connection_settings(self.profile, pool=True)
+        self.assertEqual(db["CONN_MAX_AGE"], 0)
+        self.assertFalse(db["CONN_HEALTH_CHECKS"])
+        self.assertEqual(db["OPTIONS"]["pool"], {"min_size": 2, "max_size": 10, "timeout": 10})
+
+    @mock.patch('mutualfund_project.database.PSYCOPG3', True)
+    def test_pgbouncer_turns_off_server_side_state(self):
+        db = connection_settings(self.profile, pool=True, pgbouncer=True)
+        self.assertTrue(db["DISABLE_SERVER_SIDE_CURSORS"])
+        self.assertIsNone(db["OPTIONS"]["prepare_threshold"])
+        self.assertNotIn("pool", db["OPTIONS"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_DATABASE='replica')
+class ReplicaRoutingTests(APITransactionTestCase):
+    # The replica alias mirrors the test database over its own connection, so data must be committed
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='replica@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.scheme = create_schemes_for_feed(load_feed_fixture())[0]
+        NAV.objects.create(scheme=self.scheme, date=date(2024, 1, 1), nav=10.0)
+        LatestNAV.objects.create(scheme=self.scheme, date=date(2024, 1, 1), nav=10.0)
+
+    def get(self, name, *args):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse(name, args=args), **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return primary, replica
+
+    def test_read_only_views_use_the_replica(self):
+        primary, replica = self.get('scheme-navs', self.scheme.scheme_code)
+        self.assertTrue(any('mutualfunds_nav' in query['sql'] for query in replica.captured_queries))
+        self.assertFalse(any('mutualfunds_nav' in query['sql'] for query in primary.captured_queries))
+
+    def test_portfolio_reads_stay_on_primary(self):
+        _, replica = self.get('portfolio')
+        self.assertEqual(len(replica), 0)
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        response = self.client.post(reverse('transactions'), {
+            'scheme': self.scheme.id, 'kind': 'buy', 'date': '2024-01-01', 'units': 5, 'price': 10.0
+        }, format='json', **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        _, replica = self.get('scheme-navs', self.scheme.scheme_code)
+        self.assertEqual(len(replica), 0)
+
+        cache.clear()
+        _, replica = self.get('scheme-navs', self.scheme.scheme_code)
+        self.assertGreater(len(replica), 0)
+
+    def test_nothing_is_migrated_on_the_replica(self):
+        router = ReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica', 'mutualfunds'))
+        self.assertIsNone(router.allow_migrate('default', 'mutualfunds'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RAPIDAPI_REPLAY_DIR=str(TESTDATA_DIR))
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='async@example.com', password='testpass123')
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.schemes = create_schemes_for_feed(load_feed_fixture())
+        LatestNAV.objects.create(scheme=self.schemes[0], date=date(2024, 1, 1), nav=20.0)
+        record_transactions(self.user, [
+            {'scheme': self.schemes[0], 'kind': 'buy', 'date': date(2024, 1, 1), 'units': 5, 'price': 20.0}
+        ])
+
+    async def test_token_is_required(self):
+        response = await self.async_client.get(reverse('async-portfolio'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(response.json()['status'])
+
+    async def test_portfolio_and_summary(self):
+        response = await self.async_client.get(reverse('async-portfolio'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        holding, = response.json()['data']['results']
+        self.assertEqual(holding['scheme']['scheme_code'], self.schemes[0].scheme_code)
+        self.assertEqual(holding['current_value'], 100.0)
+
+        response = await self.async_client.get(reverse('async-portfolio-summary'), headers=self.headers)
+        self.assertEqual(response.json()['data']['current_value'], 100.0)
+
+    async def test_fund_houses_are_keyset_paginated(self):
+        names = []
+        url = reverse('async-fundhouses') + '?page_size=1&fields=name'
+        while url:
+            response = await self.async_client.get(url, headers=self.headers)
+            data = response.json()['data']
+            names += [row['name'] for row in data['results']]
+            self.assertEqual([set(row) for row in data['results']], [{'name'}])
+            url = data['next']
+        expected = [name async for name in FundHouse.objects.order_by('name').values_list('name', flat=True)]
+        self.assertEqual(names, expected)
+
+    async def test_async_client_retries_busy_responses(self):
+        replies = iter([httpx.Response(503), httpx.Response(200, json=[])])
+        client = AsyncRapidAPIClient("example.p.rapidapi.com", "test-key", backoff_factor=0, backoff_jitter=0)
+        client.client = httpx.AsyncClient(base_url="https://example.p.rapidapi.com",
+                                          transport=httpx.MockTransport(lambda request: next(replies)))
+        response = await client.get("/latest")
+        self.assertEqual(response.status_code, 200)
+        await client.aclose()
+
+    @mock.patch('mutualfunds.async_views.run_catalogue_import.delay')
+    async def test_fetch_queues_the_import_on_celery(self, delay):
+        response = await self.async_client.post(reverse('async-fetch-schemes'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = response.json()['data']
+        self.assertEqual(job['status'], ImportJob.STATUS_PENDING)
+        delay.assert_called_once_with(job['id'])
+
+    @mock.patch('mutualfunds.async_views.run_catalogue_import.delay')
+    async def test_fetch_needs_no_csrf_token(self, delay):
+        client = AsyncClient(enforce_csrf_checks=True)
+        response = await client.post(reverse('async-fetch-fundhouses'), headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        delay.assert_called_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SchemeSearchTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='search@example.com', password='testpass123')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.schemes = create_schemes_for_feed(load_feed_fixture())
+
+    def search(self, **params):
+        response = self.client.get(reverse('scheme-search'), params, **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data['data']
+
+    def test_name_words_match_in_any_order(self):
+        data = self.search(q='liquid hdfc')
+        self.assertGreater(data['count'], 0)
+        for scheme in data['results']:
+            self.assertIn('hdfc', scheme['scheme_name'].lower())
+            self.assertIn('liquid', scheme['scheme_name'].lower())
+
+    def test_names_starting_with_the_query_rank_first(self):
+        data = self.search(q='Axis Flexi Cap')
+        self.assertTrue(data['results'][0]['scheme_name'].startswith('Axis Flexi Cap'))
+
+    def test_words_match_as_prefixes(self):
+        data = self.search(q='hdf liq')
+        self.assertGreater(data['count'], 0)
+        self.assertTrue(all('HDFC Liquid' in scheme['scheme_name'] for scheme in data['results']))
+
+    def test_code_and_isin_are_exact_lookups(self):
+        scheme = self.schemes[2]
+        scheme.isin_growth, scheme.isin_reinvestment = 'INF159K01931', 'INF319K01161'
+        scheme.save()
+        self.assertEqual([row['id'] for row in self.search(q=str(scheme.scheme_code))['results']], [scheme.id])
+        self.assertEqual([row['id'] for row in self.search(isin=scheme.isin_reinvestment.lower())['results']], [scheme.id])
+        self.assertEqual([row['id'] for row in self.search(q=scheme.isin_growth)['results']], [scheme.id])
+
+    def test_filters_and_pages(self):
+        category = self.schemes[0].scheme_category
+        expected = sorted(s.scheme_code for s in self.schemes if s.scheme_category == category)
+        data = self.search(category=category, page_size=1)
+        self.assertEqual(data['count'], len(expected))
+        self.assertEqual([row['scheme_code'] for row in data['results']], expected[:1])
+
+    def test_substring_fallback_without_postgresql(self):
+        with mock.patch.object(search.connection, 'vendor', 'sqlite'):
+            names = [scheme.scheme_name for scheme in search.search_schemes(q='liquid hdfc')]
+        self.assertTrue(names)
+        self.assertTrue(all('HDFC' in name and 'Liquid' in name for name in names))
+
+    def test_query_is_required(self):
+        response = self.client.get(reverse('scheme-search'), **self.auth_header)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NAVBackfillTests(TestCase):
+    # testdata/historical holds 10 schemes for 16-19 Jun 2025; the weekend before has no recording
+
+    def setUp(self):
+        cache.clear()
+        create_schemes_for_feed(load_feed_fixture())
+        replay = RapidAPIClient("example.p.rapidapi.com", "test-key", replay_dir=TESTDATA_DIR)
+        patcher = mock.patch('mutualfunds.feed.get_client', return_value=replay)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_date_ranges(self):
+        self.assertEqual(date_ranges(date(2025, 6, 14), date(2025, 6, 19), 4),
+                         [(date(2025, 6, 14), date(2025, 6, 17)), (date(2025, 6, 18), date(2025, 6, 19))])
+
+    def test_history_is_replayed_per_date(self):
+        records = list(stream_history(date(2025, 6, 17)))
+        self.assertEqual(len(records), 10)
+        self.assertTrue(all(record.nav_date == date(2025, 6, 17) for record in records))
+        self.assertEqual(list(stream_history(date(2025, 6, 15))), [])
+
+    @mock.patch('mutualfunds.tasks.update_scheme_metrics.delay')
+    def test_chunks_load_in_parallel_tasks(self, refresh_metrics):
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+        backfill = create_backfill(date(2025, 6, 14), date(2025, 6, 19), chunk_days=3)
+
+        run_nav_backfill(str(backfill.pk))
+
+        backfill.refresh_from_db()
+        self.assertEqual((backfill.status, backfill.loaded), (NAVBackfill.STATUS_SUCCEEDED, 40))
+        self.assertEqual([chunk.loaded_through for chunk in backfill.chunks.all()],
+                         [date(2025, 6, 16), date(2025, 6, 19)])
+        self.assertEqual(NAV.objects.count(), 40)
+        latest = LatestNAV.objects.get(scheme__scheme_code=100198)
+        self.assertEqual((latest.date, latest.previous_date), (date(2025, 6, 19), date(2025, 6, 18)))
+        refresh_metrics.assert_called_once()
+
+    def test_interrupted_backfill_resumes_from_checkpoint(self):
+        backfill = create_backfill(date(2025, 6, 16), date(2025, 6, 19), chunk_days=4)
+        chunk = backfill.chunks.get()
+        fetched = []
+
+        def flaky_history(day, client=None):
+            fetched.append(day)
+            if day == date(2025, 6, 18) and fetched.count(day) == 1:
+                raise FeedError("Failed to fetch NAV history", 503)
+            return stream_history(day, client)
+
+        with mock.patch('mutualfunds.backfill.stream_history', flaky_history):
+            result = load_chunk(chunk.pk)
+            chunk.refresh_from_db()
+            self.assertIn('2025-06-18', result['error'])
+            self.assertEqual((chunk.status, chunk.loaded_through, chunk.loaded),
+                             (NAVBackfill.STATUS_FAILED, date(2025, 6, 17), 20))
+
+            call_command('backfill_navs', resume=str(backfill.pk), sync=True, stdout=StringIO())
+
+        self.assertEqual(fetched, [date(2025, 6, 16), date(2025, 6, 17), date(2025, 6, 18),
+                                   date(2025, 6, 18), date(2025, 6, 19)])
+        backfill.refresh_from_db()
+        self.assertEqual((backfill.status, backfill.loaded), (NAVBackfill.STATUS_SUCCEEDED, 40))
+        self.assertEqual(NAV.objects.count(), 40)
+
+    def test_selected_schemes_keep_newer_latest_nav(self):
+        ingest_navs(feed_records(load_feed_fixture()))
+
+        call_command('backfill_navs', '--from', '2025-06-16', '--to', '2025-06-19', '--scheme', '100198',
+                     '--sync', stdout=StringIO())
+
+        self.assertEqual(NAV.objects.filter(scheme__scheme_code=100198).count(), 5)
+        self.assertEqual(NAV.objects.count(), 44)
+        latest = LatestNAV.objects.get(scheme__scheme_code=100198)
+        self.assertEqual((latest.date, latest.previous_date), (date(2025, 6, 20), date(2025, 6, 19)))
+
+    def test_backfill_waits_for_a_running_nav_update(self):
+        backfill = create_backfill(date(2025, 6, 16), date(2025, 6, 17))
+        load_chunk(backfill.chunks.get().pk)
+        running = nav_lock()
+        self.assertTrue(running.acquire())
+        self.addCleanup(running.release)
+
+        with self.assertRaises(LockBusy):
+            finish_backfill(backfill.pk)
+        self.assertFalse(LatestNAV.objects.exists())
+
+        running.release()
+        self.assertEqual(finish_backfill(backfill.pk)['latest_updated'], 10)
+        latest = LatestNAV.objects.get(scheme__scheme_code=100198)
+        self.assertEqual((latest.date, latest.previous_date), (date(2025, 6, 17), date(2025, 6, 16)))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CachedJWTAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='cached@example.com', password='testpass123')
+        self.url = reverse('portfolio')
+
+    def get(self, user=None):
+        token = RefreshToken.for_user(user or self.user).access_token
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}')
+        user_queries = [q for q in ctx.captured_queries if User._meta.db_table in q['sql']]
+        return response, len(user_queries)
+
+    def test_user_is_loaded_once(self):
+        self.assertEqual(self.get()[1], 1)
+        response, user_queries = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user_queries, 0)
+        self.assertEqual(cache.get(user_key(self.user.pk))['email'], 'cached@example.com')
+
+    def test_cached_user_is_read_only(self):
+        self.get()
+        token = RefreshToken.for_user(self.user).access_token
+        request = APIRequestFactory().get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}')
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        self.assertEqual(user.pk, self.user.pk)
+        with self.assertRaises(TypeError):
+            user.save()
+        with self.assertRaises(TypeError):
+            user.delete()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    def test_deactivation_takes_effect_immediately(self):
+        self.get()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get()[0].status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_cached_tokens(self):
+        # simplejwt's modules share this settings object; override_settings would replace it
+        with mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True):
+            token = RefreshToken.for_user(self.user).access_token
+            header = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+            self.assertEqual(self.client.get(self.url, **header).status_code, status.HTTP_200_OK)
+
+            self.user.set_password('changed-pass')
+            self.user.save()
+            self.assertEqual(self.client.get(self.url, **header).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_USER_CACHE=False)
+    def test_cache_can_be_turned_off(self):
+        self.get()
+        self.assertEqual(self.get()[1], 1)
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from itertools import groupby
+
+INTERVALS = ("weekly", "monthly")
+
+
+def period_start(day, interval):
+    if interval == "weekly":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def ohlc(rows, interval):
+    """
+    Collapse (date, nav) rows sorted by date into one open/high/low/close bar per
+    week or month, consuming the rows lazily.
+    """
+    for start, bucket in groupby(rows, key=lambda row: period_start(row[0], interval)):
+        first = next(bucket)
+        high = low = close = first[1]
+        for _, nav in bucket:
+            high = max(high, nav)
+            low = min(low, nav)
+            close = nav
+        yield start, first[1], high, low, close
+
+
+def lttb(rows, threshold):
+    """
+    Largest-Triangle-Three-Buckets: keep `threshold` of the (date, nav) rows that
+    best preserve the visual shape of the series, always including both ends.
+    """
+    rows = list(rows)
+    if threshold >= len(rows) or threshold < 3:
+        return rows
+
+    # x is the day ordinal, so gaps for weekends and holidays keep their width
+    xs = [row[0].toordinal() for row in rows]
+    ys = [row[1] for row in rows]
+    sampled = [rows[0]]
+    bucket_size = (len(rows) - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third vertex of the triangle
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, len(rows))
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(rows[best])
+        a = best
+
+    sampled.append(rows[-1])
+    return sampled
@@ -1,12 +1,32 @@
 from django.urls import path
 from .views import  FetchAndSaveSchemesView, SchemeListView, PortfolioListCreateView, FetchAndSaveFundHousesView,\
-    RegisterView
+    RegisterView, ImportJobDetailView, CacheStatsView, SchemeNAVHistoryView, SchemeMetricsView,\
+    TransactionListCreateView, PortfolioAnalyticsView, PortfolioSummaryView, SchemeSearchView
+from .async_views import AsyncFundHouseListView, AsyncSchemeListView, AsyncSchemeMetricsView, AsyncPortfolioView,\
+    AsyncPortfolioSummaryView, AsyncFetchFundHousesView, AsyncFetchSchemesView
     
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
-    path('schemes/<int:fund_house_id>/', SchemeListView.as_view()),
-    path('portfolio/', PortfolioListCreateView.as_view()),
+    path('schemes/search/', SchemeSearchView.as_view(), name='scheme-search'),
+    path('schemes/<int:fund_house_id>/', SchemeListView.as_view(), name='scheme-list'),
+    path('schemes/<int:scheme_code>/navs/', SchemeNAVHistoryView.as_view(), name='scheme-navs'),
+    path('schemes/<int:scheme_code>/metrics/', SchemeMetricsView.as_view(), name='scheme-metrics'),
+    path('portfolio/', PortfolioListCreateView.as_view(), name='portfolio'),
+    path('portfolio/transactions/', TransactionListCreateView.as_view(), name='transactions'),
+    path('portfolio/analytics/', PortfolioAnalyticsView.as_view(), name='portfolio-analytics'),
+    path('portfolio/summary/', PortfolioSummaryView.as_view(), name='portfolio-summary'),
     path('fundhouses/', FetchAndSaveFundHousesView.as_view(), name='fundhouses'),
     path('fetch-schemes/', FetchAndSaveSchemesView.as_view(), name='fetch-schemes'),
+    path('jobs/<uuid:pk>/', ImportJobDetailView.as_view(), name='import-job'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+
+    # Async versions for the ASGI deployment
+    path('async/fundhouses/', AsyncFundHouseListView.as_view(), name='async-fundhouses'),
+    path('async/schemes/<int:fund_house_id>/', AsyncSchemeListView.as_view(), name='async-scheme-list'),
+    path('async/schemes/<int:scheme_code>/metrics/', AsyncSchemeMetricsView.as_view(), name='async-scheme-metrics'),
+    path('async/portfolio/', AsyncPortfolioView.as_view(), name='async-portfolio'),
+    path('async/portfolio/summary/', AsyncPortfolioSummaryView.as_view(), name='async-portfolio-summary'),
+    path('async/fetch-fundhouses/', AsyncFetchFundHousesView.as_view(), name='async-fetch-fundhouses'),
+    path('async/fetch-schemes/', AsyncFetchSchemesView.as_view(), name='async-fetch-schemes'),
 
 ]
@@ -1,16 +1,34 @@
 from rest_framework.response import Response
 from rest_framework import status as drf_status
 
-def success_response(message, data=None, status=drf_status.HTTP_200_OK):
-    return Response({
+def requested_fields(request, param="fields"):
+    """Field names asked for with ?fields=a,b (or another query param), or None when absent."""
+    value = request.query_params.get(param) if request is not None else None
+    if not value:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+def concrete_fields(model, names):
+    """Subset of `names` that are concrete columns of `model`, usable with QuerySet.only()."""
+    columns = {field.name for field in model._meta.concrete_fields}
+    return [name for name in names if name in columns]
+
+def success_payload(message, data=None):
+    return {
         "status": True,
         "message": message,
         "data": data
-    }, status=status)
+    }
 
-def error_response(message, errors=None, status=drf_status.HTTP_400_BAD_REQUEST):
-    return Response({
+def success_response(message, data=None, status=drf_status.HTTP_200_OK):
+    return Response(success_payload(message, data), status=status)
+
+def error_payload(message, errors=None):
+    return {
         "status": False,
         "message": message,
         "errors": errors
-    }, status=status)
+    }
+
+def error_response(message, errors=None, status=drf_status.HTTP_400_BAD_REQUEST):
+    return Response(error_payload(message, errors), status=status)
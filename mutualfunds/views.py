@@ -1,25 +1,62 @@
 from rest_framework import generics, permissions, status
 from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.http import Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import (
     RegisterSerializer,
     CustomTokenObtainPairSerializer,
     FundHouseSerializer,
     SchemeSerializer,
-    PortfolioSerializer
+    PortfolioSerializer,
+    PortfolioHoldingSerializer,
+    ImportJobSerializer,
+    SchemeMetricsSerializer,
+    TransactionSerializer,
+    PortfolioSummarySerializer
 )
-from .models import FundHouse, Scheme, Portfolio, NAV
-from .utils import success_response, error_response
-import requests
-from decouple import config
+from .jobs import start_import_job
+from .ledger import record_transactions, refresh_summaries
+from .models import FundHouse, Scheme, Portfolio, ImportJob, NAV, SchemeMetrics, Transaction, LatestNAV, PortfolioSummary
+from .tasks import run_catalogue_import
+from .timeseries import INTERVALS, lttb, ohlc
+from .caching import cache_stats, cached_json_response
+from .routers import is_sticky, replica_reads
+from .search import search_schemes
+from .pagination import KeysetPagination, SchemeKeysetPagination, FundHouseKeysetPagination, TransactionKeysetPagination,\
+    SchemeSearchPagination
+from .utils import success_payload, success_response, error_response, requested_fields, concrete_fields
 
+User = get_user_model()
 
-HEADERS = {
-    "X-RapidAPI-Key": config("RAPIDAPI_KEY"),
-    "X-RapidAPI-Host": config("RAPID_API_HOST")
-}
 
-User = get_user_model()
+class SparseKeysetListMixin:
+    """Keyset-paginated listing whose SQL projection and JSON output follow ?fields=."""
+
+    def sparse_page(self, queryset):
+        fields = requested_fields(self.request)
+        if fields:
+            # The cursor column is read from every row, so it is always loaded
+            ordering = self.pagination_class.ordering.lstrip("-")
+            queryset = queryset.only(*concrete_fields(queryset.model, fields), ordering)
+        page = self.paginate_queryset(queryset)
+        return self.paginator.get_paginated_data(self.get_serializer(page, many=True).data)
+
+
+class ReplicaReadMixin:
+    """Serve GET requests from the read replica, unless the user wrote something moments ago."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads() as reads:
+            self.replica_reads = reads
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication runs first, on the primary
+        super().initial(request, *args, **kwargs)
+        self.replica_reads.enabled = request.method in permissions.SAFE_METHODS and not is_sticky(request.user)
 
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
@@ -47,38 +84,38 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 
 
+def queue_import(kind, user, label):
+    """Queue a catalogue import on Celery, or report the one of the same kind already in progress."""
+    job, created = start_import_job(kind, user)
+    if not created:
+        return success_response(f"{label} import already in progress.", ImportJobSerializer(job).data, status.HTTP_202_ACCEPTED)
+
+    try:
+        run_catalogue_import.delay(str(job.id))
+    except Exception as e:
+        ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.STATUS_FAILED, error=str(e))
+        return error_response(f"Failed to queue {label.lower()} import", str(e), status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    return success_response(f"{label} import queued.", ImportJobSerializer(job).data, status.HTTP_202_ACCEPTED)
+
+
 # Fetch and Save Fund Houses
-class FetchAndSaveFundHousesView(generics.GenericAPIView):
+class FetchAndSaveFundHousesView(ReplicaReadMixin, SparseKeysetListMixin, generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = FundHouseSerializer
+    pagination_class = FundHouseKeysetPagination
 
     def post(self, request, *args, **kwargs):
         try:
-            url = f"https://{config('RAPID_API_HOST')}/latest"
-
-            response = requests.get(url, headers=HEADERS, timeout=60)
-
-            if response.status_code == 200:
-                data = response.json()
-                fund_houses = set(s.get("Mutual_Fund_Family") for s in data if s.get("Mutual_Fund_Family"))
-
-                created = 0
-                for name in fund_houses:
-                    _, is_created = FundHouse.objects.get_or_create(name=name)
-                    if is_created:
-                        created += 1
-
-                return success_response(f"{created} fund houses added.", {"created": created})
-            return error_response("Failed to fetch fund houses", response.text, status.HTTP_502_BAD_GATEWAY)
-
+            return queue_import(ImportJob.KIND_FUND_HOUSES, request.user, "Fund house")
         except Exception as e:
             return error_response("Error occurred", str(e))
     
     def get(self, request, *args, **kwargs):
         try:
-            fundhouses = FundHouse.objects.all()
-            serializer = self.get_serializer(fundhouses, many=True)
-            return success_response("Fund houses fetched", serializer.data)
+            return cached_json_response(request, "fundhouses", "all", lambda: success_payload(
+                "Fund houses fetched", self.sparse_page(FundHouse.objects.all())
+            ))
         except Exception as e:
             return error_response("Error fetching fund houses", str(e))
 
@@ -90,89 +127,216 @@ class FetchAndSaveSchemesView(generics.GenericAPIView):
 
     def post(self, request, *args, **kwargs):
         try:
-            url = f"https://{config('RAPID_API_HOST')}/latest"
-
-            response = requests.get(url, headers=HEADERS, timeout=60)
-
-            if response.status_code == 200:
-                data = response.json()
-                created = 0
-                skipped = 0
-
-                for item in data:
-                    if "open" not in item.get("Scheme_Type", "").lower():
-                        continue
+            return queue_import(ImportJob.KIND_SCHEMES, request.user, "Scheme")
+        except Exception as e:
+            return error_response("Error occurred", str(e))
 
-                    fund_house_name = item.get("Mutual_Fund_Family")
-                    if not fund_house_name:
-                        continue
 
-                    fund_house, _ = FundHouse.objects.get_or_create(name=fund_house_name)
+# Hit/miss counters of the listing response cache
+class CacheStatsView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAdminUser]
 
-                    scheme_code = item.get("Scheme_Code")
-                    if not scheme_code:
-                        skipped += 1
-                        continue
+    def get(self, request, *args, **kwargs):
+        try:
+            return success_response("Cache stats fetched", cache_stats())
+        except Exception as e:
+            return error_response("Error fetching cache stats", str(e))
 
-                    _, is_created = Scheme.objects.get_or_create(
-                        scheme_code=scheme_code,
-                        defaults={
-                            "scheme_name": item.get("Scheme_Name"),
-                            "fund_house": fund_house,
-                            "scheme_type": item.get("Scheme_Type"),
-                            "scheme_category": item.get("Scheme_Category"),
-                            "isin_growth": item.get("ISIN_Div_Payout_ISIN_Growth"),
-                            "isin_reinvestment": item.get("ISIN_Div_Reinvestment"),
-                            "is_open_ended": True
-                        }
-                    )
-                    if is_created:
-                        created += 1
 
-                return success_response(f"{created} schemes added, {skipped} skipped.", {"created": created, "skipped": skipped})
-            return error_response("Failed to fetch schemes", response.text, status.HTTP_502_BAD_GATEWAY)
+# Progress and result of a catalogue import
+class ImportJobDetailView(generics.RetrieveAPIView):
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    queryset = ImportJob.objects.all()
 
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            job = self.get_object()
+            return success_response("Import job fetched", self.get_serializer(job).data)
+        except Http404:
+            return error_response("Import job not found", status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            return error_response("Error occurred", str(e))
+            return error_response("Error fetching import job", str(e))
 
 
 # List Open-Ended Schemes for a Fund House
-class SchemeListView(generics.ListAPIView):
+class SchemeListView(ReplicaReadMixin, SparseKeysetListMixin, generics.ListAPIView):
     serializer_class = SchemeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SchemeKeysetPagination
 
     def get_queryset(self):
         fund_house_id = self.kwargs.get('fund_house_id')
         return Scheme.objects.filter(fund_house_id=fund_house_id, is_open_ended=True)
 
+    def list(self, request, *args, **kwargs):
+        return cached_json_response(
+            request, "schemes", self.kwargs.get('fund_house_id'),
+            lambda: success_payload("Schemes fetched", self.sparse_page(self.get_queryset()))
+        )
+
+
+# Search schemes by name, code or ISIN
+class SchemeSearchView(ReplicaReadMixin, generics.ListAPIView):
+    """
+    GET /api/schemes/search/
+
+    ?q=                         name words, a scheme code or an ISIN
+    ?scheme_code= / ?isin=      exact lookups
+    ?category= / ?type=         exact scheme_category / scheme_type filters
+    """
+    serializer_class = SchemeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SchemeSearchPagination
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if not any(params.get(name) for name in ("q", "scheme_code", "isin", "category", "type")):
+            return error_response("Invalid query parameters", "Provide q, scheme_code, isin, category or type")
+        scheme_code = params.get("scheme_code")
+        if scheme_code and not scheme_code.isdigit():
+            return error_response("Invalid query parameters", "scheme_code must be a number")
+
+        try:
+            schemes = search_schemes(
+                q=params.get("q"),
+                scheme_code=scheme_code or None,
+                isin=params.get("isin"),
+                category=params.get("category"),
+                scheme_type=params.get("type"),
+            )
+            page = self.paginate_queryset(schemes)
+            data = self.paginator.get_paginated_data(self.get_serializer(page, many=True).data)
+            return success_response("Schemes fetched", data)
+        except Exception as e:
+            return error_response("Error searching schemes", str(e))
+
+
+# NAV history of a scheme, optionally downsampled
+class SchemeNAVHistoryView(ReplicaReadMixin, generics.GenericAPIView):
+    """
+    GET /api/schemes/<scheme_code>/navs/
+
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD   date range (inclusive)
+    ?interval=weekly|monthly         one open/high/low/close bar per period
+    ?points=N                        at most N points, chosen with LTTB
+    ?layout=columnar                 parallel arrays instead of one object per point
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    # Upper bound for ?points=
+    max_points = 5000
+
+    def get(self, request, scheme_code, *args, **kwargs):
+        params = request.query_params
+        try:
+            start, end = parse_date(params.get("from", "")), parse_date(params.get("to", ""))
+            points = int(params["points"]) if params.get("points") else None
+        except ValueError as e:
+            return error_response("Invalid query parameters", str(e))
+        for name, value in (("from", start), ("to", end)):
+            if params.get(name) and value is None:
+                return error_response("Invalid query parameters", f"{name} must be a date in YYYY-MM-DD format")
+
+        interval = params.get("interval")
+        if interval and interval not in INTERVALS:
+            return error_response("Invalid query parameters", f"interval must be one of {', '.join(INTERVALS)}")
+        if points is not None and not 3 <= points <= self.max_points:
+            return error_response("Invalid query parameters", f"points must be between 3 and {self.max_points}")
+        if interval and points:
+            return error_response("Invalid query parameters", "Use either interval or points, not both")
+
+        scheme_id = Scheme.objects.filter(scheme_code=scheme_code).values_list("id", flat=True).first()
+        if scheme_id is None:
+            return error_response("Scheme not found", status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            navs = NAV.objects.filter(scheme_id=scheme_id)
+            if start:
+                navs = navs.filter(date__gte=start)
+            if end:
+                navs = navs.filter(date__lte=end)
+            # Plain (date, nav) tuples straight from the cursor, no model instances
+            rows = navs.order_by("date").values_list("date", "nav").iterator(chunk_size=2000)
+
+            columnar = params.get("layout") == "columnar"
+            if interval:
+                data = self.ohlc_data(ohlc(rows, interval), columnar)
+            else:
+                data = self.point_data(lttb(rows, points) if points else rows, columnar)
+            return success_response("NAV history fetched", data)
+        except Exception as e:
+            return error_response("Error fetching NAV history", str(e))
+
+    def point_data(self, rows, columnar):
+        if columnar:
+            dates, navs = [], []
+            for day, nav in rows:
+                dates.append(day.isoformat())
+                navs.append(nav)
+            return {"dates": dates, "navs": navs}
+        return [{"date": day.isoformat(), "nav": nav} for day, nav in rows]
+
+    def ohlc_data(self, bars, columnar):
+        if columnar:
+            columns = {"dates": [], "open": [], "high": [], "low": [], "close": []}
+            for day, open_, high, low, close in bars:
+                columns["dates"].append(day.isoformat())
+                columns["open"].append(open_)
+                columns["high"].append(high)
+                columns["low"].append(low)
+                columns["close"].append(close)
+            return columns
+        return [
+            {"date": day.isoformat(), "open": open_, "high": high, "low": low, "close": close}
+            for day, open_, high, low, close in bars
+        ]
+
+
+# Return and risk metrics of a scheme
+class SchemeMetricsView(ReplicaReadMixin, generics.RetrieveAPIView):
+    serializer_class = SchemeMetricsSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    queryset = SchemeMetrics.objects.select_related('scheme')
+    lookup_field = 'scheme__scheme_code'
+    lookup_url_kwarg = 'scheme_code'
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            metrics = self.get_object()
+            return success_response("Scheme metrics fetched", self.get_serializer(metrics).data)
+        except Http404:
+            return error_response("Scheme metrics not found", status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return error_response("Error fetching scheme metrics", str(e))
+
 
 # Create and List Portfolio with latest NAV
 class PortfolioListCreateView(generics.ListCreateAPIView):
     serializer_class = PortfolioSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Portfolio.objects.filter(user=self.request.user).select_related("scheme")
+        # Latest NAV of every holding is joined from LatestNAV in the same query as the holdings
+        queryset = Portfolio.objects.filter(user=self.request.user).annotate(latest_nav=F("scheme__latest_nav__nav"))
+
+        # Only load what ?fields= / ?scheme_fields= ask for; units feed current_value
+        columns = ["id", "units", "last_updated"]
+        fields = requested_fields(self.request)
+        if fields is None or "scheme" in fields:
+            queryset = queryset.select_related("scheme")
+            scheme_fields = requested_fields(self.request, "scheme_fields")
+            if scheme_fields:
+                columns += [f"scheme__{name}" for name in concrete_fields(Scheme, scheme_fields)]
+            else:
+                columns.append("scheme")
+        return queryset.only(*columns)
 
     def list(self, request, *args, **kwargs):
         try:
-            queryset = self.get_queryset()
-            portfolio_data = []
-
-            for item in queryset:
-                nav_obj = NAV.objects.filter(scheme=item.scheme).order_by('-date').first()
-                current_nav = nav_obj.nav if nav_obj else 0.0
-                current_value = round(item.units * current_nav, 2)
-                
-                portfolio_data.append({
-                    "id": item.id,
-                    "scheme": SchemeSerializer(item.scheme).data,
-                    "units": item.units,
-                    "current_value": current_value,
-                    "last_updated": item.last_updated
-                })
-
-            return success_response("Portfolio fetched", portfolio_data)
+            page = self.paginate_queryset(self.get_queryset())
+            serializer = PortfolioHoldingSerializer(page, many=True, context=self.get_serializer_context())
+            return success_response("Portfolio fetched", self.paginator.get_paginated_data(serializer.data))
         except Exception as e:
             return error_response("Failed to fetch portfolio", str(e))
 
@@ -180,7 +344,98 @@ class PortfolioListCreateView(generics.ListCreateAPIView):
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
-            instance = serializer.save(user=request.user)
+            # Holdings are derived from the ledger: adding one records a purchase at the latest NAV
+            scheme = serializer.validated_data["scheme"]
+            price = LatestNAV.objects.filter(scheme=scheme).values_list("nav", flat=True).first()
+            if not price:
+                return error_response("Failed to add to portfolio", "No NAV is available for this scheme yet")
+            record_transactions(request.user, [{
+                "scheme": scheme,
+                "kind": Transaction.KIND_BUY,
+                "date": timezone.localdate(),
+                "units": serializer.validated_data["units"],
+                "price": price,
+            }])
+            instance = Portfolio.objects.filter(user=request.user, scheme=scheme).first()
             return success_response("Added to portfolio", PortfolioSerializer(instance).data, status.HTTP_201_CREATED)
         except Exception as e:
             return error_response("Failed to add to portfolio", str(e))
+
+
+# Record and list buy/sell/SIP transactions; holdings follow from them
+class TransactionListCreateView(generics.ListCreateAPIView):
+    serializer_class = TransactionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TransactionKeysetPagination
+
+    def get_queryset(self):
+        return Transaction.objects.filter(user=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        try:
+            page = self.paginate_queryset(self.get_queryset())
+            serializer = self.get_serializer(page, many=True)
+            return success_response("Transactions fetched", self.paginator.get_paginated_data(serializer.data))
+        except Exception as e:
+            return error_response("Failed to fetch transactions", str(e))
+
+    def create(self, request, *args, **kwargs):
+        try:
+            # A list records a batch, e.g. a history of SIP instalments, in one go
+            many = isinstance(request.data, list)
+            serializer = self.get_serializer(data=request.data, many=many)
+            serializer.is_valid(raise_exception=True)
+            rows = serializer.validated_data if many else [serializer.validated_data]
+            created = record_transactions(request.user, rows)
+            data = TransactionSerializer(created, many=True).data
+            return success_response("Transactions recorded", data if many else data[0], status.HTTP_201_CREATED)
+        except Exception as e:
+            return error_response("Failed to record transactions", str(e))
+
+
+# Precomputed totals of the user's portfolio
+class PortfolioSummaryView(generics.GenericAPIView):
+    serializer_class = PortfolioSummarySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            summary = PortfolioSummary.objects.filter(user=request.user).first()
+            if summary is None:
+                # Not materialised yet, e.g. holdings created before summaries existed
+                refresh_summaries([request.user.pk])
+                summary = PortfolioSummary.objects.get(user=request.user)
+            return success_response("Portfolio summary fetched", self.get_serializer(summary).data)
+        except Exception as e:
+            return error_response("Error fetching portfolio summary", str(e))
+
+
+# Gain/loss, XIRR and value over time of the user's portfolio
+class PortfolioAnalyticsView(generics.GenericAPIView):
+    """
+    GET /api/portfolio/analytics/
+
+    ?from=YYYY-MM-DD&to=YYYY-MM-DD   range of the value history
+    ?history=false                   skip the value history
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            start, end = parse_date(params.get("from", "")), parse_date(params.get("to", ""))
+        except ValueError as e:
+            return error_response("Invalid query parameters", str(e))
+
+        try:
+            # Imported here so web processes only load NumPy once analytics are asked for
+            from .analytics import portfolio_analytics
+
+            data = portfolio_analytics(
+                request.user, start=start, end=end, history=params.get("history", "true").lower() != "false"
+            )
+            if data is None:
+                return success_response("No transactions yet")
+            return success_response("Portfolio analytics fetched", data)
+        except Exception as e:
+            return error_response("Error computing portfolio analytics", str(e))